@@ -1,6 +1,9 @@
+from collections import defaultdict
+
 from django.core.urlresolvers import reverse
 from profiles.models import Profile
 
+
 def base_resource(obj):
     return {
         "absolute_url": obj.get_absolute_url(),
@@ -40,45 +43,85 @@ def grid_resource(grid):
 
 
 def package_resource(package):
-    data = base_resource(package)
+    return package_resources([package])[0]
 
-    try:
-        if package.created_by is None or package.created_by.profile is None:
-            created_by = None
-        else:
-            created_by = reverse("apiv3:user_detail", kwargs={"github_account": package.created_by.profile.github_account.name})
-    except Profile.DoesNotExist:
-        created_by = None
 
-    try:
-        last_modified_by = package.last_modified_by.profile.github_account.name
-    except AttributeError:
-        last_modified_by = None
+# relations to select with the packages passed to package_resources()
+PACKAGE_RESOURCE_RELATED = ('category', 'draft_added_by__profile', 'last_modified_by__profile')
 
-    data.update(
-        {
+
+def package_resources(packages):
+    """ Resources of ``packages``, built with a constant number of queries for any number of
+        packages, provided they were loaded with ``select_related(*PACKAGE_RESOURCE_RELATED)``.
+    """
+    # Import placed here to avoid circular dependencies
+    from grid.models import GridPackage
+    from package.models import Version, rebuild_missing_commit_weeks
+    from profiles.models import Account
+
+    packages = list(packages)
+    if not packages:
+        return []
+    pks = [package.pk for package in packages]
+
+    profile_ids = set()
+    for package in packages:
+        for user in (package.draft_added_by, package.last_modified_by):
+            profile = getattr(user, 'profile', None) if user is not None else None
+            if profile is not None:
+                profile_ids.add(profile.pk)
+    github_accounts = {}
+    for profile_id, name in Account.objects.filter(
+            profile__in=profile_ids, account_type__name=Account.TYPE_GITHUB).order_by('-pk').values_list(
+            'profile', 'name'):
+        github_accounts[profile_id] = name
+
+    def github_account(user):
+        try:
+            return github_accounts.get(user.profile.pk) if user is not None else None
+        except Profile.DoesNotExist:
+            return None
+
+    grids = defaultdict(list)
+    for package_id, grid_slug in GridPackage.objects.filter(package__in=pks).values_list('package', 'grid__slug'):
+        grids[package_id].append(grid_slug)
+
+    latest_versions = Version.objects.latest_by_package(pks)
+    rebuild_missing_commit_weeks(packages)
+
+    resources = []
+    for package in packages:
+        created_by = github_account(package.draft_added_by)
+        latest_version = latest_versions.get(package.pk)
+        resources.append({
+            "absolute_url": package.get_absolute_url(),
+            "created": package.created,
+            "modified": package.modified,
+            "slug": package.slug,
+            "title": package.name,
             "category": reverse("apiv3:category_detail", kwargs={"slug": package.category.slug}),
             "commit_list": package.commit_list,
             "commits_over_52": package.commits_over_52(),
-            "created_by": created_by,
+            "created_by": reverse(
+                "apiv3:user_detail", kwargs={"github_account": created_by}
+            ) if created_by else None,
             "documentation_url": package.documentation_url,
             "grids": [
-                reverse("apiv3:grid_detail", kwargs={"slug": x.slug}) for x in package.grids()
+                reverse("apiv3:grid_detail", kwargs={"slug": slug}) for slug in grids[package.pk]
             ],
             "last_fetched": package.last_fetched,
-            "last_modified_by": last_modified_by,
+            "last_modified_by": github_account(package.last_modified_by),
             "participants": package.participants,
             "pypi_url": package.pypi_url,
-            "pypi_version": package.pypi_version(),
+            "pypi_version": latest_version.number if latest_version else "",
             "repo_description": package.repo_description,
             "repo_forks": package.repo_forks,
             "repo_url": package.repo_url,
             "repo_watchers": package.repo_watchers,
             "resource_uri": reverse("apiv3:package_detail", kwargs={"slug": package.slug}),
-            "usage_count": package.get_usage_count()
-        }
-    )
-    return data
+            "usage_count": package.usage_count,
+        })
+    return resources
 
 
 def user_resource(profile, list_packages=False):
@@ -1 +1,2 @@
 from apiv3.tests.test_resources import *
+from apiv3.tests.test_views import *
@@ -0,0 +1,53 @@
+import json
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from grid.models import Grid, GridPackage
+from package.models import Category, Project, Version
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='App', slug='app')
+        grid = Grid.objects.create(title='A Grid', slug='grid')
+        self.projects = []
+        for i in range(5):
+            project = Project.objects.create(name='Project {}'.format(i), slug='project-{}'.format(i), category=category)
+            GridPackage.objects.create(package=project, grid=grid)
+            Version.objects.create(package=project, number='1.{}'.format(i))
+            self.projects.append(project)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode("utf-8"))
+
+    def test_cursor_pages(self):
+        url = reverse('apiv3:package_list')
+        data = self.get(url + '?limit=2&cursor=')
+        slugs = [package['slug'] for package in data['objects']]
+        while data['meta']['next']:
+            data = self.get(data['meta']['next'])
+            slugs += [package['slug'] for package in data['objects']]
+        self.assertEqual(slugs, [project.slug for project in self.projects])
+        self.assertNotIn('total_count', data['meta'])
+
+    def test_offset_pages(self):
+        data = self.get(reverse('apiv3:package_list') + '?limit=2&offset=2')
+        self.assertEqual(data['meta']['total_count'], 5)
+        self.assertEqual(len(data['objects']), 2)
+
+    def test_constant_queries(self):
+        url = reverse('apiv3:grid_packages_list', kwargs={'slug': 'grid'})
+        self.get(url + '?limit=1&cursor=')
+        with CaptureQueriesContext(connection) as one:
+            data = self.get(url + '?limit=1&cursor=')
+        with CaptureQueriesContext(connection) as five:
+            data = self.get(url + '?limit=5&cursor=')
+        self.assertEqual(len(one), len(five))
+        self.assertEqual(data['objects'][4]['pypi_version'], '1.4')
+        self.assertEqual(data['objects'][0]['grids'], [reverse('apiv3:grid_detail', kwargs={'slug': 'grid'})])
@@ -1,9 +1,12 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
 from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
 
 from jsonview.decorators import json_view
 
 from .resources import (
-        grid_resource, package_resource, category_resource, user_resource
+        PACKAGE_RESOURCE_RELATED, grid_resource, package_resource, package_resources, category_resource, user_resource
     )
 from grid.models import Grid
 from package.models import Project, Category
@@ -45,6 +48,56 @@ def calc_previous(request, limit, offset, count):
     return previous
 
 
+def encode_cursor(pk):
+    return urlsafe_b64encode(str(pk).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """ The pk a cursor points after, ``0`` for an empty or invalid cursor. """
+    try:
+        return int(urlsafe_b64decode(cursor.encode()).decode())
+    except (TypeError, ValueError):
+        return 0
+
+
+def paginate(request, queryset, build):
+    """ Returns the ``meta`` and the ``objects`` of a page of ``queryset``.
+
+        Pages are selected by ``offset`` by default. With a ``cursor`` parameter
+        (empty for the first page) they are selected by keyset instead: ordered
+        by pk and starting after the pk encoded in the cursor, which stays fast
+        on deep pages and needs no total count.
+    """
+    limit = GET_int(request, "limit", 20)
+
+    if "cursor" not in request.GET:
+        count = queryset.count()
+        offset = GET_int(request, "offset", 0)
+        meta = {
+            "limit": limit,
+            "next": calc_next(request, limit, offset, count),
+            "offset": offset,
+            "previous": calc_previous(request, limit, offset, count),
+            "total_count": count
+        }
+        return meta, build(queryset[offset:offset + limit])
+
+    cursor = request.GET["cursor"]
+    page = list(queryset.filter(pk__gt=decode_cursor(cursor)).order_by("pk")[:limit + 1])
+    next = None
+    if len(page) > limit:
+        page = page[:limit]
+        params = request.GET.copy()
+        params["cursor"] = encode_cursor(page[-1].pk)
+        next = "{}?{}".format(request.path, urlencode(sorted(params.items())))
+    meta = {
+        "cursor": cursor,
+        "limit": limit,
+        "next": next,
+    }
+    return meta, build(page)
+
+
 @json_view
 def grid_detail(request, slug):
     grid = get_object_or_404(Grid, slug=slug)
@@ -53,20 +106,16 @@ def grid_detail(request, slug):
 
 @json_view
 def grid_list(request):
-    count = Grid.objects.count()
-    limit = GET_int(request, "limit", 20)
-    offset = GET_int(request, "offset", 0)
+    meta, objects = paginate(
+        request,
+        Grid.objects.prefetch_related('packages'),
+        lambda grids: [grid_resource(x) for x in grids],
+    )
 
     # Return the Data structure
     return {
-        "meta": {
-            "limit": limit,
-            "next": calc_next(request, limit, offset, count),
-            "offset": offset,
-            "previous": calc_previous(request, limit, offset, count),
-            "total_count": count
-        },
-        "objects": [grid_resource(x) for x in Grid.objects.all()[offset:offset + limit]]
+        "meta": meta,
+        "objects": objects
     }
 
 
@@ -79,37 +128,22 @@ def package_detail(request, slug):
 @json_view
 def package_list(request):
     category = request.GET.get("category", None)
+    packages = Project.objects.select_related(*PACKAGE_RESOURCE_RELATED)
     try:
         category = Category.objects.get(slug=category)
-        count = Project.objects.filter(category=category).count()
+        packages = packages.filter(category=category)
     except Category.DoesNotExist:
         category = None
-        count = Project.objects.count()
 
-    limit = GET_int(request, "limit", 20)
-    offset = GET_int(request, "offset", 0)
+    meta, objects = paginate(request, packages, package_resources)
 
     # build the Data structure
-    data = {
-        "meta": {
-            "limit": limit,
-            "next": calc_next(request, limit, offset, count),
-            "offset": offset,
-            "previous": calc_previous(request, limit, offset, count),
-            "total_count": count
-        },
-        "category": None
+    return {
+        "meta": meta,
+        "category": None,
+        "objects": objects
     }
 
-    if category:
-        data['objects'] = [
-            package_resource(x) for x in Project.objects.filter(category=category)[offset:offset + limit]
-        ]
-    else:
-        data['objects'] = [package_resource(x) for x in Project.objects.all()[offset:offset + limit]]
-
-    return data
-
 
 @json_view
 def category_list(request):
@@ -138,21 +172,17 @@ def category_detail(request, slug):
 
 @json_view
 def user_list(request):
-    count = Profile.objects.count()
-    limit = GET_int(request, "limit", 20)
-    offset = GET_int(request, "offset", 0)
     list_packages = request.GET.get("list_packages", False)
+    meta, objects = paginate(
+        request,
+        Profile.objects.select_related('user'),
+        lambda profiles: [user_resource(x, list_packages) for x in profiles],
+    )
 
     # Return the Data structure
     return {
-        "meta": {
-            "limit": limit,
-            "next": calc_next(request, limit, offset, count),
-            "offset": offset,
-            "previous": calc_previous(request, limit, offset, count),
-            "total_count": count
-        },
-        "objects": [user_resource(x, list_packages) for x in Profile.objects.all()[offset:offset + limit]]
+        "meta": meta,
+        "objects": objects
     }
 
 
@@ -165,21 +195,13 @@ def user_detail(request, github_account):
 @json_view
 def grid_packages_list(request, slug):
     grid = get_object_or_404(Grid, slug=slug)
-    packages = Project.objects.filter(grid=grid)
-    count = packages.count()
-    limit = GET_int(request, "limit", 20)
-    offset = GET_int(request, "offset", 0)
+    packages = Project.objects.filter(grid=grid).select_related(*PACKAGE_RESOURCE_RELATED)
+    meta, objects = paginate(request, packages, package_resources)
     # build the Data structure
     data = {
-        "meta": {
-            "limit": limit,
-            "next": calc_next(request, limit, offset, count),
-            "offset": offset,
-            "previous": calc_previous(request, limit, offset, count),
-            "total_count": count
-        },
+        "meta": meta,
         "grid": grid_resource(grid),
-        "objects": [package_resource(x) for x in packages[offset:offset + limit]]
+        "objects": objects
     }
     return data
 
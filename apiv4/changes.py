@@ -0,0 +1,122 @@
+"""
+Change feed of the catalogue, for clients keeping a copy in sync.
+
+Every source (a model, or the tombstones of deleted rows) is read in
+``(modified, id)`` order, on an index, starting after the position the client
+reached. The position of every source is returned as one opaque cursor, so a
+sync costs as much as the changes since the previous one.
+
+Rows are only served once they are ``CHANGE_FEED_DELAY`` seconds old: a row
+saved by a transaction which commits later than one started after it could
+otherwise get a ``modified`` value behind a cursor already handed out.
+
+Tombstones are pruned after ``TOMBSTONE_RETENTION_DAYS`` (``prune_tombstones``),
+so a client whose cursor is older than that misses deletions and must start
+over with a full sync.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from apiv4.models import TRACKED_MODELS, Tombstone
+
+Source = namedtuple('Source', ['model', 'fields'])
+Change = namedtuple('Change', ['kind', 'action', 'modified', 'id', 'data'])
+
+# served fields of the TRACKED_MODELS, by kind
+FIELDS = {
+    'project': OrderedDict([
+        ('id', 'id'), ('slug', 'slug'), ('name', 'name'), ('category', 'category'), ('description', 'description'),
+        ('url', 'url'), ('status', 'status'), ('repo_url', 'repo_url'), ('pypi_url', 'pypi_url'),
+        ('repo_watchers', 'repo_watchers'), ('repo_forks', 'repo_forks'), ('usage_count', 'usage_count'),
+        ('is_published', 'is_published'), ('created', 'created'), ('modified', 'modified'),
+    ]),
+    'grid': OrderedDict([
+        ('id', 'id'), ('slug', 'slug'), ('title', 'title'), ('description', 'description'),
+        ('is_locked', 'is_locked'), ('header', 'header'), ('created', 'created'), ('modified', 'modified'),
+    ]),
+    'feature': OrderedDict([
+        ('id', 'id'), ('grid', 'grid'), ('title', 'title'), ('description', 'description'),
+        ('created', 'created'), ('modified', 'modified'),
+    ]),
+    'element': OrderedDict([
+        ('id', 'id'), ('grid', 'grid_package__grid'), ('project', 'grid_package__package'), ('feature', 'feature'),
+        ('text', 'text'), ('created', 'created'), ('modified', 'modified'),
+    ]),
+    'timeline_event': OrderedDict([
+        ('id', 'id'), ('project', 'project'), ('name', 'name'), ('url', 'url'), ('date', 'date'),
+        ('created', 'created'), ('modified', 'modified'),
+    ]),
+}
+
+# the deletions of the same models are recorded by apiv4.models, a kind without fields fails here
+SOURCES = OrderedDict(
+    (kind, Source(apps.get_model(label), FIELDS[kind])) for kind, label in TRACKED_MODELS.items()
+)
+TOMBSTONE = 'deleted'
+
+
+def encode_cursor(positions):
+    data = dict((kind, [modified.isoformat(), pk]) for kind, (modified, pk) in positions.items())
+    return urlsafe_b64encode(json.dumps(data, sort_keys=True).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """ Positions ``{source: (modified, id)}`` encoded in ``cursor``; raises ``ValueError`` if it is not a cursor. """
+    if not cursor:
+        return {}
+    try:
+        data = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+        return dict((kind, (parse_datetime(modified), int(pk))) for kind, (modified, pk) in data.items())
+    except (TypeError, AttributeError, UnicodeDecodeError) as e:
+        raise ValueError(e)
+
+
+def _after(queryset, position):
+    if position is None:
+        return queryset
+    modified, pk = position
+    # the first condition alone lets the (modified, id) index bound the scan, the OR doesn't
+    return queryset.filter(modified__gte=modified).filter(Q(modified__gt=modified) | Q(id__gt=pk))
+
+
+def _source_changes(kind, source, position, until, limit):
+    fields = list(source.fields.values())
+    rows = _after(source.model.objects.filter(modified__lte=until), position).order_by('modified', 'id')
+    for row in rows.values_list(*fields)[:limit]:
+        data = dict(zip(source.fields.keys(), row))
+        # rows created after the position the client reached are new to it
+        created = position is None or data['created'] > position[0]
+        yield Change(kind, 'created' if created else 'updated', data['modified'], data['id'], data)
+
+
+def _deletions(position, until, limit):
+    rows = _after(Tombstone.objects.filter(modified__lte=until), position).order_by('modified', 'id')
+    for pk, kind, object_id, modified in rows.values_list('id', 'kind', 'object_id', 'modified')[:limit]:
+        yield Change(TOMBSTONE, 'deleted', modified, pk, {'kind': kind, 'id': object_id})
+
+
+def changes_since(cursor, limit):
+    """ Returns ``(changes, cursor, has_more)``: up to ``limit`` changes after ``cursor``, oldest first. """
+    positions = decode_cursor(cursor)
+    until = datetime.now() - timedelta(seconds=settings.CHANGE_FEED_DELAY)
+
+    # the first ``limit`` changes of all sources are among the first ``limit`` of each
+    changes = []
+    for kind, source in SOURCES.items():
+        changes.extend(_source_changes(kind, source, positions.get(kind), until, limit + 1))
+    changes.extend(_deletions(positions.get(TOMBSTONE), until, limit + 1))
+    changes.sort(key=lambda change: (change.modified, change.kind, change.id))
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    for change in changes:
+        positions[change.kind] = (change.modified, change.id)
+    return changes, encode_cursor(positions), has_more
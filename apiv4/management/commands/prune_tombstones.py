@@ -0,0 +1,16 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apiv4.models import Tombstone
+
+
+class Command(BaseCommand):
+
+    help = "Deletes the change feed tombstones older than TOMBSTONE_RETENTION_DAYS"
+
+    def handle(self, *args, **options):
+        cutoff = datetime.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+        deleted, __ = Tombstone.objects.filter(modified__lt=cutoff).delete()
+        self.stdout.write("{} tombstones deleted".format(deleted))
@@ -1,3 +1,40 @@
+from collections import OrderedDict
+
 from django.db import models
+from django.db.models.signals import post_delete
+from django.utils.translation import ugettext_lazy as _
+
+from core.models import BaseModel
+
+
+class Tombstone(BaseModel):
+    """ Record of a deleted row, served by the change feed as a deletion. """
+
+    kind = models.CharField(_("Kind"), max_length=40)
+    object_id = models.IntegerField(_("Object ID"))
+
+    class Meta:
+        indexes = [models.Index(fields=['modified', 'id'], name='apiv4_tombstone_modified')]
+
+    def __str__(self):
+        return "{}:{}".format(self.kind, self.object_id)
+
+
+# models served by the change feed, by kind, in the order of the feed; apiv4.changes
+# serves the fields listed there for each of them
+TRACKED_MODELS = OrderedDict([
+    ('project', 'package.Project'),
+    ('grid', 'grid.Grid'),
+    ('feature', 'grid.Feature'),
+    ('element', 'grid.Element'),
+    ('timeline_event', 'timeline.TimelineEvent'),
+])
+TRACKED_KINDS = dict((label, kind) for kind, label in TRACKED_MODELS.items())
+
+
+def record_deletion(sender, instance, **kwargs):
+    Tombstone.objects.create(kind=TRACKED_KINDS[sender._meta.label], object_id=instance.pk)
+
 
-# Create your models here.
+for kind, label in TRACKED_MODELS.items():
+    post_delete.connect(record_deletion, sender=label, dispatch_uid="apiv4.tombstone.{}".format(kind))
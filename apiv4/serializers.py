@@ -118,7 +118,7 @@ class SearchV2Serializer(serializers.ModelSerializer):
 
     class Meta:
         model = SearchV2
-        exclude = ['id', ]
+        exclude = ['id', 'search_vector', ]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -1,3 +1,94 @@
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
 from django.test import TestCase
+from django.test.utils import override_settings
+
+from apiv4.changes import SOURCES
+from apiv4.models import TRACKED_MODELS, Tombstone
+from grid.models import Grid
+from package.models import Project
+from package.tests.factories import make_project
+
+
+@override_settings(CHANGE_FEED_DELAY=0)
+class ChangeFeedTests(TestCase):
+
+    def setUp(self):
+        self.project = make_project()
+        self.grid = Grid.objects.create(title='A Grid', slug='grid')
+
+    def get(self, since='', **params):
+        params['since'] = since
+        response = self.client.get(reverse('apiv4:changes-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode("utf-8"))
+
+    def changes(self, data):
+        return [(change['type'], change['action'], change['id']) for change in data['changes']]
+
+    def test_full_sync(self):
+        data = self.get()
+        self.assertEqual(self.changes(data), [
+            ('project', 'created', self.project.pk),
+            ('grid', 'created', self.grid.pk),
+        ])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.get(data['since'])['changes'], [])
+
+    def test_updated_and_deleted(self):
+        since = self.get()['since']
+        self.project.description = 'Changed'
+        self.project.save()
+        grid_pk = self.grid.pk
+        self.grid.delete()
+
+        data = self.get(since)
+        self.assertEqual(self.changes(data), [
+            ('project', 'updated', self.project.pk),
+            ('grid', 'deleted', grid_pk),
+        ])
+        self.assertEqual(data['changes'][0]['data']['description'], 'Changed')
+
+    def test_pages(self):
+        for i in range(3):
+            make_project('Project {}'.format(i), 'project-{}'.format(i))
+
+        data = self.get(limit=2)
+        seen = self.changes(data)
+        while data['has_more']:
+            self.assertIn('since=', data['next'])
+            data = self.get(data['since'], limit=2)
+            seen += self.changes(data)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('apiv4:changes-list'), {'since': 'not a cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_same_modified(self):
+        projects = [
+            make_project('Project {}'.format(i), 'project-{}'.format(i))
+            for i in range(3)
+        ]
+        Project.objects.filter(pk__in=[project.pk for project in projects]).update(modified=self.project.modified)
+
+        since = self.get(limit=2)['since']
+        self.assertEqual(self.changes(self.get(since, limit=2))[0], ('project', 'created', projects[1].pk))
+
+    def test_sources_match_tracked_models(self):
+        self.assertEqual(list(SOURCES.keys()), list(TRACKED_MODELS.keys()))
+
+    def test_prune_tombstones(self):
+        grid_pk = self.grid.pk
+        self.grid.delete()
+        Tombstone.objects.create(kind='grid', object_id=0)
+        Tombstone.objects.filter(object_id=0).update(modified=datetime.now() - timedelta(days=91))
 
-# Create your tests here.
+        with self.settings(TOMBSTONE_RETENTION_DAYS=90):
+            call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('kind', 'object_id')), [('grid', grid_pk)])
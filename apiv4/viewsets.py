@@ -3,13 +3,16 @@ from django.shortcuts import get_object_or_404
 from rest_framework import mixins
 from rest_framework.response import Response
 from rest_framework import routers
+from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.utils.urls import replace_query_param
 
 from grid.models import Grid
 from package.models import Project, Category
 from searchv2.models import SearchV2
 from searchv2.views import search_function
 
+from .changes import TOMBSTONE, changes_since
 from .serializers import (
     CategorySerializer,
     PackageSerializer,
@@ -53,8 +56,52 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     paginate_by = 20
 
 
+class ChangeFeedViewSet(viewsets.ViewSet):
+    """Created, updated and deleted projects, grids, features, elements and
+        timeline events, oldest first. Accepts a 'since' GET parameter: the
+        cursor returned by the previous call, or nothing for a full sync.
+        Deletions are kept for TOMBSTONE_RETENTION_DAYS, a client whose cursor
+        is older must do a full sync.
+    """
+    default_limit = 100
+    max_limit = 1000
+
+    def list(self, request):
+        try:
+            limit = min(int(request.GET.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        try:
+            changes, cursor, has_more = changes_since(request.GET.get('since', ''), max(limit, 1))
+        except ValueError:
+            return Response({'detail': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'since': cursor,
+            'has_more': has_more,
+            'next': replace_query_param(request.build_absolute_uri(), 'since', cursor) if has_more else None,
+            'changes': [
+                {
+                    'type': change.data['kind'],
+                    'action': change.action,
+                    'id': change.data['id'],
+                    'modified': change.modified,
+                    'data': None,
+                } if change.kind == TOMBSTONE else {
+                    'type': change.kind,
+                    'action': change.action,
+                    'id': change.id,
+                    'modified': change.modified,
+                    'data': change.data,
+                }
+                for change in changes
+            ],
+        })
+
+
 router = routers.DefaultRouter()
 router.register(r'packages', PackageViewSet)
 router.register(r'search', SearchV2ViewSet)
 router.register(r'grids', GridViewSet)
 router.register(r'categories', CategoryViewSet)
+router.register(r'changes', ChangeFeedViewSet, base_name='changes')
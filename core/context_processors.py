@@ -1,9 +1,8 @@
 from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.db.models import Max
 from django.utils.html import escape
 
-from searchv2.models import SearchV2
+from searchv2.models import max_search_weight
 
 
 def core_values(request):
@@ -14,7 +13,7 @@ def core_values(request):
     data = {
         'SITE_TITLE': getattr(settings, "SITE_TITLE"),
         'FRAMEWORK_NAME': getattr(settings, "FRAMEWORK_NAME"),
-        'MAX_WEIGHT': SearchV2.objects.all().aggregate(Max('weight'))['weight__max'],
+        'MAX_WEIGHT': max_search_weight.get(),
         'PROJECT_GITHUB_REPOSITORY_URL': getattr(settings, 'PROJECT_GITHUB_REPOSITORY_URL'),
         'PROJECT_SLUG_ON_PAGE': getattr(settings, 'PROJECT_SLUG_ON_PAGE')
     }
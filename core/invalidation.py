@@ -0,0 +1,174 @@
+"""
+Declarative cache invalidation.
+
+Cached values declare the models they are computed from. Saving or deleting a
+row of such a model (or adding and removing many-to-many links) marks the
+dependent cache keys stale. Stale keys are collected while a transaction is
+open and deleted together once it commits; the values are recomputed lazily,
+by the next reader.
+
+Usage on a model method::
+
+    @cached_method(("package.Commit", "package_id"))
+    def last_updated(self):
+        ...
+
+and for anything else::
+
+    depends_on("package.Version", lambda version: [some_key(version.package_id)])
+    depends_on_m2m(Project.usage.through, lambda project_pks, user_pks: [...])
+
+Other caches which are not dropped key by key (like the grid page
+generations) register a handler and ``schedule`` items for it; they are
+applied on commit together with the stale keys.
+"""
+
+import threading
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+CACHE_KEYS = "cache_keys"
+
+_dependencies = defaultdict(list)
+_m2m_dependencies = defaultdict(list)
+_handlers = {}
+_pending = threading.local()
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label
+
+
+def depends_on(model, keys_for):
+    """ ``keys_for(instance)`` returns the cache keys stale after ``instance`` of ``model`` changes. """
+    label = _label(model)
+    _dependencies[label].append(keys_for)
+    # receivers only for the models something depends on: the deletes of the
+    # other models stay fast, without fetching and signalling row by row
+    post_save.connect(_on_change, sender=model, dispatch_uid="core.invalidation.post_save.{}".format(label))
+    post_delete.connect(_on_change, sender=model, dispatch_uid="core.invalidation.post_delete.{}".format(label))
+
+
+def depends_on_m2m(through, keys_for):
+    """ ``keys_for(source_pks, target_pks)`` returns the cache keys stale after links
+        between the given rows of the model declaring the many-to-many field (source)
+        and of the related model (target) are added or removed.
+    """
+    label = _label(through)
+    _m2m_dependencies[label].append(keys_for)
+    m2m_changed.connect(_on_m2m_changed, sender=through, dispatch_uid="core.invalidation.m2m_changed.{}".format(label))
+
+
+def register_handler(kind, apply):
+    """ ``apply(items)`` gets the set of the items scheduled for ``kind`` once their transaction commits. """
+    _handlers[kind] = apply
+
+
+def _pending_items():
+    if not hasattr(_pending, 'items'):
+        _pending.items = defaultdict(set)
+    return _pending.items
+
+
+def schedule(kind, *items):
+    """ Hands ``items`` to the handler of ``kind`` when the current transaction commits
+        (right away in autocommit mode).
+    """
+    if not items:
+        return
+    _pending_items()[kind].update(items)
+    # every registered callback drains all the pending items, so whatever a
+    # transaction touched is applied once, by the first callback on commit
+    transaction.on_commit(flush)
+
+
+def invalidate(*keys):
+    """ Deletes ``keys`` when the current transaction commits (right away in autocommit mode). """
+    schedule(CACHE_KEYS, *[key for key in keys if key is not None])
+
+
+def flush():
+    pending = _pending_items()
+    if not pending:
+        return
+    _pending.items = defaultdict(set)
+    for kind, items in pending.items():
+        if items:
+            _handlers[kind](items)
+
+
+register_handler(CACHE_KEYS, lambda keys: cache.delete_many(list(keys)))
+
+
+MISSING = object()
+
+
+def cached_method(*dependencies, **kwargs):
+    """ Caches the result of a model method under ``<Class>.<method>:<pk>``.
+
+        ``dependencies`` are ``(model label, field)`` pairs; a change to a row of
+        that model invalidates the cache of the instance whose pk is in ``field``.
+        The decorated method gets an ``invalidate(pk)`` attribute for code paths
+        that bypass model signals, like ``bulk_create``.
+
+        Values expire after ``timeout`` seconds (``CACHED_METHOD_TIMEOUT`` by
+        default): a reader which computed a value before a concurrent change
+        committed may store it after the invalidation.
+    """
+    timeout = kwargs.pop('timeout', None)
+
+    def decorator(method):
+
+        def cache_key(pk):
+            return "{}:{}".format(method.__qualname__, pk)
+
+        @wraps(method)
+        def wrapper(self):
+            key = cache_key(self.pk)
+            # values are stored boxed, so a computed None is cached as well
+            cached = cache.get(key, MISSING)
+            if cached is not MISSING:
+                return cached[0]
+            value = method(self)
+            cache.set(key, (value,), timeout if timeout is not None else settings.CACHED_METHOD_TIMEOUT)
+            return value
+
+        for model, field in dependencies:
+            depends_on(model, lambda instance, field=field: [
+                cache_key(getattr(instance, field))
+            ] if getattr(instance, field) is not None else [])
+
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = lambda pk: invalidate(cache_key(pk))
+        return wrapper
+
+    return decorator
+
+
+def _on_change(sender, instance, **kwargs):
+    for keys_for in _dependencies.get(sender._meta.label, ()):
+        invalidate(*keys_for(instance))
+
+
+def _through_field(through, model):
+    return next(field.attname for field in through._meta.fields if field.related_model is model)
+
+
+def _on_m2m_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    declarations = _m2m_dependencies.get(sender._meta.label)
+    if not declarations or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        pk_set = sender.objects.filter(
+            **{_through_field(sender, type(instance)): instance.pk}
+        ).values_list(_through_field(sender, model), flat=True)
+    pks = list(pk_set)
+    source_pks, target_pks = (pks, [instance.pk]) if reverse else ([instance.pk], pks)
+    for keys_for in declarations:
+        invalidate(*keys_for(source_pks, target_pks))
+
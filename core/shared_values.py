@@ -0,0 +1,63 @@
+"""
+Versioned cache entries, and values computed once and shared by every worker.
+
+A version key names the current state of something cached: whatever was
+stored for one version is never served for another. Dropping the key (with
+``core.invalidation.invalidate``, once the transaction commits) makes the next
+reader start a new version. Versions are random, so a version is never reused,
+even if its key gets evicted or the cache is flushed.
+
+A shared value lives in the cache together with the version it was computed
+for. Each process also keeps the last value it read, so a request costs a
+single cache read of the version as long as nothing changed.
+"""
+
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from core.invalidation import invalidate
+
+
+def current_versions(keys):
+    """ Current ``{key: version}`` of the version ``keys``, starting a version for the missing ones. """
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def current_version(key):
+    return current_versions([key])[key]
+
+
+class SharedValue(object):
+
+    def __init__(self, name, compute, timeout=None):
+        self.version_key = "shared_value:{}:version".format(name)
+        self.value_key = "shared_value:{}".format(name)
+        self.compute = compute
+        self.timeout = timeout
+        self._local = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = current_version(self.version_key)
+        local = self._local
+        if local is not None and local[0] == version:
+            return local[1]
+
+        with self._lock:
+            shared = cache.get(self.value_key)
+            if shared is None or shared[0] != version:
+                shared = (version, self.compute())
+                cache.set(self.value_key, shared, self.timeout)
+            self._local = shared
+        return shared[1]
+
+    def invalidate(self):
+        invalidate(self.version_key)
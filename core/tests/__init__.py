@@ -1 +1,3 @@
 from core.tests.test_utils import *
+from core.tests.test_invalidation import *
+from core.tests.test_shared_values import *
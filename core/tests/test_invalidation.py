@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.deletion import Collector
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from core import invalidation
+from package.models import Category, Commit, Project, Version, used_packages_cache_key
+from searchv2.models import SearchV2
+
+
+class InvalidationTest(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.project = Project.objects.create(name='Project', slug='project', category=category)
+        # test cases run inside a transaction, so nothing is ever committed
+        invalidation.flush()
+
+    def test_cached_method(self):
+        self.assertIsNone(self.project.last_updated())
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.project.last_updated())
+
+        commit_date = datetime(2018, 1, 1)
+        Commit.objects.create(package=self.project, commit_hash='a', commit_date=commit_date)
+        invalidation.flush()
+        self.assertEqual(self.project.last_updated(), commit_date)
+
+    def test_coalesced_per_transaction(self):
+        self.project.last_released()
+        self.project.pypi_version()
+        with patch.object(invalidation.cache, 'delete_many') as delete_many:
+            for i in range(50):
+                Version.objects.create(
+                    package=self.project,
+                    number='1.{}'.format(i),
+                    upload_time=datetime.now() - timedelta(days=50 - i),
+                )
+            invalidation.flush()
+        delete_many.assert_called_once()
+        self.assertEqual(len(delete_many.call_args[0][0]), 2)
+
+    def test_m2m(self):
+        user = User.objects.create_user('user', password='user')
+        key = used_packages_cache_key(user.pk)
+        cache.set(key, [])
+        self.project.usage.add(user)
+        invalidation.flush()
+        self.assertIsNone(cache.get(key))
+
+        cache.set(key, [self.project.pk])
+        user.project_set.clear()
+        invalidation.flush()
+        self.assertIsNone(cache.get(key))
+
+    def test_receivers_only_for_dependencies(self):
+        # models nothing depends on keep their fast bulk deletes
+        self.assertTrue(Collector(using='default').can_fast_delete(SearchV2.objects.all()))
+        self.assertFalse(Collector(using='default').can_fast_delete(Version.objects.all()))
+
+    @override_settings(CACHED_METHOD_TIMEOUT=123)
+    def test_cached_method_timeout(self):
+        cache.delete(Project.last_updated.cache_key(self.project.pk))
+        with patch.object(invalidation.cache, 'set') as cache_set:
+            self.project.last_updated()
+        self.assertEqual(cache_set.call_args[0][2], 123)
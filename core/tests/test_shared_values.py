@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from core import invalidation
+from core.shared_values import SharedValue, current_version
+from package.models import Category, Project, approval_queue
+
+
+class SharedValueTest(TestCase):
+
+    def setUp(self):
+        self.computed = 0
+        self.value = SharedValue("test_value", self.compute)
+        self.value.invalidate()
+        invalidation.flush()
+
+    def compute(self):
+        self.computed += 1
+        return self.computed
+
+    def test_computed_once(self):
+        self.assertEqual(self.value.get(), 1)
+        self.assertEqual(self.value.get(), 1)
+        # another process reads the shared copy
+        self.assertEqual(SharedValue("test_value", self.compute).get(), 1)
+        self.assertEqual(self.computed, 1)
+
+    def test_invalidate(self):
+        self.value.get()
+        self.value.invalidate()
+        self.assertEqual(self.value.get(), 1)
+        invalidation.flush()
+        self.assertEqual(self.value.get(), 2)
+
+    def test_versions_not_reused(self):
+        version = current_version(self.value.version_key)
+        self.assertEqual(current_version(self.value.version_key), version)
+        self.value.invalidate()
+        invalidation.flush()
+        self.assertNotEqual(current_version(self.value.version_key), version)
+
+    def test_approval_queue(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        project = Project.objects.create(name='first', slug='first', category=category)
+        invalidation.flush()
+        self.assertEqual(approval_queue.get(), [])
+
+        project.is_awaiting_approval = True
+        project.save()
+        invalidation.flush()
+        self.assertEqual([request.slug for request in approval_queue.get()], ['first'])
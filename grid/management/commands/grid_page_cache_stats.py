@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from grid.page_cache import reset_stats, stats
+
+
+class Command(BaseCommand):
+
+    help = "Shows the hit rate and the invalidation count of the grid page cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            default=False,
+            help="Reset the counters after printing them",
+        )
+
+    def handle(self, *args, **options):
+        values = stats()
+        hit_rate = values['hit_rate']
+        self.stdout.write("hits: {hits}\nmisses: {misses}\ninvalidations: {invalidations}".format(**values))
+        self.stdout.write("hit rate: {}".format("n/a" if hit_rate is None else "{:.1%}".format(hit_rate)))
+        if options['reset']:
+            reset_stats()
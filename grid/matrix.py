@@ -0,0 +1,155 @@
+"""
+Package x attribute matrix behind the grid detail pages.
+
+Every value shown in a grid is resolved for all of its packages at once, with
+a fixed number of queries, instead of going through the per-package model
+methods (and their cache lookups) once per cell.
+"""
+
+from collections import defaultdict, namedtuple
+
+from django.db.models import Max
+from django.template.defaultfilters import truncatewords
+from django.utils.html import format_html
+
+from grid.models import Element
+from package.models import Commit, Version, rebuild_missing_commit_weeks
+from package.repos import get_repo_for_repo_url
+
+# These attributes are how we determine what is displayed in the grid
+DEFAULT_ATTRIBUTES = [
+    ('repo_description', 'Description'),
+    ('category', 'Category'),
+    ('pypi_downloads', 'Downloads'),
+    ('last_updated', 'Last Updated'),
+    ('pypi_version', 'Version'),
+    ('repo', 'Repo'),
+    ('commits_over_52', 'Commits'),
+    ('repo_watchers', 'Stars'),
+    ('repo_forks', 'Forks'),
+    ('participant_list', 'Participants'),
+    ('license_latest', 'License'),
+]
+
+COMMITS_SPARKLINE = (
+    '<img class="package-githubcommits" '
+    'src="https://chart.googleapis.com/chart?cht=bvg&chs=105x20&chd=t:{}&chco=666666&chbh=1,1,1&chds=0,20" />'
+)
+
+Cell = namedtuple('Cell', ['grid_package', 'name', 'value', 'display'])
+AttributeRow = namedtuple('AttributeRow', ['name', 'label', 'cells'])
+FeatureRow = namedtuple('FeatureRow', ['feature', 'cells'])
+PackageRow = namedtuple('PackageRow', ['grid_package', 'values', 'cells', 'elements'])
+
+
+class Repo(namedtuple('Repo', ['title', 'url', 'is_other'])):
+    """ What a grid shows of a repository handler. Unlike the handlers, which
+        hold locks, it can be pickled into the page cache.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def for_repo_url(cls, repo_url):
+        handler = get_repo_for_repo_url(repo_url)
+        return cls(handler.title, handler.url, handler.is_other)
+
+    def __str__(self):
+        return self.title
+
+
+def commits_sparkline(commits):
+    return format_html(COMMITS_SPARKLINE, commits)
+
+
+DISPLAY = {
+    'repo_description': lambda value: truncatewords(value, 20),
+    'commits_over_52': commits_sparkline,
+}
+
+
+def resolve_package_attributes(projects):
+    """ Returns ``{project pk: {attribute name: value}}`` for all ``DEFAULT_ATTRIBUTES``. """
+    pks = [project.pk for project in projects]
+
+    last_updated = dict(
+        Commit.objects.filter(package__in=pks).values('package').annotate(
+            last=Max('commit_date')
+        ).values_list('package', 'last')
+    )
+
+    versions = defaultdict(list)
+    for package_id, number, license, upload_time, sort_key, is_comparable in Version.objects.filter(
+            package__in=pks).values_list('package', 'number', 'license', 'upload_time', 'sort_key', 'is_comparable'):
+        versions[package_id].append((number, license, upload_time, sort_key, is_comparable))
+
+    rebuild_missing_commit_weeks(projects)
+
+    repos = {}
+    values = {}
+    for project in projects:
+        project_versions = versions[project.pk]
+        released = [version for version in project_versions if version[2] is not None]
+        latest = max(released, key=lambda version: version[2]) if released else None
+        comparable = [version for version in project_versions if version[4]]
+        pypi_version = max(comparable, key=lambda version: version[3])[0] if comparable else ''
+        if project.repo_url not in repos:
+            repos[project.repo_url] = Repo.for_repo_url(project.repo_url)
+
+        values[project.pk] = {
+            'repo_description': project.repo_description,
+            'category': project.category,
+            'pypi_downloads': project.pypi_downloads,
+            'last_updated': last_updated.get(project.pk),
+            'pypi_version': pypi_version,
+            'repo': repos[project.repo_url],
+            'commits_over_52': project.commits_over_52(),
+            'repo_watchers': project.repo_watchers,
+            'repo_forks': project.repo_forks,
+            'participant_list': project.participant_list(),
+            'license_latest': latest[1] if latest else "UNKNOWN",
+        }
+    return values
+
+
+class GridMatrix(object):
+    """ Resolved cells of a grid, readable by attribute (``attribute_rows``,
+        ``attributes``), by feature (``feature_rows``) or by package (``rows``).
+
+        Feature rows hold ``(grid_package, element)`` pairs and package rows
+        ``(feature, element)`` pairs; ``element`` is ``None`` for empty cells.
+    """
+
+    def __init__(self, grid_packages, features, attributes=DEFAULT_ATTRIBUTES):
+        self.grid_packages = list(grid_packages)
+        self.features = list(features)
+
+        values = resolve_package_attributes([grid_package.package for grid_package in self.grid_packages])
+
+        elements = {}
+        for element in Element.objects.filter(feature__in=self.features, grid_package__in=self.grid_packages):
+            elements[(element.feature_id, element.grid_package_id)] = element
+
+        def cell(grid_package, name):
+            value = values[grid_package.package_id][name]
+            return Cell(grid_package, name, value, DISPLAY.get(name, lambda value: value)(value))
+
+        self.attribute_rows = [
+            AttributeRow(name, label, [cell(grid_package, name) for grid_package in self.grid_packages])
+            for name, label in attributes
+        ]
+        self.attributes = dict((row.name, row) for row in self.attribute_rows)
+        self.feature_rows = [
+            FeatureRow(feature, [
+                (grid_package, elements.get((feature.pk, grid_package.pk))) for grid_package in self.grid_packages
+            ])
+            for feature in self.features
+        ]
+        self.rows = [
+            PackageRow(
+                grid_package,
+                values[grid_package.package_id],
+                [cell(grid_package, name) for name, label in attributes],
+                [(feature, elements.get((feature.pk, grid_package.pk))) for feature in self.features],
+            )
+            for grid_package in self.grid_packages
+        ]
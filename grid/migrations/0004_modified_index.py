@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grid', '0003_grid_is_draft'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grid',
+            index=models.Index(fields=['modified', 'id'], name='grid_grid_modified'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['modified', 'id'], name='grid_feature_modified'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['modified', 'id'], name='grid_element_modified'),
+        ),
+    ]
@@ -1,10 +1,10 @@
-from django.core.cache import cache
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
 from core.models import BaseModel
-from grid.utils import make_template_fragment_key
+from grid.page_cache import invalidate_feature, invalidate_grid
 from package.models import Project
+from searchv2.autocomplete import invalidate_autocomplete_index
 
 
 class Grid(BaseModel):
@@ -43,24 +43,27 @@ class Grid(BaseModel):
         """ Gets all the packages and orders them for views and other things
          """
         gp = self.gridpackage_set.filter(package__is_published=True).select_related()
-        grid_packages = gp.annotate(usage_count=models.Count('package__usage')).order_by('-usage_count', 'package')
+        grid_packages = gp.annotate(usage_count=models.F('package__usage_count')).order_by('-usage_count', 'package')
         return grid_packages
 
     def save(self, *args, **kwargs):
-        self.grid_packages  # fire the cache
-        self.clear_detail_template_cache()  # Delete the template fragment cache
         super(Grid, self).save(*args, **kwargs)
+        invalidate_grid(self.pk)
+        invalidate_autocomplete_index()
+
+    def delete(self, *args, **kwargs):
+        invalidate_grid(self.pk)
+        result = super(Grid, self).delete(*args, **kwargs)
+        invalidate_autocomplete_index()
+        return result
 
     @models.permalink
     def get_absolute_url(self):
         return ("grid", [self.slug])
 
-    def clear_detail_template_cache(self):
-        key = make_template_fragment_key("detail_template_cache", [self.pk, ])
-        cache.delete(key)
-
     class Meta:
         ordering = ['title']
+        indexes = [models.Index(fields=['modified', 'id'], name='grid_grid_modified')]
 
 
 class GridPackage(BaseModel):
@@ -85,9 +88,12 @@ class GridPackage(BaseModel):
         verbose_name_plural = 'Grid Packages'
 
     def save(self, *args, **kwargs):
-        self.grid.grid_packages  # fire the cache
-        self.grid.clear_detail_template_cache()
         super(GridPackage, self).save(*args, **kwargs)
+        invalidate_grid(self.grid_id)
+
+    def delete(self, *args, **kwargs):
+        invalidate_grid(self.grid_id)
+        return super(GridPackage, self).delete(*args, **kwargs)
 
     def __str__(self):
         return '%s : %s' % (self.grid.slug, self.package.slug)
@@ -106,10 +112,16 @@ class Feature(BaseModel):
     title = models.CharField(_('Title'), max_length=100)
     description = models.TextField(_('Description'), blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['modified', 'id'], name='grid_feature_modified')]
+
     def save(self, *args, **kwargs):
-        self.grid.grid_packages  # fire the cache
-        self.grid.clear_detail_template_cache()
         super(Feature, self).save(*args, **kwargs)
+        invalidate_grid(self.grid_id)
+
+    def delete(self, *args, **kwargs):
+        invalidate_grid(self.grid_id)
+        return super(Feature, self).delete(*args, **kwargs)
 
     def __str__(self):
         return '%s : %s' % (self.grid.slug, self.title)
@@ -140,10 +152,15 @@ class Element(BaseModel):
     class Meta:
 
         ordering = ["-id"]
+        indexes = [models.Index(fields=['modified', 'id'], name='grid_element_modified')]
 
     def save(self, *args, **kwargs):
-        self.feature.save()  # fire grid_packages cache
         super(Element, self).save(*args, **kwargs)
+        invalidate_feature(self.feature_id)
+
+    def delete(self, *args, **kwargs):
+        invalidate_feature(self.feature_id)
+        return super(Element, self).delete(*args, **kwargs)
 
     def __str__(self):
         return '%s : %s : %s' % (self.grid_package.grid.slug, self.grid_package.package.slug, self.feature.title)
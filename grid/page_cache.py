@@ -0,0 +1,125 @@
+"""
+Cache of the resolved grid detail pages, with dependency tracking.
+
+Cached pages are stored under a per-grid generation (a version of
+``core.shared_values``); adding a project to a grid, or changing the grid or
+one of its features (or an element of one), starts a new generation of the
+grid. Every project has a generation of its own as well, renewed when the
+project or one of its versions changes; a cached page remembers the
+generations of all the projects of its grid (published or not), read before
+it was built, and is rebuilt once one of them moved on. So a page built
+concurrently with a change is never served after the change is committed.
+
+Invalidations are scheduled through ``core.invalidation``, so they are applied
+once, when the transaction commits.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import invalidation
+from core.shared_values import current_version, current_versions
+
+PAGE_KEY = "grid_page:{grid}:{variant}:{generation}"
+GENERATION_KEY = "grid_page:generation:{}"
+PROJECT_GENERATION_KEY = "grid_page:project_generation:{}"
+FEATURE_GRID_KEY = "grid_page:feature_grid:{}"
+
+HITS_KEY = "grid_page:stats:hits"
+MISSES_KEY = "grid_page:stats:misses"
+INVALIDATIONS_KEY = "grid_page:stats:invalidations"
+
+GRID_PAGES = "grid_pages"
+
+
+def _count(key, delta=1):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def _project_generation_keys(grid):
+    # Import placed here to avoid circular dependencies
+    from grid.models import GridPackage
+
+    # every project of the grid, so that publishing one invalidates the page as well
+    return [
+        PROJECT_GENERATION_KEY.format(project_id)
+        for project_id in GridPackage.objects.filter(grid=grid).values_list('package_id', flat=True)
+    ]
+
+
+def get_grid_page(grid, variant, build):
+    """ Returns the cached ``build()`` result for ``grid``, building and caching it on a miss.
+
+        ``build`` must return a :class:`~grid.matrix.GridMatrix`; its features
+        and the projects of the grid are recorded as the dependencies of the
+        cached page.
+    """
+    key = PAGE_KEY.format(grid=grid.pk, variant=variant, generation=current_version(GENERATION_KEY.format(grid.pk)))
+    cached = cache.get(key)
+    if cached is not None:
+        matrix, project_generations = cached
+        if cache.get_many(list(project_generations.keys())) == project_generations:
+            _count(HITS_KEY)
+            return matrix
+        _count(INVALIDATIONS_KEY)
+
+    _count(MISSES_KEY)
+    # read before building, so a project changed meanwhile leaves the page stale
+    project_generations = current_versions(_project_generation_keys(grid))
+    matrix = build()
+    cache.set(key, (matrix, project_generations), settings.GRID_PAGE_CACHE_TIMEOUT)
+    cache.set_many(dict((FEATURE_GRID_KEY.format(feature.pk), grid.pk) for feature in matrix.features), None)
+    return matrix
+
+
+def invalidate_grid(grid_id):
+    invalidation.schedule(GRID_PAGES, ('grid', grid_id))
+
+
+def invalidate_project(project_id):
+    invalidation.schedule(GRID_PAGES, ('project', project_id))
+
+
+def invalidate_feature(feature_id):
+    invalidation.schedule(GRID_PAGES, ('feature', feature_id))
+
+
+def flush():
+    """ Applies the pending invalidations right away. """
+    invalidation.flush()
+
+
+def _apply(changes):
+    grids = set(pk for kind, pk in changes if kind == 'grid')
+    features = [pk for kind, pk in changes if kind == 'feature']
+    grids.update(cache.get_many([FEATURE_GRID_KEY.format(pk) for pk in features]).values())
+
+    if grids:
+        _count(INVALIDATIONS_KEY, len(grids))
+
+    # the pages of the projects are found stale when read
+    cache.delete_many([GENERATION_KEY.format(grid_id) for grid_id in grids] + [
+        PROJECT_GENERATION_KEY.format(pk) for kind, pk in changes if kind == 'project'
+    ])
+
+
+invalidation.register_handler(GRID_PAGES, _apply)
+
+
+def stats():
+    values = cache.get_many([HITS_KEY, MISSES_KEY, INVALIDATIONS_KEY])
+    hits = values.get(HITS_KEY, 0)
+    misses = values.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': float(hits) / (hits + misses) if hits + misses else None,
+        'invalidations': values.get(INVALIDATIONS_KEY, 0),
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY, INVALIDATIONS_KEY])
@@ -6,6 +6,7 @@ from django.conf import settings
 from django.template.defaultfilters import escape, truncatewords
 from django.template.loader import render_to_string
 
+from grid.matrix import commits_sparkline
 
 import re
 
@@ -111,7 +112,7 @@ def style_title(value):
 
 
 def style_commits(value):
-    return render_to_string('grid/snippets/_commits.html', {'value': value})
+    return commits_sparkline(value)
 
 
 @register.filter
@@ -4,3 +4,5 @@ from grid.tests.test_views import FunctionalGridTest, RegressionGridTest, \
                                   GridPackagePermissionTest, \
                                   GridFeaturePermissionTest, \
                                   GridElementPermissionTest
+from grid.tests.test_matrix import GridMatrixTest
+from grid.tests.test_page_cache import GridPageCacheTest
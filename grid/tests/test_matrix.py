@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+
+from grid.matrix import GridMatrix
+from grid.models import Element, Feature, Grid, GridPackage
+from package.models import Category, Commit, Project, Version
+
+
+class GridMatrixTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(title='dummy', slug='dummy')
+        self.grid = Grid.objects.create(title='Grid', slug='grid')
+        self.feature = Feature.objects.create(grid=self.grid, title='Feature')
+
+    def add_package(self, name):
+        project = Project.objects.create(name=name, slug=name, category=self.category, is_published=True)
+        grid_package = GridPackage.objects.create(grid=self.grid, package=project)
+        Version.objects.create(package=project, number='1.0', license='BSD', upload_time=datetime.now())
+        Commit.objects.create(package=project, commit_hash=name, commit_date=datetime.now() - timedelta(days=3))
+        Element.objects.create(feature=self.feature, grid_package=grid_package, text='yes')
+        return project
+
+    def build(self):
+        return GridMatrix(self.grid.grid_packages, self.grid.feature_set.all())
+
+    def test_values(self):
+        self.add_package('first')
+        matrix = self.build()
+        self.assertEqual(matrix.attributes['pypi_version'].cells[0].value, '1.0')
+        self.assertEqual(matrix.attributes['license_latest'].cells[0].value, 'BSD')
+        self.assertEqual(matrix.attributes['commits_over_52'].cells[0].value.split(',')[-1], '1')
+        self.assertIn('chd=t:', matrix.attributes['commits_over_52'].cells[0].display)
+        (feature, element), = matrix.rows[0].elements
+        self.assertEqual(element.text, 'yes')
+
+    def test_queries_do_not_depend_on_grid_size(self):
+        self.add_package('first')
+        self.build()  # stores the commit histograms
+        with self.assertNumQueries(5):
+            self.build()
+
+        for name in ['second', 'third', 'fourth']:
+            self.add_package(name)
+        self.build()
+        with self.assertNumQueries(5):
+            self.build()
@@ -0,0 +1,109 @@
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from grid import page_cache
+from grid.matrix import GridMatrix
+from grid.models import Element, Feature, Grid, GridPackage
+from package.models import Category, Project, Version
+
+
+class GridPageCacheTest(TestCase):
+
+    def setUp(self):
+        page_cache.reset_stats()
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.project = Project.objects.create(name='first', slug='first', category=category, is_published=True)
+        self.other = Project.objects.create(name='other', slug='other', category=category, is_published=True)
+        self.grid = Grid.objects.create(title='Grid', slug='grid')
+        self.feature = Feature.objects.create(grid=self.grid, title='Feature')
+        self.grid_package = GridPackage.objects.create(grid=self.grid, package=self.project)
+        # test cases run inside a transaction, so nothing is ever committed
+        page_cache.flush()
+
+    def get_page(self):
+        return page_cache.get_grid_page(
+            self.grid, "detail", lambda: GridMatrix(self.grid.grid_packages, self.grid.feature_set.all())
+        )
+
+    def test_hit(self):
+        self.get_page()
+        with self.assertNumQueries(0):
+            self.get_page()
+        stats = page_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_dependencies(self):
+        self.get_page()
+
+        self.other.save()
+        page_cache.flush()
+        self.assertEqual(page_cache.stats()['invalidations'], 0)
+
+        self.project.save()
+        page_cache.flush()
+        # found stale when read
+        self.get_page()
+        self.assertEqual(page_cache.stats()['invalidations'], 1)
+
+        Element.objects.create(feature=self.feature, grid_package=self.grid_package, text='yes')
+        page_cache.flush()
+        self.assertEqual(page_cache.stats()['invalidations'], 2)
+        self.assertEqual(self.get_page().feature_rows[0].cells[0][1].text, 'yes')
+
+    def test_unpublished_project(self):
+        self.other.is_published = False
+        self.other.save()
+        GridPackage.objects.create(grid=self.grid, package=self.other)
+        page_cache.flush()
+        self.assertEqual(len(self.get_page().rows), 1)
+
+        self.other.is_published = True
+        self.other.save()
+        page_cache.flush()
+        self.assertEqual(len(self.get_page().rows), 2)
+
+    def test_version(self):
+        self.get_page()
+        version = Version.objects.create(package=self.project, number='1.0')
+        page_cache.flush()
+        self.get_page()
+        self.assertEqual(page_cache.stats()['invalidations'], 1)
+
+        version.delete()
+        page_cache.flush()
+        self.get_page()
+        self.assertEqual(page_cache.stats()['invalidations'], 2)
+
+    def test_project_changed_while_building(self):
+        def build():
+            matrix = GridMatrix(self.grid.grid_packages, self.grid.feature_set.all())
+            self.project.save()
+            page_cache.flush()
+            return matrix
+
+        page_cache.get_grid_page(self.grid, "detail", build)
+        self.get_page()
+        self.assertEqual(page_cache.stats()['misses'], 2)
+
+    def test_invalidates_once_per_transaction(self):
+        self.get_page()
+        for i in range(5):
+            self.project.save()
+            self.feature.save()
+        page_cache.flush()
+        self.assertEqual(page_cache.stats()['invalidations'], 1)
+
+    def test_github_project(self):
+        # the cached page must not hold the repository handlers, they cannot be pickled
+        self.project.repo_url = 'https://github.com/steemit/steem'
+        self.project.save()
+        page_cache.flush()
+
+        self.get_page()
+        repo = self.get_page().rows[0].values['repo']
+        self.assertEqual((str(repo), repo.url, repo.is_other), ('Github', 'https://github.com', False))
+        self.assertEqual(page_cache.stats()['hits'], 1)
+
+        response = self.client.get(reverse('grid', kwargs={'slug': self.grid.slug}))
+        self.assertEqual(response.status_code, 200)
@@ -10,19 +10,13 @@ from django.shortcuts import get_object_or_404, render
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 
 from grid.forms import ElementForm, FeatureForm, GridForm, GridPackageForm
+from grid.matrix import DEFAULT_ATTRIBUTES, GridMatrix
 from grid.models import Element, Feature, Grid, GridPackage
+from grid.page_cache import get_grid_page
 from package.models import Project
 from package.forms import PackageForm
 from package.views import repo_data_for_js
-
-
-def build_element_map(elements):
-    # Horrifying two-level dict due to needing to use hash() function later
-    element_map = {}
-    for element in elements:
-        element_map.setdefault(element.feature_id, {})
-        element_map[element.feature_id][element.grid_package_id] = element
-    return element_map
+from searchv2.autocomplete import autocomplete_index
 
 
 def grids(request, template_name="grid/grids.html"):
@@ -45,41 +39,24 @@ def grid_detail_landscape(request, slug, template_name="grid/grid_detail2.html")
     Template context:
 
     * ``grid`` - the grid object
-    * ``elements`` - elements of the grid
     * ``features`` - feature set used in the grid
     * ``grid_packages`` - packages involved in the current grid
+    * ``attributes`` - ``(name, label)`` of the package attributes shown
+    * ``matrix`` - the :class:`~grid.matrix.GridMatrix` with every cell resolved
     """
     grid = get_object_or_404(Grid, slug=slug)
     features = grid.feature_set.all()
 
     grid_packages = grid.grid_packages.order_by("package__commit_list")
 
-    elements = Element.objects.all() \
-                .filter(feature__in=features,
-                        grid_package__in=grid_packages)
-
-    element_map = build_element_map(elements)
-
-    # These attributes are how we determine what is displayed in the grid
-    default_attributes = [('repo_description', 'Description'),
-                ('category', 'Category'),
-                ('pypi_downloads', 'Downloads'),
-                ('last_updated', 'Last Updated'),
-                ('pypi_version', 'Version'),
-                ('repo', 'Repo'),
-                ('commits_over_52', 'Commits'),
-                ('repo_watchers', 'Stars'),
-                ('repo_forks', 'Forks'),
-                ('participant_list', 'Participants'),
-                ('license_latest', 'License')
-            ]
+    matrix = get_grid_page(grid, "landscape", lambda: GridMatrix(grid_packages, features))
 
     return render(request, template_name, {
             'grid': grid,
-            'features': features,
-            'grid_packages': grid_packages,
-            'attributes': default_attributes,
-            'elements': element_map,
+            'features': matrix.features,
+            'grid_packages': matrix.grid_packages,
+            'attributes': DEFAULT_ATTRIBUTES,
+            'matrix': matrix,
         })
 
 
@@ -311,10 +288,11 @@ def ajax_grid_list(request, template_name="grid/ajax_grid_list.html"):
     q = request.GET.get('q', '')
     grids = []
     if q:
-        grids = Grid.objects.filter(title__istartswith=q)
+        grids = autocomplete_index.grids_starting_with(q)
         package_id = request.GET.get('package_id', '')
         if package_id:
-            grids = grids.exclude(gridpackage__package__id=package_id)
+            package_grids = set(GridPackage.objects.filter(package__id=package_id).values_list('grid_id', flat=True))
+            grids = [grid for grid in grids if grid.id not in package_grids]
     return render(request, template_name, {'grids': grids})
 
 
@@ -324,40 +302,24 @@ def grid_detail(request, slug, template_name="grid/grid_detail3.html"):
     Template context:
 
     * ``grid`` - the grid object
-    * ``elements`` - elements of the grid
     * ``features`` - feature set used in the grid
     * ``grid_packages`` - packages involved in the current grid
+    * ``attributes`` - ``(name, label)`` of the package attributes shown
+    * ``matrix`` - the :class:`~grid.matrix.GridMatrix` with every cell resolved
     """
     grid = get_object_or_404(Grid, slug=slug)
     features = grid.feature_set.select_related(None)
 
     grid_packages = grid.grid_packages.order_by("-package__repo_watchers")
 
-    elements = Element.objects.filter(feature__in=features,
-                        grid_package__in=grid_packages)
-
-    element_map = build_element_map(elements)
-
-    # These attributes are how we determine what is displayed in the grid
-    default_attributes = [('repo_description', 'Description'),
-                ('category', 'Category'),
-                ('pypi_downloads', 'Downloads'),
-                ('last_updated', 'Last Updated'),
-                ('pypi_version', 'Version'),
-                ('repo', 'Repo'),
-                ('commits_over_52', 'Commits'),
-                ('repo_watchers', 'Stars'),
-                ('repo_forks', 'Forks'),
-                ('participant_list', 'Participants'),
-                ('license_latest', 'License')
-            ]
+    matrix = get_grid_page(grid, "detail", lambda: GridMatrix(grid_packages, features))
 
     return render(request, template_name, {
             'grid': grid,
-            'features': features,
-            'grid_packages': grid_packages,
-            'attributes': default_attributes,
-            'elements': element_map,
+            'features': matrix.features,
+            'grid_packages': matrix.grid_packages,
+            'attributes': DEFAULT_ATTRIBUTES,
+            'matrix': matrix,
         })
 
 
@@ -3,7 +3,9 @@ import datetime
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
+from core.invalidation import depends_on
 from grid.models import Grid
+from homepage.snapshot import SNAPSHOT_KEY
 from package.models import BaseModel, Project
 
 
@@ -75,3 +77,8 @@ class PSA(BaseModel):
 
     def __str__(self):
         return "{0} : {1}".format(self.created, self.body_text)
+
+
+# the items of the week, the announcement and the categories are part of the homepage snapshot
+for model in (Dpotw, Gotw, PSA, "package.Category"):
+    depends_on(model, lambda instance: [SNAPSHOT_KEY])
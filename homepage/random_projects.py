@@ -0,0 +1,68 @@
+"""
+Random published projects for the homepage.
+
+The ids of the published projects are kept in the cache as one array, dropped
+when a project is published, unpublished or deleted, so a sample is drawn
+without touching the projects table. The list items of the sampled projects
+are rendered once and cached per project until the project changes.
+"""
+
+import random
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.invalidation import depends_on, invalidate
+
+PUBLISHED_IDS_KEY = "random_projects:published_ids"
+TILE_KEY = "random_projects:tile:{}"
+TILE_TEMPLATE = "_random_project.html"
+
+
+def published_ids():
+    """ Ids of all published projects, as cached. """
+    ids = cache.get(PUBLISHED_IDS_KEY)
+    if ids is None:
+        # Import placed here to avoid circular dependencies
+        from package.models import Project
+
+        ids = tuple(Project.objects.published().values_list('pk', flat=True))
+        cache.set(PUBLISHED_IDS_KEY, ids, None)
+    return ids
+
+
+def render_tiles(project_ids):
+    """ Returns ``{project id: rendered list item}``; ids of projects which do not exist anymore are left out. """
+    # Import placed here to avoid circular dependencies
+    from package.models import Project
+
+    keys = dict((pk, TILE_KEY.format(pk)) for pk in project_ids)
+    cached = cache.get_many(list(keys.values()))
+    tiles = dict((pk, cached[key]) for pk, key in keys.items() if key in cached)
+
+    missing = [pk for pk in project_ids if pk not in tiles]
+    if missing:
+        rendered = dict(
+            (project.pk, render_to_string(TILE_TEMPLATE, {"package": project}))
+            for project in Project.objects.filter(pk__in=missing).only('name', 'slug', 'description')
+        )
+        cache.set_many(dict((keys[pk], tile) for pk, tile in rendered.items()), None)
+        tiles.update(rendered)
+    return tiles
+
+
+def random_project_tiles(count=5):
+    """ Rendered list items of up to ``count`` distinct published projects, picked uniformly. """
+    ids = published_ids()
+    chosen = random.sample(ids, min(count, len(ids)))
+    tiles = render_tiles(chosen)
+    return [mark_safe(tiles[pk]) for pk in chosen if pk in tiles]
+
+
+def invalidate_published_ids():
+    """ Drops the ids array when the current transaction commits. """
+    invalidate(PUBLISHED_IDS_KEY)
+
+
+depends_on("package.Project", lambda project: [TILE_KEY.format(project.pk)])
@@ -0,0 +1,150 @@
+"""
+Snapshot of everything the homepage shows besides the random projects.
+
+The counts are computed in one aggregated query, and the snapshot is kept in
+the cache, so rendering the homepage costs a single cache read. A snapshot
+older than ``HOMEPAGE_SNAPSHOT_REFRESH`` seconds is still served while one
+worker rebuilds it in a background thread. Publishing a project, requesting
+or withdrawing an approval and changing the items of the week drop it right
+away (once the transaction commits).
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Q, Sum, Value, When
+
+from core.invalidation import invalidate
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "homepage:snapshot"
+REFRESH_LOCK_KEY = "homepage:snapshot:refreshing"
+
+NO_ANNOUNCEMENTS = (
+    '<p>There are currently no announcements.  To request a PSA, tweet at '
+    '<a href="http://twitter.com/open_comparison">@Open_Comparison</a>.</p>'
+)
+
+
+def _count_when(*args, **kwargs):
+    return Sum(Case(When(then=Value(1), *args, **kwargs), default=Value(0), output_field=IntegerField()))
+
+
+def project_counts():
+    """ All the project counts of the homepage, from a single query. """
+    # Import placed here to avoid circular dependencies
+    from package.models import Project, Version
+
+    counts = Project.objects.annotate(
+        supports_python3=Exists(Version.objects.filter(package=OuterRef('pk'), supports_python3=True)),
+    ).aggregate(
+        package_count=Count('pk'),
+        published_projects_count=_count_when(is_published=True),
+        drafts_count=_count_when(is_published=False),
+        awaiting_projects_count=_count_when(is_awaiting_approval=True),
+        open_source_count=_count_when(Q(repo_url__isnull=False) & ~Q(repo_url="")),
+        py3_compat=_count_when(supports_python3=True),
+    )
+    # sums over no rows are NULL
+    return dict((name, value or 0) for name, value in counts.items())
+
+
+def homepage_categories():
+    # Import placed here to avoid circular dependencies
+    from package.models import Category
+
+    categories = []
+    last_category = None
+    for category in Category.objects.annotate(
+        project_count=Count(Case(When(project__is_published=True, then=1)))
+    ):
+        element = {
+            "title": category.title,
+            "description": category.description,
+            "count": category.project_count,
+            "slug": category.slug,
+            "title_plural": category.title_plural,
+        }
+
+        if element["title"] == "Other":
+            last_category = element
+        else:
+            categories.append(element)
+
+    if last_category:
+        categories.append(last_category)
+    return categories
+
+
+def build_snapshot():
+    """ Returns the homepage context, without the random projects and the blog post. """
+    # Import placed here to avoid circular dependencies
+    from homepage.models import Dpotw, Gotw, PSA
+    from package.models import Project, Version
+
+    try:
+        potw = Dpotw.objects.select_related('package').latest().package
+    except Dpotw.DoesNotExist:
+        potw = None
+
+    try:
+        gotw = Gotw.objects.select_related('grid').latest().grid
+    except Gotw.DoesNotExist:
+        gotw = None
+
+    psa = PSA.objects.values_list('body_text', flat=True).order_by('-created').first()
+
+    snapshot = project_counts()
+    snapshot.update({
+        "computed_at": time.time(),
+        "categories": homepage_categories(),
+        "latest_packages": list(Project.objects.published().order_by('-publication_time')[:8]),
+        "latest_python3": list(
+            Version.objects.filter(supports_python3=True).select_related("package").distinct().order_by("-created")[0:5]
+        ),
+        "potw": potw,
+        "gotw": gotw,
+        "psa_body": psa if psa is not None else NO_ANNOUNCEMENTS,
+    })
+    return snapshot
+
+
+def refresh_snapshot():
+    snapshot = build_snapshot()
+    cache.set(SNAPSHOT_KEY, snapshot, settings.HOMEPAGE_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def _refresh_in_background():
+    try:
+        refresh_snapshot()
+    except Exception:
+        logger.exception("Could not refresh the homepage snapshot")
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+        connection.close()
+
+
+def get_snapshot():
+    """ Returns the cached homepage snapshot, building it on a miss. """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        return refresh_snapshot()
+
+    if time.time() - snapshot["computed_at"] > settings.HOMEPAGE_SNAPSHOT_REFRESH:
+        # only the worker which takes the lock rebuilds it, the others keep serving the old one
+        if cache.add(REFRESH_LOCK_KEY, True, settings.HOMEPAGE_SNAPSHOT_REFRESH):
+            thread = threading.Thread(target=_refresh_in_background, name="homepage-snapshot")
+            thread.daemon = True
+            thread.start()
+    return snapshot
+
+
+def invalidate_snapshot():
+    """ Drops the snapshot when the current transaction commits. """
+    invalidate(SNAPSHOT_KEY)
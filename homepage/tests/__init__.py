@@ -1 +1,3 @@
 from homepage.tests.test_views import *
+from homepage.tests.test_snapshot import *
+from homepage.tests.test_random_projects import *
@@ -0,0 +1,46 @@
+from django.test import TestCase
+
+from core import invalidation
+from homepage.random_projects import published_ids, random_project_tiles
+from package.models import Category, Project
+
+
+class RandomProjectsTest(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.projects = [
+            Project.objects.create(name='project {}'.format(i), slug='project-{}'.format(i), category=category,
+                                   is_published=True)
+            for i in range(6)
+        ]
+        self.draft = Project.objects.create(name='draft', slug='draft', category=category)
+        # test cases run inside a transaction, so nothing is ever committed
+        invalidation.flush()
+
+    def test_only_published(self):
+        self.assertEqual(sorted(published_ids()), sorted(project.pk for project in self.projects))
+        tiles = random_project_tiles(10)
+        self.assertEqual(len(tiles), 6)
+        self.assertFalse(any('draft' in tile for tile in tiles))
+
+    def test_cached(self):
+        random_project_tiles(6)
+        with self.assertNumQueries(0):
+            tiles = random_project_tiles(5)
+        self.assertEqual(len(set(tiles)), 5)
+
+    def test_publication(self):
+        published_ids()
+        self.draft.is_published = True
+        self.draft.save()
+        invalidation.flush()
+        self.assertIn(self.draft.pk, published_ids())
+
+    def test_tile_refreshed_on_change(self):
+        random_project_tiles(6)
+        project = self.projects[0]
+        project.name = 'renamed'
+        project.save()
+        invalidation.flush()
+        self.assertTrue(any('renamed' in tile for tile in random_project_tiles(6)))
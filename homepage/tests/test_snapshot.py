@@ -0,0 +1,55 @@
+from django.test import TestCase
+
+from core import invalidation
+from homepage.models import PSA
+from homepage.snapshot import get_snapshot
+from package.models import Category, Project, Version
+
+
+class HomepageSnapshotTest(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.draft = Project.objects.create(
+            name='draft', slug='draft', category=category, repo_url='https://github.com/a/draft'
+        )
+        self.published = Project.objects.create(name='published', slug='published', category=category, is_published=True)
+        Version.objects.create(package=self.published, number='1.0', supports_python3=True)
+        Version.objects.create(package=self.published, number='1.1', supports_python3=True)
+        # test cases run inside a transaction, so nothing is ever committed
+        invalidation.flush()
+
+    def test_counts(self):
+        snapshot = get_snapshot()
+        self.assertEqual(snapshot['package_count'], 2)
+        self.assertEqual(snapshot['published_projects_count'], 1)
+        self.assertEqual(snapshot['drafts_count'], 1)
+        self.assertEqual(snapshot['awaiting_projects_count'], 0)
+        self.assertEqual(snapshot['open_source_count'], 1)
+        self.assertEqual(snapshot['py3_compat'], 1)
+        self.assertEqual(snapshot['latest_packages'], [self.published])
+        self.assertEqual([category['count'] for category in snapshot['categories']], [1])
+
+    def test_cached(self):
+        get_snapshot()
+        with self.assertNumQueries(0):
+            get_snapshot()
+
+    def test_invalidated_on_approval_request(self):
+        get_snapshot()
+
+        self.published.save()
+        invalidation.flush()
+        with self.assertNumQueries(0):
+            get_snapshot()
+
+        self.draft.is_awaiting_approval = True
+        self.draft.save()
+        invalidation.flush()
+        self.assertEqual(get_snapshot()['awaiting_projects_count'], 1)
+
+    def test_invalidated_on_announcement(self):
+        get_snapshot()
+        PSA.objects.create(body_text='<p>News</p>')
+        invalidation.flush()
+        self.assertEqual(get_snapshot()['psa_body'], '<p>News</p>')
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 
+from core import invalidation
 from grid.models import Grid
 from homepage.models import Dpotw, Gotw
 from package.models import Project, Category
@@ -13,6 +14,8 @@ from homepage.tests import data
 class FunctionalHomepageTest(TestCase):
     def setUp(self):
         data.load()
+        # test cases run inside a transaction, so the homepage snapshot is dropped by hand
+        invalidation.flush()
 
     def test_homepage_view(self):
         url = reverse('home')
@@ -59,6 +62,8 @@ class FunctionalHomepageTest(TestCase):
 class FunctionalHomepageTestWithoutPackages(TestCase):
     def setUp(self):
         data.load()
+        # test cases run inside a transaction, so the homepage snapshot is dropped by hand
+        invalidation.flush()
 
     def test_homepage_view(self):
         Project.objects.all().delete()
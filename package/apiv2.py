@@ -1,5 +1,3 @@
-from django.db.models import Count
-
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 
 from package.models import Category, Project
@@ -28,7 +26,6 @@ class Python3ListAPIView(ListAPIView):
     def get_queryset(self):
         packages = Project.objects.filter(version__supports_python3=True)
         packages = packages.distinct()
-        packages = packages.annotate(usage_count=Count("usage"))
         packages.order_by("-repo_watchers", "name")
         return packages
 
@@ -4,13 +4,13 @@ from django.core.cache import cache
 from django.conf import settings
 from django.urls.base import reverse
 
-from package.models import Project
+from package.models import approval_queue, used_packages_cache_key
 
 
 def used_packages_list(request):
     context = {}
     if request.user.is_authenticated():
-        cache_key = "sitewide_used_packages_list_%s" % request.user.pk
+        cache_key = used_packages_cache_key(request.user.pk)
         used_packages_list = cache.get(cache_key)
         if used_packages_list is None:
             used_packages_list = request.user.project_set.values_list("pk", flat=True)
@@ -36,12 +36,10 @@ def trusted_user_action_required(request):
     ctx = defaultdict(list)
 
     if request.user.is_staff or (hasattr(request.user, 'profile') and request.user.profile.is_trusted):
-        projects_to_approve = Project.objects.filter(is_awaiting_approval=True).order_by('approval_request_datetime')
-        for project in projects_to_approve:
-            if request.path not in [
-                reverse("package", kwargs={"slug": project.slug})
-                for project in projects_to_approve
-            ]:
-                ctx['projects_to_approve'].append(project)
+        projects_to_approve = approval_queue.get()
+        # the queue is not shown on the page of a project from the queue
+        paths = set(reverse("package", kwargs={"slug": project.slug}) for project in projects_to_approve)
+        if request.path not in paths:
+            ctx['projects_to_approve'] = projects_to_approve
 
     return ctx
@@ -1,7 +1,7 @@
 import itertools
 
 from package.models import Category, Project, PackageExample, ProjectImage
-from package.utils import prepare_thumbnails
+from package.tasks import enqueue_thumbnails
 from profiles.models import Account
 
 from django.core.exceptions import ValidationError
@@ -182,7 +182,10 @@ class ProjectImageForm(forms.ModelForm):
 
     def save(self, *args, **kwargs):
         super(ProjectImageForm, self).save(*args, **kwargs)
-        prepare_thumbnails(self.instance.img.file.name)
+        if 'img' in self.changed_data:
+            # the original is shown until the worker made the thumbnails of the new image
+            self.instance.store_thumbnails(None)
+            enqueue_thumbnails(self.instance.pk)
         return self.instance
 
 
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from grid.page_cache import invalidate_project
+from package.models import Project, Version
+from package.utils import version_sort_key
+
+
+class Command(BaseCommand):
+
+    help = "Fills the sort key of the versions stored before it existed, or of all of them with --all"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            default=False,
+            help="Recompute the keys of every version, not only the empty ones",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of versions updated per transaction",
+        )
+
+    def handle(self, *args, **options):
+        versions = Version.objects.order_by('pk')
+        if not options['all']:
+            versions = versions.filter(sort_key='')
+
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(versions.filter(pk__gt=last_pk).values_list(
+                'pk', 'package', 'number', 'sort_key', 'is_comparable'
+            )[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            with transaction.atomic():
+                for pk, package_id, number, sort_key, is_comparable in batch:
+                    new_sort_key, new_is_comparable = version_sort_key(number)
+                    if (new_sort_key, new_is_comparable) == (sort_key, is_comparable):
+                        continue
+                    # update() skips save(), so the cached latest version and grid pages are dropped here
+                    Version.objects.filter(pk=pk).update(sort_key=new_sort_key, is_comparable=new_is_comparable)
+                    if package_id is not None:
+                        Project.pypi_version.invalidate(package_id)
+                        invalidate_project(package_id)
+                    updated += 1
+
+        self.stdout.write("{} versions updated".format(updated))
@@ -1,23 +1,23 @@
 import logging
 import logging.config
-from time import sleep
 from chroniker.models import Job
 
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 
 try:
     from django.core.management.base import NoArgsCommand
 except ImportError:
     from django.core.management import BaseCommand as NoArgsCommand
 
-from django.core.mail import send_mail
-
-from github3 import login as github_login
-
 from package.models import Project
+from package.updater import update_projects
 
 logger = logging.getLogger(__name__)
 
+RUN_STARTED_CACHE_KEY = "package_updater:run_started"
+
 
 class PackageUpdaterException(Exception):
     def __init__(self, error, title):
@@ -34,29 +34,42 @@ class Command(NoArgsCommand):
 
     help = "Updates all the packages in the system. Commands belongs to django-packages.package"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.PACKAGE_UPDATER_WORKERS,
+            help="Number of projects fetched concurrently",
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            default=False,
+            help="Skip projects already fetched by the last, unfinished run",
+        )
+
     def handle(self, *args, **options):
 
-        github = github_login(token=settings.GITHUB_TOKEN)
+        projects = Project.objects.all()
+
+        run_started = cache.get(RUN_STARTED_CACHE_KEY) if options['resume'] else None
+        if run_started is not None:
+            projects = projects.exclude(last_fetched__gte=run_started)
+        else:
+            cache.set(RUN_STARTED_CACHE_KEY, timezone.now(), None)
+
+        projects_count = projects.count()
+        progress = {'complete': 0}
 
-        projects_count = Project.objects.count()
-        for index, package in enumerate(Project.objects.iterator()):
-            Job.update_progress(total_parts=projects_count, total_parts_complete=index)
+        def on_done(package, error):
+            if error is not None:
+                PackageUpdaterException(error, package.name)  # logs the error, let's move on now
+
+            progress['complete'] += 1
+            Job.update_progress(total_parts=projects_count, total_parts_complete=progress['complete'])
             logging.info("{} ...".format(package.name))
             print("{} ...".format(package.name))
 
-            # Simple attempt to deal with Github rate limiting
-            while True:
-                if github.ratelimit_remaining < 50:
-                    sleep(120)
-                break
-
-            try:
-                try:
-                    package.fetch_metadata(fetch_pypi=False)
-                    package.fetch_commits()
-                except Exception as e:
-                    raise PackageUpdaterException(e, package.name)
-            except PackageUpdaterException:
-                pass  # We've already caught the error so let's move on now
-
-            sleep(5)
+        update_projects(projects.iterator(), workers=options['workers'], on_done=on_done)
+
+        cache.delete(RUN_STARTED_CACHE_KEY)
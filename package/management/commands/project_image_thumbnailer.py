@@ -1,8 +1,59 @@
+import time
+from collections import defaultdict
+from multiprocessing import Pool, cpu_count
+from os.path import getsize
+
+from django.core.files.storage import default_storage
 from django.core.management import BaseCommand
+from django.db import connections
 from package.models import ProjectImage
 from django.conf import settings
 
-from package.utils import prepare_thumbnails
+from package.utils import prepare_thumbnails, read_thumbnail_manifest
+
+
+def thumbnail(args):
+    """ Runs in the worker processes; returns ``(pk, path, made, manifest, error)``. """
+    pk, path, force = args
+    try:
+        made = prepare_thumbnails(path, force)
+        return pk, path, made, read_thumbnail_manifest(path), None
+    except Exception as e:
+        return pk, path, False, None, "{}: {}".format(type(e).__name__, e)
+
+
+def saved(original, smaller):
+    return 1 - smaller / original if original else 0
+
+
+class ThumbnailSavings(object):
+    """ Bytes of the thumbnails in the format of the originals, against the bytes of their variants. """
+
+    def __init__(self):
+        self.original = 0
+        self.served = 0
+        self.by_type = defaultdict(lambda: [0, 0])
+
+    def add(self, manifest):
+        for thumbnail in manifest["thumbnails"] if manifest else []:
+            original = thumbnail.get("bytes", 0)
+            variants = thumbnail.get("variants", [])
+            self.original += original
+            # the browsers get the smallest format they accept
+            self.served += min([original] + [variant["bytes"] for variant in variants])
+            for variant in variants:
+                self.by_type[variant["type"]][0] += original
+                self.by_type[variant["type"]][1] += variant["bytes"]
+
+    def report(self):
+        lines = ["thumbnails: {:.1f} MB, {:.1f} MB served to browsers accepting every variant ({:.0%} saved)".format(
+            self.original / 1024 / 1024, self.served / 1024 / 1024, saved(self.original, self.served)
+        )]
+        for image_type, (original, variant) in sorted(self.by_type.items()):
+            lines.append("  {}: {:.1f} MB instead of {:.1f} MB ({:.0%} saved)".format(
+                image_type, variant / 1024 / 1024, original / 1024 / 1024, saved(original, variant)
+            ))
+        return lines
 
 
 class Command(BaseCommand):
@@ -16,7 +67,60 @@ class Command(BaseCommand):
         )
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Thumbnail also the images whose thumbnails are up to date"
+        )
+        parser.add_argument(
+            '--workers', type=int, default=cpu_count(),
+            help="Number of processes thumbnailing images (default: number of CPUs)"
+        )
+
     def handle(self, *args, **options):
+        images = dict(
+            (pk, ProjectImage(pk=pk, img=name, thumbnails=thumbnails))
+            for pk, name, thumbnails in ProjectImage.objects.order_by('pk').values_list('pk', 'img', 'thumbnails')
+        )
+        tasks = [(pk, default_storage.path(image.img.name), options['force']) for pk, image in images.items()]
+        # the workers are forked, they must not share the connection of this process
+        connections.close_all()
 
-        for project_image in ProjectImage.objects.all():
-            prepare_thumbnails(project_image.img.file.name)
+        made = skipped = failed = 0
+        made_bytes = 0
+        savings = ThumbnailSavings()
+        started = time.time()
+        pool = Pool(max(options['workers'], 1))
+        try:
+            for pk, path, was_made, manifest, error in pool.imap_unordered(thumbnail, tasks):
+                if error:
+                    failed += 1
+                    self.stderr.write("{}: {}".format(path, error))
+                    continue
+                # the manifests are stored here, the workers have no database connection
+                images[pk].store_thumbnails(manifest)
+                savings.add(manifest)
+                if was_made:
+                    made += 1
+                    made_bytes += getsize(path)
+                else:
+                    skipped += 1
+        finally:
+            pool.close()
+            pool.join()
+
+        elapsed = max(time.time() - started, 0.001)
+        self.stdout.write(
+            "{total} images in {elapsed:.1f}s: {made} thumbnailed ({rate:.1f} images/s, {mb_rate:.1f} MB/s), "
+            "{skipped} up to date, {failed} failed".format(
+                total=len(tasks),
+                elapsed=elapsed,
+                made=made,
+                rate=made / elapsed,
+                mb_rate=made_bytes / elapsed / 1024 / 1024,
+                skipped=skipped,
+                failed=failed,
+            )
+        )
+        for line in savings.report():
+            self.stdout.write(line)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from package.models import Project
+
+
+class Command(BaseCommand):
+
+    help = "Recounts the users of the projects whose usage_count drifted from the usage table"
+
+    def handle(self, *args, **options):
+        fixed = Project.objects.reconcile_usage_counts()
+        self.stdout.write("{} projects fixed".format(fixed))
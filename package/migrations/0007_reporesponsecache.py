@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0006_auto_20180316_1308'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepoResponseCache',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('url', models.CharField(max_length=500, unique=True, verbose_name='URL')),
+                ('etag', models.CharField(blank=True, default='', max_length=255, verbose_name='ETag')),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64, verbose_name='Last-Modified')),
+                ('content', models.TextField(blank=True, default='', verbose_name='Content')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
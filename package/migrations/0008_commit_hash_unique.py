@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def blank_hashes_to_null(apps, schema_editor):
+    Commit = apps.get_model('package', 'Commit')
+    Commit.objects.filter(commit_hash='').update(commit_hash=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0007_reporesponsecache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commit',
+            name='commit_hash',
+            field=models.CharField(blank=True, default=None, help_text='Example: Git sha or SVN commit id', max_length=150, null=True, verbose_name='Commit Hash'),
+        ),
+        migrations.RunPython(blank_hashes_to_null, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='commit',
+            unique_together=set([('package', 'commit_hash')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0008_commit_hash_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='commit_list_since',
+            field=models.DateTimeField(blank=True, default=None, null=True, verbose_name='Commit List computed at'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0009_project_commit_list_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='sort_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Sort key'),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='is_comparable',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Is comparable'),
+        ),
+        migrations.AlterIndexTogether(
+            name='version',
+            index_together=set([('package', 'sort_key')]),
+        ),
+    ]
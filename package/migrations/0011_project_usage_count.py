@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_usage_count(apps, schema_editor):
+    Project = apps.get_model('package', 'Project')
+    counts = Project.objects.annotate(count=Count('usage')).filter(count__gt=0).values_list('pk', 'count')
+    for pk, count in counts:
+        Project.objects.filter(pk=pk).update(usage_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0010_version_sort_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='usage_count',
+            field=models.IntegerField(db_index=True, default=0, editable=False, verbose_name='Number of users'),
+        ),
+        migrations.RunPython(fill_usage_count, migrations.RunPython.noop),
+    ]
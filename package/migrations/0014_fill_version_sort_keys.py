@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from package.utils import version_sort_key
+
+
+def fill_sort_keys(apps, schema_editor):
+    Version = apps.get_model('package', 'Version')
+    rows = Version.objects.order_by().values_list('pk', 'number', 'sort_key', 'is_comparable').iterator()
+    for pk, number, sort_key, is_comparable in rows:
+        key = version_sort_key(number)
+        if key != (sort_key, is_comparable):
+            Version.objects.filter(pk=pk).update(sort_key=key[0], is_comparable=key[1])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0013_projectimage_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_sort_keys, migrations.RunPython.noop),
+    ]
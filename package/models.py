@@ -3,27 +3,40 @@ import json
 import re
 import os
 import time
+from collections import defaultdict, namedtuple
 
-from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import JSONField
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.utils.translation import ugettext_lazy as _
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.safestring import mark_safe
 
-from distutils.version import LooseVersion as versioner
 import requests
 
 from core.fields import SizeAndContentTypeRestrictedImageField
 from core.utils import STATUS_CHOICES, status_choices_switch
+from core.invalidation import cached_method, depends_on, depends_on_m2m
 from core.models import BaseModel
+from core.shared_values import SharedValue
+from grid.page_cache import invalidate_project
+from homepage.random_projects import invalidate_published_ids
+from homepage.snapshot import invalidate_snapshot
 from package.repos import get_repo_for_repo_url
 from package.signals import signal_fetch_latest_metadata
-from package.utils import get_version, get_pypi_version, normalize_license
+from package.utils import (
+    get_version, get_pypi_version, normalize_license, commit_weeks, roll_commit_weeks, version_sort_key,
+    prepare_thumbnails, read_thumbnail_manifest,
+)
 from profiles.models import Profile, Account
+from searchv2.autocomplete import invalidate_autocomplete_index
 
 repo_url_help_text = settings.PACKAGINATOR_HELP_TEXT['REPO_URL']
 pypi_url_help_text = settings.PACKAGINATOR_HELP_TEXT['PYPI_URL']
@@ -60,6 +73,20 @@ class ProjectQuerySet(QuerySet):
     def drafts(self):
         return self.filter(is_published=False)
 
+    def reconcile_usage_counts(self):
+        """ Recounts ``usage_count`` of the projects where it drifted; returns their number. """
+        drifted = list(
+            self.annotate(actual=Count('usage')).exclude(usage_count=F('actual')).values_list('pk', flat=True)
+        )
+        if drifted:
+            usages = Project.usage.through.objects.filter(project=OuterRef('pk')).values('project').annotate(
+                count=Count('pk')
+            ).values('count')
+            Project.objects.filter(pk__in=drifted).update(
+                usage_count=Coalesce(Subquery(usages, output_field=models.IntegerField()), 0)
+            )
+        return len(drifted)
+
 
 class Project(BaseModel):
     NONE_STATUS = ""
@@ -150,6 +177,7 @@ class Project(BaseModel):
     team_members = models.ManyToManyField(Account, through='TeamMembership', blank=True, related_name="team_member_of", through_fields=("project", "account"))
     contributors = models.ManyToManyField(Account, blank=True, related_name="contribiuted_to")
     usage = models.ManyToManyField(User, blank=True)
+    usage_count = models.IntegerField(_("Number of users"), default=0, db_index=True, editable=False)
     draft_added_by = models.ForeignKey(User, blank=True, null=True, related_name="drafted_projects", on_delete=models.SET_NULL)
     is_awaiting_approval = models.BooleanField(blank=True, null=None, default=False)
     is_published = models.BooleanField(blank=True, null=None, default=False)
@@ -161,6 +189,7 @@ class Project(BaseModel):
     documentation_url = models.URLField(_("Documentation URL"), blank=True, null=True, default="")
 
     commit_list = models.TextField(_("Commit List"), blank=True)
+    commit_list_since = models.DateTimeField(_("Commit List computed at"), blank=True, null=True, default=None)
     main_img = models.ForeignKey('ProjectImage', null=True, blank=True, related_name='main_img_proj')
 
     objects = ProjectQuerySet.as_manager()
@@ -204,20 +233,12 @@ class Project(BaseModel):
             return name[:name.index("/")]
         return name
 
+    @cached_method(("package.Commit", "package_id"))
     def last_updated(self):
-        cache_name = self.cache_namer(self.last_updated)
-        last_commit = cache.get(cache_name)
-        if last_commit is not None:
-            return last_commit
         try:
-            last_commit = self.commit_set.latest('commit_date').commit_date
-            if last_commit:
-                cache.set(cache_name, last_commit)
-                return last_commit
+            return self.commit_set.latest('commit_date').commit_date
         except ObjectDoesNotExist:
-            last_commit = None
-
-        return last_commit
+            return None
 
     @property
     def repo(self):
@@ -252,27 +273,61 @@ class Project(BaseModel):
         return self.participants.split(',')
 
     def get_usage_count(self):
-        return self.usage.count()
+        return self.usage_count
+
+    def add_usage(self, user):
+        """ Marks ``project`` as used by ``user``; returns whether it was not already. """
+        usage, created = Project.usage.through.objects.get_or_create(project_id=self.pk, user_id=user.pk)
+        return created
+
+    def remove_usage(self, user):
+        """ Unmarks ``project`` as used by ``user``; returns whether it was marked. """
+        deleted, _ = Project.usage.through.objects.filter(project_id=self.pk, user_id=user.pk).delete()
+        return bool(deleted)
+
+    def _stored_commit_weeks(self):
+        if self.commit_list_since is None or not self.commit_list:
+            return None
+        return [int(x) for x in self.commit_list.split(',')]
+
+    def _save_commit_weeks(self, weeks, since):
+        self.commit_list = ','.join(map(str, weeks))
+        self.commit_list_since = since
+        Project.objects.filter(pk=self.pk).update(commit_list=self.commit_list, commit_list_since=since)
+
+    def rebuild_commit_weeks(self, now=None, commit_dates=None):
+        """ Recomputes the weekly commit histogram from the commits table.
+
+            ``commit_dates`` can be passed by callers that already loaded the
+            commits of the last 52 weeks for many projects at once.
+        """
+        now = now or datetime.now()
+        if commit_dates is None:
+            commit_dates = self.commit_set.filter(
+                commit_date__gt=now - timedelta(weeks=52),
+            ).values_list('commit_date', flat=True)
+        self._save_commit_weeks(commit_weeks(commit_dates, now), now)
+
+    def add_commit_weeks(self, commit_dates):
+        """ Counts freshly stored commits into the weekly commit histogram. """
+        weeks = self._stored_commit_weeks()
+        if weeks is None:
+            self.rebuild_commit_weeks()
+            return
+        weeks, since = roll_commit_weeks(weeks, self.commit_list_since, datetime.now())
+        weeks = [count + new for count, new in zip(weeks, commit_weeks(commit_dates, since))]
+        self._save_commit_weeks(weeks, since)
+
+    def commits_over_52_listed(self):
+        weeks = self._stored_commit_weeks()
+        if weeks is None:
+            self.rebuild_commit_weeks()
+            weeks = self._stored_commit_weeks()
+        weeks, since = roll_commit_weeks(weeks, self.commit_list_since, datetime.now())
+        return weeks
 
     def commits_over_52(self):
-        cache_name = self.cache_namer(self.commits_over_52)
-        value = cache.get(cache_name)
-        if value is not None:
-            return value
-        now = datetime.now()
-        commits = self.commit_set.filter(
-            commit_date__gt=now - timedelta(weeks=52),
-        ).values_list('commit_date', flat=True)
-
-        weeks = [0] * 52
-        for cdate in commits:
-            age_weeks = (now - cdate).days // 7
-            if age_weeks < 52:
-                weeks[age_weeks] += 1
-
-        value = ','.join(map(str, reversed(weeks)))
-        cache.set(cache_name, value)
-        return value
+        return ','.join(map(str, self.commits_over_52_listed()))
 
     def fetch_pypi_data(self, *args, **kwargs):
         # Get the releases from pypi
@@ -349,36 +404,63 @@ class Project(BaseModel):
         signal_fetch_latest_metadata.send(sender=self)
         self.save()
 
-    def grid_clear_detail_template_cache(self):
-        for grid in self.grids():
-            grid.clear_detail_template_cache()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Project, cls).from_db(db, field_names, values)
+        # remembered to tell whether a save() changes what the autocomplete index holds
+        instance._loaded_name_slug = (instance.__dict__.get('name'), instance.__dict__.get('slug'))
+        # and whether it publishes the project or changes its approval request, shown on the homepage
+        instance._loaded_status = (
+            instance.__dict__.get('is_published'), instance.__dict__.get('is_awaiting_approval')
+        )
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.repo_description:
             self.repo_description = ""
-        self.grid_clear_detail_template_cache()
+        if not self._state.adding and 'update_fields' not in kwargs:
+            # usage_count is maintained in the database, a stale copy must not overwrite it
+            skipped = self.get_deferred_fields() | {'usage_count'}
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        renamed = getattr(self, '_loaded_name_slug', None) != (self.name, self.slug)
+        status_changed = getattr(self, '_loaded_status', None) != (self.is_published, self.is_awaiting_approval)
         super(Project, self).save(*args, **kwargs)
+        invalidate_project(self.pk)
+        if renamed:
+            invalidate_autocomplete_index()
+            self._loaded_name_slug = (self.name, self.slug)
+        if status_changed or (renamed and self.is_awaiting_approval):
+            approval_queue.invalidate()
+        if status_changed:
+            invalidate_snapshot()
+            invalidate_published_ids()
+            self._loaded_status = (self.is_published, self.is_awaiting_approval)
+
+    def delete(self, *args, **kwargs):
+        invalidate_project(self.pk)
+        result = super(Project, self).delete(*args, **kwargs)
+        invalidate_autocomplete_index()
+        invalidate_snapshot()
+        invalidate_published_ids()
+        approval_queue.invalidate()
+        return result
 
     def fetch_commits(self):
         self.repo.fetch_commits(self)
 
+    def clear_commit_cache(self):
+        Project.last_updated.invalidate(self.pk)
+
+    @cached_method(("package.Version", "package_id"))
     def pypi_version(self):
-        cache_name = self.cache_namer(self.pypi_version)
-        version = cache.get(cache_name)
-        if version is not None:
-            return version
-        version = get_pypi_version(self)
-        cache.set(cache_name, version)
-        return version
+        return get_pypi_version(self)
 
+    @cached_method(("package.Version", "package_id"))
     def last_released(self):
-        cache_name = self.cache_namer(self.last_released)
-        version = cache.get(cache_name)
-        if version is not None:
-            return version
-        version = get_version(self)
-        cache.set(cache_name, version)
-        return version
+        return get_version(self)
 
     @property
     def development_status(self):
@@ -403,6 +485,7 @@ class Project(BaseModel):
     class Meta:
         ordering = ['name']
         get_latest_by = 'id'
+        indexes = [models.Index(fields=['modified', 'id'], name='package_project_modified')]
 
     def __str__(self):
         return self.name
@@ -415,9 +498,6 @@ class Project(BaseModel):
     def last_commit(self):
         return self.commit_set.latest()
 
-    def commits_over_52_listed(self):
-        return [int(x) for x in self.commits_over_52().split(',')]
-
     @property
     def status_description(self):
         return next(
@@ -429,6 +509,71 @@ class Project(BaseModel):
         )
 
 
+def rebuild_missing_commit_weeks(projects, now=None):
+    """ Stores the commit histograms which were never stored, from a single query. """
+    now = now or datetime.now()
+    missing = [project for project in projects if project.commit_list_since is None or not project.commit_list]
+    if not missing:
+        return
+    recent_commits = defaultdict(list)
+    for package_id, commit_date in Commit.objects.filter(
+            package__in=[project.pk for project in missing],
+            commit_date__gt=now - timedelta(weeks=52)).values_list('package', 'commit_date'):
+        recent_commits[package_id].append(commit_date)
+    for project in missing:
+        project.rebuild_commit_weeks(now, recent_commits[project.pk])
+
+
+def used_packages_cache_key(user_pk):
+    return "sitewide_used_packages_list_{}".format(user_pk)
+
+
+depends_on_m2m(Project.usage.through, lambda project_pks, user_pks: [
+    used_packages_cache_key(user_pk) for user_pk in user_pks
+])
+depends_on(Project.usage.through, lambda usage: [used_packages_cache_key(usage.user_id)])
+
+
+def _change_usage_count(project_pks, delta):
+    Project.objects.filter(pk__in=project_pks).update(usage_count=F('usage_count') + delta)
+
+
+def count_saved_usage(sender, instance, created, **kwargs):
+    if created:
+        _change_usage_count([instance.project_id], 1)
+
+
+def count_deleted_usage(sender, instance, **kwargs):
+    # also sent for the rows removed by usage.remove() or by deleting a user
+    _change_usage_count([instance.project_id], -1)
+
+
+def count_added_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    # usage.add() inserts the rows with bulk_create, without post_save;
+    # pk_set holds only the links which did not exist yet
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        _change_usage_count(pk_set, 1)
+    else:
+        _change_usage_count([instance.pk], len(pk_set))
+
+
+post_save.connect(count_saved_usage, sender=Project.usage.through, dispatch_uid="package.usage_count.post_save")
+post_delete.connect(count_deleted_usage, sender=Project.usage.through, dispatch_uid="package.usage_count.post_delete")
+m2m_changed.connect(count_added_usage, sender=Project.usage.through, dispatch_uid="package.usage_count.m2m_changed")
+
+
+ApprovalRequest = namedtuple('ApprovalRequest', ['slug', 'name'])
+
+# projects awaiting approval, shown to trusted users on every page
+approval_queue = SharedValue("approval_queue", lambda: [
+    ApprovalRequest(*row) for row in Project.objects.filter(is_awaiting_approval=True).order_by(
+        'approval_request_datetime'
+    ).values_list('slug', 'name')
+])
+
+
 class TeamMembership(BaseModel):
     account = models.ForeignKey(Account, default=None, blank=True, null=True)
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
@@ -463,6 +608,22 @@ class ProjectImage(BaseModel):
         content_types=['image/png', 'image/jpeg'],
         max_upload_size=1024*1024*5,
     )
+    # manifest of the thumbnails made by prepare_thumbnails: [{"file", "width", "height"}]
+    thumbnails = JSONField(default=list, blank=True, editable=False)
+
+    def update_thumbnails(self, force=False):
+        """ Makes the thumbnails of the image, if they are out of date, and stores their manifest. """
+        prepare_thumbnails(self.img.path, force)
+        self.store_thumbnails(read_thumbnail_manifest(self.img.path))
+
+    def store_thumbnails(self, manifest):
+        thumbnails = sorted(manifest["thumbnails"], key=lambda thumb: thumb["width"]) if manifest else []
+        if thumbnails != self.thumbnails:
+            self.thumbnails = thumbnails
+            ProjectImage.objects.filter(pk=self.pk).update(thumbnails=thumbnails)
+
+    def thumbnail_url(self, thumbnail):
+        return "{}/thumbs/{}".format(os.path.dirname(self.img.url), thumbnail["file"])
 
     def image_tag(self):
         return u'<img src="%s" />' % self.img.url
@@ -500,50 +661,101 @@ class PackageExample(BaseModel):
         return "http://" + self.url
 
 
+class CommitManager(models.Manager):
+    def ingest(self, package, commits, newest_first=False):
+        """ Stores ``(commit_hash, commit_date)`` pairs of ``package`` which
+            aren't stored yet, with a single query for the existing commits and
+            a bulk insert. With ``newest_first`` consuming ``commits`` stops at
+            the first commit which is already stored.
+
+            return: number of created commits
+        """
+        known_hashes = set()
+        known_dates = set()
+        for commit_hash, commit_date in self.filter(package=package).values_list('commit_hash', 'commit_date'):
+            if commit_hash:
+                known_hashes.add(commit_hash)
+            else:
+                # commits stored before hashes were recorded
+                known_dates.add(commit_date)
+
+        new_commits = []
+        for commit_hash, commit_date in commits:
+            if isinstance(commit_date, str):
+                commit_date = parse_datetime(commit_date)
+            if timezone.is_aware(commit_date):
+                commit_date = timezone.make_naive(commit_date)
+
+            if commit_hash in known_hashes or commit_date in known_dates:
+                if newest_first:
+                    break
+                continue
+
+            known_hashes.add(commit_hash)
+            new_commits.append(self.model(package=package, commit_hash=commit_hash, commit_date=commit_date))
+
+        if new_commits:
+            self.bulk_create(new_commits, batch_size=500)
+            package.clear_commit_cache()
+            package.add_commit_weeks([commit.commit_date for commit in new_commits])
+        return len(new_commits)
+
+
 class Commit(BaseModel):
 
     package = models.ForeignKey(Project)
     commit_date = models.DateTimeField(_("Commit Date"))
-    commit_hash = models.CharField(_("Commit Hash"), help_text="Example: Git sha or SVN commit id", max_length=150, blank=True, default="")
+    commit_hash = models.CharField(_("Commit Hash"), help_text="Example: Git sha or SVN commit id", max_length=150, blank=True, null=True, default=None)
+
+    objects = CommitManager()
 
     class Meta:
         ordering = ['-commit_date']
         get_latest_by = 'commit_date'
+        unique_together = ('package', 'commit_hash')
 
     def __str__(self):
         return "Commit for '%s' on %s" % (self.package.name, str(self.commit_date))
 
     def save(self, *args, **kwargs):
-        # reset the last_updated and commits_over_52 caches on the package
-        package = self.package
-        cache.delete(package.cache_namer(self.package.last_updated))
-        cache.delete(package.cache_namer(package.commits_over_52))
-        self.package.last_updated()
+        # count new commits on the package; last_updated is invalidated by its declared dependency
+        created = self.pk is None
         super(Commit, self).save(*args, **kwargs)
+        if created:
+            self.package.add_commit_weeks([self.commit_date])
+
+
+class RepoResponseCache(BaseModel):
+    """ Last response of a repository API, used to send conditional requests. """
+
+    url = models.CharField(_("URL"), max_length=500, unique=True)
+    etag = models.CharField(_("ETag"), max_length=255, blank=True, default="")
+    last_modified = models.CharField(_("Last-Modified"), max_length=64, blank=True, default="")
+    content = models.TextField(_("Content"), blank=True, default="")
+
+    def __str__(self):
+        return self.url
 
 
 class VersionManager(models.Manager):
     def by_version(self, visible=False, *args, **kwargs):
-        qs = self.get_queryset().filter(*args, **kwargs)
+        qs = self.get_queryset().filter(is_comparable=True, *args, **kwargs)
 
         if visible:
             qs = qs.filter(hidden=False)
 
-        def generate_valid_versions(qs):
-            for item in qs:
-                v = versioner(item.number)
-                comparable = True
-                for elem in v.version:
-                    if isinstance(elem, str):
-                        comparable = False
-                if comparable:
-                    yield item
-
-        return sorted(list(generate_valid_versions(qs)), key=lambda v: versioner(v.number))
+        return list(qs.order_by('sort_key'))
 
     def by_version_not_hidden(self, *args, **kwargs):
         return list(reversed(self.by_version(visible=True, *args, **kwargs)))
 
+    def latest_by_package(self, package_ids):
+        """ Returns ``{package id: latest comparable version}`` with a single query. """
+        qs = self.get_queryset().filter(package__in=package_ids, is_comparable=True).order_by(
+            'package', '-sort_key'
+        ).distinct('package')
+        return dict((version.package_id, version) for version in qs)
+
 
 class Version(BaseModel):
 
@@ -555,12 +767,15 @@ class Version(BaseModel):
     upload_time = models.DateTimeField(_("upload_time"), help_text=_("When this was uploaded to PyPI"), blank=True, null=True)
     development_status = models.IntegerField(_("Development Status"), choices=STATUS_CHOICES, default=0)
     supports_python3 = models.BooleanField(_("Supports Python 3"), default=False)
+    sort_key = models.CharField(_("Sort key"), max_length=255, blank=True, default="", editable=False)
+    is_comparable = models.BooleanField(_("Is comparable"), default=False, editable=False)
 
     objects = VersionManager()
 
     class Meta:
         get_latest_by = 'upload_time'
         ordering = ['-upload_time']
+        index_together = [('package', 'sort_key')]
 
     @property
     def pretty_license(self):
@@ -570,20 +785,20 @@ class Version(BaseModel):
     def pretty_status(self):
         return self.get_development_status_display().split(" ")[-1]
 
+    def fill_sort_key(self):
+        self.sort_key, self.is_comparable = version_sort_key(self.number)
+
     def save(self, *args, **kwargs):
         self.license = normalize_license(self.license)
-
-        # reset the latest_version cache on the package
-        cache_name = self.package.cache_namer(self.package.last_released)
-        cache.delete(cache_name)
-        get_version(self.package)
-
-        # reset the pypi_version cache on the package
-        cache_name = self.package.cache_namer(self.package.pypi_version)
-        cache.delete(cache_name)
-        get_pypi_version(self.package)
-
+        self.fill_sort_key()
         super(Version, self).save(*args, **kwargs)
+        if self.package_id is not None:
+            invalidate_project(self.package_id)
+
+    def delete(self, *args, **kwargs):
+        if self.package_id is not None:
+            invalidate_project(self.package_id)
+        return super(Version, self).delete(*args, **kwargs)
 
     def __str__(self):
         return "%s: %s" % (self.package.name, self.number)
@@ -94,12 +94,56 @@ class BaseHandler(object):
             "repo_regex": self.repo_regex,
         }
 
-    def get_json(self, target):
+    def get_json(self, target, headers=None):
         """
         Helpful utility method to do a quick GET for JSON data.
         """
-        r = requests.get(target)
+        data, changed = self.get_conditional_json(target, headers=headers)
+        return data
+
+    def get_conditional_json(self, target, headers=None):
+        """
+        GET for JSON data, sending the ETag and Last-Modified of the previous
+        response for ``target``, so unchanged resources are answered with
+        304 Not Modified (which doesn't count against API quotas).
+
+                return: (data, changed) - on 304 the data of the stored
+                response is returned and changed is False
+        """
+        from package.models import RepoResponseCache  # Import placed here to avoid circular dependencies
+
+        cached = RepoResponseCache.objects.filter(url=target).first()
+        request_headers = dict(headers or {})
+        if cached is not None and cached.content:
+            if cached.etag:
+                request_headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                request_headers['If-Modified-Since'] = cached.last_modified
+
+        r = requests.get(target, headers=request_headers)
+        if r.status_code == 304 and cached is not None:
+            return json.loads(cached.content), False
         if r.status_code != 200:
             r.raise_for_status()
-        return json.loads(r.content)
+
+        RepoResponseCache.objects.update_or_create(
+            url=target,
+            defaults={
+                'etag': r.headers.get('ETag', ''),
+                'last_modified': r.headers.get('Last-Modified', ''),
+                'content': r.text,
+            }
+        )
+        return json.loads(r.content), True
+
+    def get_etag(self, target):
+        """ ETag stored for ``target`` by :meth:`set_etag`, or None. """
+        from package.models import RepoResponseCache  # Import placed here to avoid circular dependencies
+
+        return RepoResponseCache.objects.filter(url=target).values_list('etag', flat=True).first() or None
+
+    def set_etag(self, target, etag):
+        from package.models import RepoResponseCache  # Import placed here to avoid circular dependencies
+
+        RepoResponseCache.objects.update_or_create(url=target, defaults={'etag': etag or ''})
 
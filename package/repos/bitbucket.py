@@ -1,4 +1,3 @@
-from datetime import datetime, timedelta
 import re
 from warnings import warn
 
@@ -25,38 +24,28 @@ class BitbucketHandler(BaseHandler):
             repo_name = repo_name[0:-1]
         target = "%s/%s/changesets/?limit=50" % (API_TARGET, repo_name)
         try:
-            data = self.get_json(target)
+            data, changed = self.get_conditional_json(target)
         except requests.exceptions.HTTPError:
             return []
         if data is None:
             return []  # todo: log this?
+        if not changed:
+            return []  # no new changesets since the last fetch
 
         return data.get("changesets", [])
 
     def fetch_commits(self, package):
         from package.models import Commit  # Import placed here to avoid circular dependencies
+        commits = []
         for commit in self._get_bitbucket_commits(package):
             timestamp = commit["timestamp"].split("+")
             if len(timestamp) > 1:
                 timestamp = timestamp[0]
             else:
                 timestamp = commit["timestamp"]
-            commit, created = Commit.objects.get_or_create(package=package, commit_date=timestamp)
-
-        #  ugly way to get 52 weeks of commits
-        # TODO - make this better
-        now = datetime.now()
-        commits = package.commit_set.filter(
-            commit_date__gt=now - timedelta(weeks=52),
-        ).values_list('commit_date', flat=True)
-
-        weeks = [0] * 52
-        for cdate in commits:
-            age_weeks = (now - cdate).days // 7
-            if age_weeks < 52:
-                weeks[age_weeks] += 1
-
-        package.commit_list = ','.join(map(str, reversed(weeks)))
+            commits.append((commit.get("raw_node"), timestamp))
+        Commit.objects.ingest(package, commits)
+
         package.save()
 
     def fetch_metadata(self, package):
@@ -1,15 +1,44 @@
-from time import sleep
-
 from django.conf import settings
 from django.utils import timezone
 
 from github3 import GitHub, login
+from github3.repos import Repository
 import requests
 
 from profiles.models import Profile, Account, AccountType
 from .base_handler import BaseHandler
+from .ratelimit import TokenBucket
 from package.utils import uniquer
 
+API_TARGET = "https://api.github.com/repos"
+
+
+class FirstPageETag(object):
+    """ Iterates a github3 iterator, keeping the ETag GitHub sent with its first page.
+
+        The ``etag`` of the iterator can't be relied on: it may be the one it
+        was given, and ``last_response`` is the response of the last page.
+    """
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.etag = None
+
+    def __iter__(self):
+        for item in self.iterator:
+            self._record()
+            yield item
+        self._record()
+
+    def _record(self):
+        response = self.iterator.last_response
+        if self.etag is None and response is not None:
+            self.etag = response.headers.get('ETag')
+
+    @property
+    def last_status(self):
+        return self.iterator.last_status
+
 
 class GitHubHandler(BaseHandler):
     title = "Github"
@@ -23,12 +52,16 @@ class GitHubHandler(BaseHandler):
             self.github = login(token=settings.GITHUB_TOKEN)
         else:
             self.github = GitHub()
+        self.ratelimit = TokenBucket(self.ratelimit_status)
+
+    def ratelimit_status(self):
+        core = self.github.rate_limit()['resources']['core']
+        return core['remaining'], core['reset']
 
     def manage_ratelimit(self):
-        while self.github.ratelimit_remaining < 10:
-            sleep(1)
+        self.ratelimit.acquire()
 
-    def _get_repo(self, package):
+    def _get_repo_target(self, package):
         repo_name = package.repo_name()
         if repo_name.endswith("/"):
             repo_name = repo_name[:-1]
@@ -36,7 +69,21 @@ class GitHubHandler(BaseHandler):
             username, repo_name = repo_name.split('/')
         except ValueError:
             return None
-        return self.github.repository(username, repo_name)
+        return "{0}/{1}/{2}".format(API_TARGET, username, repo_name)
+
+    def _get_repo(self, package):
+        target = self._get_repo_target(package)
+        if target is None:
+            return None
+
+        headers = {}
+        if settings.GITHUB_TOKEN:
+            headers['Authorization'] = 'token {0}'.format(settings.GITHUB_TOKEN)
+        try:
+            data = self.get_json(target, headers=headers)
+        except requests.exceptions.HTTPError:
+            return None
+        return Repository(data, self.github)
 
     def fetch_metadata(self, package):
         self.manage_ratelimit()
@@ -50,13 +97,18 @@ class GitHubHandler(BaseHandler):
 
         contributors = []
         github_account_type = AccountType.objects.get(name="GITHUB")
-        for contributor in repo.iter_contributors():
+        contributors_target = self._get_repo_target(package) + "/contributors"
+        contributors_iterator = FirstPageETag(repo.iter_contributors(etag=self.get_etag(contributors_target)))
+        for contributor in contributors_iterator:
             account_name = Account.syntize_name(account_type='GITHUB', account_name=contributor.login)
             account, created = Account.objects.get_or_create(account_type=github_account_type, name=account_name)
             contributors.append(account)
             self.manage_ratelimit()
 
-        package.contributors.set(contributors)
+        # 304 Not Modified - contributors are the same as during the last fetch
+        if contributors_iterator.last_status != 304:
+            package.contributors.set(contributors)
+            self.set_etag(contributors_target, contributors_iterator.etag)
         package.save()
 
         return package
@@ -70,19 +122,21 @@ class GitHubHandler(BaseHandler):
 
         from package.models import Commit  # Added here to avoid circular imports
 
-        for commit in repo.iter_commits():
-            self.manage_ratelimit()
-            try:
-                commit_record, created = Commit.objects.get_or_create(
-                    package=package,
-                    commit_date=commit.commit.committer['date']
-                )
-                if not created:
-                    break
-            except Commit.MultipleObjectsReturned:
-                continue
-            # If the commit record already exists, it means we are at the end of the
-            #   list we want to import
+        commits_target = self._get_repo_target(package) + "/commits"
+        commits_iterator = FirstPageETag(repo.iter_commits(etag=self.get_etag(commits_target)))
+
+        def commits():
+            for commit in commits_iterator:
+                self.manage_ratelimit()
+                yield commit.sha, commit.commit.committer['date']
+
+        # Commits are listed newest first, so the import stops at the first
+        #   commit which already exists
+        Commit.objects.ingest(package, commits(), newest_first=True)
+
+        # 304 Not Modified - there are no new commits since the last fetch
+        if commits_iterator.last_status != 304:
+            self.set_etag(commits_target, commits_iterator.etag)
 
         package.save()
         return package
@@ -0,0 +1,49 @@
+"""
+Token bucket shared by every thread that talks to a rate limited API.
+"""
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """ Thread-safe token bucket filled from the quota reported by the API.
+
+        ``status`` is a callable returning a ``(remaining, reset)`` tuple, where
+        ``reset`` is the unix timestamp at which the API refills the quota
+        (GitHub reports both in its ``X-RateLimit-*`` headers and ``/rate_limit``).
+
+        The bucket is synced with the API lazily: on first use, when the quota
+        window has passed and every ``sync_every`` tokens, so concurrent workers
+        never drift far from what the API actually allows. ``reserve`` tokens are
+        left untouched for interactive requests made by the site itself.
+    """
+
+    def __init__(self, status, reserve=10, sync_every=100):
+        self.status = status
+        self.reserve = reserve
+        self.sync_every = sync_every
+        self.tokens = None
+        self.reset = 0
+        self._taken_since_sync = 0
+        self._lock = threading.Lock()
+
+    def sync(self):
+        remaining, reset = self.status()
+        self.tokens = max(remaining - self.reserve, 0)
+        self.reset = reset
+        self._taken_since_sync = 0
+
+    def acquire(self):
+        """ Takes one token, blocking until the quota is refilled if needed. """
+        while True:
+            with self._lock:
+                now = time.time()
+                if self.tokens is None or now >= self.reset or self._taken_since_sync >= self.sync_every:
+                    self.sync()
+                if self.tokens > 0:
+                    self.tokens -= 1
+                    self._taken_since_sync += 1
+                    return
+                wait = max(self.reset - now, 1)
+            time.sleep(wait)
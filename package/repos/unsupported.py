@@ -15,6 +15,7 @@ class UnsupportedHandler(BaseHandler):
 
     def fetch_commits(self, package):
         package.commit_set.all().delete()
+        package.rebuild_commit_weeks()
 
 
 repo_handler = UnsupportedHandler()
@@ -0,0 +1,191 @@
+"""
+Project images resized on demand, for the widths which have no thumbnail.
+
+A resized image is cropped to ``PROJECT_IMAGE_THUMBNAIL_RATIO`` like the
+thumbnails, and kept in ``PROJECT_IMAGE_RESIZE_CACHE_DIR``. Its URL contains
+the name of the original, so it never changes and can be cached by the
+browsers for good. Concurrent requests for the same image wait for the one
+which renders it, behind a file lock. Once the cache grows over
+``PROJECT_IMAGE_RESIZE_CACHE_BYTES``, the least recently served images are
+removed; the cache is checked every ``PROJECT_IMAGE_RESIZE_EVICT_EVERY``
+renders of a process, so it may grow a little over the budget in between,
+and the directories of the images left empty are removed. The renders are
+serialized by a fixed set of ``LOCK_COUNT`` lock files, shared by the images
+whose paths hash alike; they are never removed, so a request waiting on one
+can't render the image next to one which created a new lock.
+"""
+
+import fcntl
+import itertools
+import logging
+import math
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from os.path import basename, dirname, exists, join, splitext
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+
+from package.utils import crop_image
+
+logger = logging.getLogger(__name__)
+
+EVICTION_LOCK = ".evicting"
+LOCK_DIR = ".locks"
+LOCK_COUNT = 256
+SOURCE_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png"}
+
+_renders = itertools.count(1)
+
+
+def image_version(image):
+    """ Part of the URL of the resized images which changes with the original. """
+    return splitext(basename(image.img.name))[0]
+
+
+def resized_url(img, width, image_format=None):
+    """ URL of ``img`` resized to the smallest allowed width not below ``width``,
+        in the format of the original unless given; None if it cannot be resized so.
+    """
+    width = next((allowed for allowed in sorted(settings.PROJECT_IMAGE_RESIZE_WIDTHS) if allowed >= width), None)
+    image_format = image_format or SOURCE_FORMATS.get(splitext(img.name)[1].lower())
+    if width is None or image_format not in settings.PROJECT_IMAGE_RESIZE_FORMATS:
+        return None
+    return reverse("project_image_resized", kwargs={
+        "pk": img.instance.pk,
+        "version": image_version(img.instance),
+        "width": width,
+        "image_format": image_format,
+    })
+
+
+@contextmanager
+def locked(path, blocking=True):
+    """ Holds an exclusive lock on ``path``; yields False if it is taken and ``blocking`` is not set. """
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def render(source_path, width, image_format, target_path):
+    image = Image.open(source_path)
+    x, y = image.size
+    ratio_x, ratio_y = settings.PROJECT_IMAGE_THUMBNAIL_RATIO
+    croped_x = min(x, y * ratio_x / float(ratio_y))
+
+    # never enlarged
+    width = min(width, int(croped_x))
+    height = int(round(width * ratio_y / float(ratio_x)))
+
+    # JPEGs are decoded at the smallest scale still large enough once cropped
+    image.draft(image.mode, (int(math.ceil(width * x / croped_x)), int(math.ceil(width * y / croped_x))))
+    resized = crop_image(image, settings.PROJECT_IMAGE_THUMBNAIL_RATIO).resize((width, height), Image.ANTIALIAS)
+
+    pil_format = settings.PROJECT_IMAGE_RESIZE_FORMATS[image_format]
+    if pil_format == "JPEG" and resized.mode != "RGB":
+        resized = resized.convert("RGB")
+    elif resized.mode not in ("RGB", "RGBA"):
+        resized = resized.convert("RGBA")
+
+    # a name of its own, so no other render can write to it
+    fd, tmp_path = tempfile.mkstemp(prefix=basename(target_path) + ".", suffix=".tmp", dir=dirname(target_path))
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            resized.save(tmp_file, pil_format, quality=settings.PROJECT_IMAGE_THUMBNAIL_QUALITY)
+        os.rename(tmp_path, target_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def lock_path(path):
+    # crc32 rather than hash(), which differs between the processes
+    return join(settings.PROJECT_IMAGE_RESIZE_CACHE_DIR, LOCK_DIR, "{}.lock".format(
+        zlib.crc32(path.encode()) % LOCK_COUNT
+    ))
+
+
+def get_resized(image, width, image_format):
+    """ Path of ``image`` resized to ``width`` in ``image_format``, rendered if it is not cached. """
+    image_dir = join(settings.PROJECT_IMAGE_RESIZE_CACHE_DIR, str(image.pk))
+    path = join(image_dir, "{}_{}.{}".format(image_version(image), width, image_format))
+
+    if not exists(path):
+        os.makedirs(join(settings.PROJECT_IMAGE_RESIZE_CACHE_DIR, LOCK_DIR), exist_ok=True)
+        with locked(lock_path(path)):
+            # rendered by the request which held the lock
+            if not exists(path):
+                os.makedirs(image_dir, exist_ok=True)
+                try:
+                    render(image.img.path, width, image_format, path)
+                except FileNotFoundError:
+                    # the directory was empty, and removed by evict() meanwhile
+                    os.makedirs(image_dir, exist_ok=True)
+                    render(image.img.path, width, image_format, path)
+                logger.info("Resized {}".format(path))
+                if next(_renders) % settings.PROJECT_IMAGE_RESIZE_EVICT_EVERY == 0:
+                    evict()
+
+    # the modification time tells which images were served last
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return path
+
+
+def evict(budget=None):
+    """ Removes the least recently served images until the cache fits in ``budget`` bytes. """
+    budget = settings.PROJECT_IMAGE_RESIZE_CACHE_BYTES if budget is None else budget
+    cache_dir = settings.PROJECT_IMAGE_RESIZE_CACHE_DIR
+
+    with locked(join(cache_dir, EVICTION_LOCK), blocking=False) as acquired:
+        if not acquired:
+            # another process is evicting already
+            return
+
+        files = []
+        for directory, directories, filenames in os.walk(cache_dir):
+            if directory == cache_dir and LOCK_DIR in directories:
+                directories.remove(LOCK_DIR)
+            for filename in filenames:
+                if filename.endswith((".lock", ".tmp")) or filename == EVICTION_LOCK:
+                    continue
+                path = join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        if total > budget:
+            # down to 90% of the budget, so that not every new image evicts another
+            for _, size, path in sorted(files):
+                if total <= budget * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+        # of deleted images too, whose files were evicted
+        for name in os.listdir(cache_dir):
+            if name != LOCK_DIR:
+                try:
+                    os.rmdir(join(cache_dir, name))
+                except OSError:
+                    # not empty, or not a directory
+                    pass
@@ -0,0 +1,91 @@
+"""
+Jobs run by the RQ worker (``worker.py``).
+
+Thumbnails are made outside of the upload request: the upload enqueues a job
+per image, once the transaction which saved the image commits, and the pages
+show the original image until the job has stored the thumbnail manifest. An
+image which already waits in the queue is not enqueued again; the marker is
+kept in the Redis of the queue, so it is gone whenever the queue is. A failed
+job is put back at the end of the low priority queue, up to
+``THUMBNAIL_JOB_ATTEMPTS`` times. Without the worker (``THUMBNAIL_ASYNC`` off)
+the thumbnails are made once, in the upload request; a failure is only logged.
+
+A Redis which can't be reached doesn't fail the upload: the image is shown
+without thumbnails until the next ``project_image_thumbnailer`` run.
+"""
+
+import logging
+
+import redis
+from redis.exceptions import RedisError
+from rq import Queue
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+QUEUED_KEY = "thumbnails:queued:{}"
+RETRY_QUEUE = "low"
+
+
+def get_connection():
+    return redis.from_url(settings.REDIS_URL)
+
+
+def get_queue(name):
+    return Queue(name, connection=get_connection())
+
+
+def make_thumbnails(image_pk, attempt=1):
+    # Import placed here to avoid circular dependencies
+    from package.models import ProjectImage
+
+    if settings.THUMBNAIL_ASYNC:
+        # changes made from now on need another job
+        get_connection().delete(QUEUED_KEY.format(image_pk))
+    try:
+        image = ProjectImage.objects.get(pk=image_pk)
+    except ProjectImage.DoesNotExist:
+        return
+
+    try:
+        image.update_thumbnails()
+    except Exception:
+        if not settings.THUMBNAIL_ASYNC:
+            # the original image is shown until the next project_image_thumbnailer run
+            logger.error("Thumbnailing image {} failed".format(image_pk), exc_info=True)
+            return
+        if attempt >= settings.THUMBNAIL_JOB_ATTEMPTS:
+            raise
+        logger.warning("Thumbnailing image {} failed, retrying".format(image_pk), exc_info=True)
+        enqueue_thumbnails(image_pk, attempt + 1)
+
+
+def enqueue_thumbnails(image_pk, attempt=1):
+    """ Has the thumbnails of a ProjectImage made by the worker, once the current transaction commits. """
+    if not settings.THUMBNAIL_ASYNC:
+        transaction.on_commit(lambda: make_thumbnails(image_pk, attempt))
+        return
+
+    def enqueue():
+        queue = get_queue(settings.THUMBNAIL_QUEUE if attempt == 1 else RETRY_QUEUE)
+        key = QUEUED_KEY.format(image_pk)
+        marked = False
+        try:
+            if attempt == 1:
+                marked = queue.connection.set(key, 1, ex=settings.THUMBNAIL_JOB_TIMEOUT, nx=True)
+                if not marked:
+                    return
+            queue.enqueue_call(
+                make_thumbnails, args=(image_pk, attempt), timeout=settings.THUMBNAIL_JOB_TIMEOUT
+            )
+        except RedisError:
+            logger.error("Enqueueing the thumbnails of image {} failed".format(image_pk), exc_info=True)
+            if marked:
+                try:
+                    queue.connection.delete(key)
+                except RedisError:
+                    pass
+
+    transaction.on_commit(enqueue)
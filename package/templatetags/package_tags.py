@@ -1,9 +1,13 @@
-from os.path import splitext, dirname, basename, isfile
+from collections import OrderedDict
+
+from PIL import Image
+
 from django import template
 from django.conf import settings
 from django.core.urlresolvers import reverse
 
 from package.context_processors import used_packages_list
+from package.resize import resized_url
 
 register = template.Library()
 
@@ -80,6 +84,11 @@ def project_tile(context, package, style=None):
     return context
 
 
+def _thumbnails(img):
+    # the manifest stored by ProjectImage.update_thumbnails, smallest first
+    return getattr(img.instance, 'thumbnails', None) or []
+
+
 @register.filter
 def thumb(img, width):
 
@@ -91,16 +100,54 @@ def thumb(img, width):
     if size is None:
         return img.url if img else '/static/img/noimage/1280x720.png'
 
-    base = dirname(img.url)
-    filename, ext = splitext(basename(img.url))
-    path = "{base}/thumbs/{filename}_{size}{ext}".format(
-        base=base,
-        filename=filename,
-        size="x".join(map(str, size)),
-        ext=ext
+    thumbnail = next((thumbnail for thumbnail in _thumbnails(img) if thumbnail["width"] >= size[0]), None)
+    if thumbnail is not None:
+        return img.instance.thumbnail_url(thumbnail)
+    else:
+        # no thumbnail yet, or none as wide: resized on demand rather than the whole original
+        return resized_url(img, width) or img.url
+
+
+@register.filter
+def thumb_srcset(img):
+    """ The thumbnails of a project image as a 'srcset' attribute value. """
+    if not img:
+        return ''
+    return ", ".join(
+        "{url} {width}w".format(url=img.instance.thumbnail_url(thumbnail), width=thumbnail["width"])
+        for thumbnail in _thumbnails(img)
     )
 
-    if isfile(path.replace('/media', settings.MEDIA_ROOT)):
-        return path
-    else:
-        return img.url
+
+@register.inclusion_tag('package/templatetags/_thumb_picture.html')
+def thumb_picture(img, width, css_class='', alt=''):
+    """ A project image shown ``width`` pixels wide, as a <picture> offering its
+        thumbnails in every format they were all saved in, in the order of
+        PROJECT_IMAGE_THUMBNAIL_VARIANTS.
+    """
+    thumbnails = _thumbnails(img) if img else []
+    srcsets = OrderedDict()
+    for thumbnail in thumbnails:
+        for variant in thumbnail.get("variants", []):
+            srcsets.setdefault(variant["type"], []).append(
+                "{url} {width}w".format(url=img.instance.thumbnail_url(variant), width=thumbnail["width"])
+            )
+
+    # a type missing some widths would have the browsers pick a too small image of it
+    preferred = [
+        Image.MIME.get(image_format, "image/{}".format(image_format.lower()))
+        for image_format, quality in settings.PROJECT_IMAGE_THUMBNAIL_VARIANTS
+    ]
+    sources = sorted(
+        (image_type for image_type, srcset in srcsets.items() if len(srcset) == len(thumbnails)),
+        key=lambda image_type: preferred.index(image_type) if image_type in preferred else len(preferred)
+    )
+
+    return {
+        "src": thumb(img, width),
+        "srcset": thumb_srcset(img),
+        "sizes": "{}px".format(width),
+        "sources": [{"type": image_type, "srcset": ", ".join(srcsets[image_type])} for image_type in sources],
+        "css_class": css_class,
+        "alt": alt,
+    }
@@ -2,6 +2,9 @@
 
 from .test_models import *
 from package.tests.test_repos import *
+from package.tests.test_resize import *
+from package.tests.test_tasks import *
+from package.tests.test_templatetags import *
 from package.tests.test_utils import *
 from package.tests.test_views import *
 from package.tests.test_signals import SignalTests
\ No newline at end of file
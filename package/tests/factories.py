@@ -0,0 +1,35 @@
+"""
+Rows and files shared by the tests of several apps.
+"""
+
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
+from package.models import Category, Project, ProjectImage
+
+
+def make_project(name='Project', slug='project', **kwargs):
+    category, created = Category.objects.get_or_create(title='App', slug='app')
+    return Project.objects.create(name=name, slug=slug, category=category, **kwargs)
+
+
+def make_temp_dir(test_case):
+    """ A directory removed once ``test_case`` is done. """
+    path = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, path)
+    return path
+
+
+def make_image_file(media_root, name='imgs/1/1.png', size=(400, 300)):
+    """ Saves a plain image as ``name`` under ``media_root``; returns ``name``. """
+    path = os.path.join(media_root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', size, 'red').save(path)
+    return name
+
+
+def make_project_image(project=None, img='imgs/1/1.png'):
+    return ProjectImage.objects.create(project=project or make_project(), img=img)
@@ -1,6 +1,7 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-from package.models import Project, Version, versioner
+from package.models import Category, Commit, Project, Version
 from package.tests import data, initial_data
 
 class VersionTests(TestCase):
@@ -26,6 +27,12 @@ class VersionTests(TestCase):
         v.save()
         self.assertEqual(v.license,"Custom")
 
+    def test_latest_by_package(self):
+        p = Project.objects.get(slug='django-cms')
+        self.assertEqual(p.pypi_version(), '2.1.3')
+        latest = Version.objects.latest_by_package([p.pk])
+        self.assertEqual(latest[p.pk].number, '2.1.3')
+
 class PackageTests(TestCase):
     def setUp(self):
         initial_data.load()
@@ -33,3 +40,70 @@ class PackageTests(TestCase):
     def test_license_latest(self):
         for p in Project.objects.all():
             self.assertEqual("UNKNOWN", p.license_latest)
+
+
+class CommitTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.project = Project.objects.create(name='Steem Projects', slug='steem-projects', category=category)
+
+    def test_ingest_skips_known_commits(self):
+        commits = [
+            ('c3', '2018-03-03T10:00:00'),
+            ('c2', '2018-03-02T10:00:00'),
+            ('c1', '2018-03-01T10:00:00'),
+        ]
+        self.assertEqual(Commit.objects.ingest(self.project, commits[1:]), 2)
+        self.assertEqual(Commit.objects.ingest(self.project, commits), 1)
+        self.assertEqual(Commit.objects.ingest(self.project, commits), 0)
+        self.assertEqual(self.project.commit_set.count(), 3)
+
+    def test_ingest_newest_first_stops_at_known_commit(self):
+        Commit.objects.ingest(self.project, [('c1', '2018-03-01T10:00:00')])
+        commits = [
+            ('c3', '2018-03-03T10:00:00'),
+            ('c1', '2018-03-01T10:00:00'),
+            ('c0', '2018-02-28T10:00:00'),
+        ]
+        self.assertEqual(Commit.objects.ingest(self.project, commits, newest_first=True), 1)
+        self.assertFalse(self.project.commit_set.filter(commit_hash='c0').exists())
+
+
+class UsageCountTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.project = Project.objects.create(name='Steem Projects', slug='steem-projects', category=category)
+        self.user = User.objects.create_user('user', 'user@example.com', 'user')
+        self.other = User.objects.create_user('other', 'other@example.com', 'other')
+
+    def usage_count(self):
+        return Project.objects.get(pk=self.project.pk).usage_count
+
+    def test_add_and_remove_usage(self):
+        self.assertTrue(self.project.add_usage(self.user))
+        self.assertFalse(self.project.add_usage(self.user))
+        self.assertEqual(self.usage_count(), 1)
+        self.assertTrue(self.project.remove_usage(self.user))
+        self.assertFalse(self.project.remove_usage(self.user))
+        self.assertEqual(self.usage_count(), 0)
+
+    def test_usage_manager(self):
+        self.project.usage.add(self.user, self.other)
+        self.project.usage.add(self.user)
+        self.assertEqual(self.usage_count(), 2)
+        self.project.usage.remove(self.user)
+        self.assertEqual(self.usage_count(), 1)
+        self.other.delete()
+        self.assertEqual(self.usage_count(), 0)
+
+    def test_stale_instance_keeps_count(self):
+        self.project.add_usage(self.user)
+        self.project.save()
+        self.assertEqual(self.usage_count(), 1)
+
+    def test_reconcile(self):
+        self.project.usage.add(self.user)
+        Project.objects.filter(pk=self.project.pk).update(usage_count=5)
+        self.assertEqual(Project.objects.reconcile_usage_counts(), 1)
+        self.assertEqual(self.usage_count(), 1)
+        self.assertEqual(Project.objects.reconcile_usage_counts(), 0)
@@ -1,4 +1,8 @@
 import json
+import time
+from unittest.mock import Mock, patch
+
+import requests
 
 from django.test import TestCase
 
@@ -6,8 +10,9 @@ from package.repos import get_repo_for_repo_url
 from package.repos.bitbucket import repo_handler as bitbucket_handler
 from package.repos.github import repo_handler as github_handler
 from package.repos.base_handler import BaseHandler
+from package.repos.ratelimit import TokenBucket
 from package.repos.unsupported import UnsupportedHandler
-from package.models import Commit, Project, Category
+from package.models import Commit, Project, Category, RepoResponseCache
 
 
 class BaseBase(TestCase):
@@ -243,3 +248,109 @@ class TestRepos(BaseBase):
         self.assertEqual(g.url, "https://github.com")
         self.assertTrue("github" in supported_repos())
         self.assertRaises(ImportError, lambda: get_repo("xyzzy"))
+
+
+class TestTokenBucket(TestCase):
+    def test_tokens_come_from_status(self):
+        calls = []
+
+        def status():
+            calls.append(1)
+            return 13, time.time() + 3600
+
+        bucket = TokenBucket(status, reserve=10)
+        for __ in range(3):
+            bucket.acquire()
+        self.assertEqual(bucket.tokens, 0)
+        self.assertEqual(len(calls), 1)
+
+    def test_resyncs_after_sync_every(self):
+        calls = []
+
+        def status():
+            calls.append(1)
+            return 100, time.time() + 3600
+
+        bucket = TokenBucket(status, reserve=0, sync_every=5)
+        for __ in range(6):
+            bucket.acquire()
+        self.assertEqual(len(calls), 2)
+
+
+class TestConditionalRequests(TestCase):
+    target = "https://api.example.com/repos/foo/bar"
+
+    def response(self, status_code, content=b'', headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers.update(headers or {})
+        return response
+
+    def test_not_modified_returns_stored_response(self):
+        handler = BaseHandler()
+        first = self.response(200, b'{"watchers": 3}', {'ETag': '"abc"'})
+        with patch('package.repos.base_handler.requests.get', return_value=first):
+            self.assertEqual(handler.get_conditional_json(self.target), ({'watchers': 3}, True))
+
+        with patch('package.repos.base_handler.requests.get', return_value=self.response(304)) as get:
+            self.assertEqual(handler.get_conditional_json(self.target), ({'watchers': 3}, False))
+        self.assertEqual(get.call_args[1]['headers']['If-None-Match'], '"abc"')
+        self.assertEqual(RepoResponseCache.objects.count(), 1)
+
+
+class FakeGitHubIterator(object):
+    """ Pages of a github3 iterator, keeping the ETag it was given like some github3 versions do. """
+
+    def __init__(self, pages, etag=None):
+        self.pages = pages
+        self.etag = etag
+        self.last_response = None
+        self.last_status = 0
+
+    def __iter__(self):
+        for status_code, etag, items in self.pages:
+            self.last_response = Mock(headers={'ETag': etag})
+            self.last_status = status_code
+            for item in items:
+                yield item
+
+
+class TestGithubETags(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.package = Project.objects.create(
+            name="Steem", slug="steem", repo_url="https://github.com/steemit/steem", category=category
+        )
+        self.target = "https://api.github.com/repos/steemit/steem/commits"
+
+    def commit(self, sha, date):
+        return Mock(sha=sha, commit=Mock(committer={'date': date}))
+
+    def fetch_commits(self, *pages):
+        repo = Mock()
+        repo.iter_commits.side_effect = lambda etag: FakeGitHubIterator(pages, etag)
+        with patch.object(github_handler, '_get_repo', return_value=repo), \
+                patch.object(github_handler, 'manage_ratelimit'):
+            github_handler.fetch_commits(self.package)
+        return repo.iter_commits.call_args[1]['etag']
+
+    def test_changed_between_fetches(self):
+        sent = self.fetch_commits(
+            (200, '"first"', [self.commit('b', '2018-01-02T00:00:00Z')]),
+            (200, '"first page 2"', [self.commit('a', '2018-01-01T00:00:00Z')]),
+        )
+        self.assertIsNone(sent)
+        self.assertEqual(github_handler.get_etag(self.target), '"first"')
+
+        sent = self.fetch_commits(
+            (200, '"second"', [self.commit('c', '2018-01-03T00:00:00Z'), self.commit('b', '2018-01-02T00:00:00Z')]),
+        )
+        self.assertEqual(sent, '"first"')
+        self.assertEqual(github_handler.get_etag(self.target), '"second"')
+        self.assertEqual(Commit.objects.filter(package=self.package).count(), 3)
+
+        sent = self.fetch_commits((304, '"second"', []))
+        self.assertEqual(sent, '"second"')
+        self.assertEqual(github_handler.get_etag(self.target), '"second"')
@@ -0,0 +1,90 @@
+import itertools
+import os
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from package.resize import evict, get_resized
+from package.tests.factories import make_image_file, make_project_image, make_temp_dir
+
+
+class ResizeTest(TestCase):
+
+    def setUp(self):
+        media_root = make_temp_dir(self)
+        make_image_file(media_root, size=(800, 600))
+        self.settings_override = self.settings(
+            MEDIA_ROOT=media_root, PROJECT_IMAGE_RESIZE_CACHE_DIR=make_temp_dir(self)
+        )
+        self.settings_override.enable()
+        self.image = make_project_image()
+
+    def tearDown(self):
+        self.settings_override.disable()
+
+    def url(self, width, image_format='png', version='1'):
+        return reverse('project_image_resized', kwargs={
+            'pk': self.image.pk, 'version': version, 'width': width, 'image_format': image_format
+        })
+
+    def test_resize(self):
+        response = self.client.get(self.url(320, 'webp'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (320, 180))
+
+    def test_not_enlarged(self):
+        with Image.open(get_resized(self.image, 1280, 'png')) as image:
+            self.assertEqual(image.size, (800, 450))
+
+    def test_cached(self):
+        path = get_resized(self.image, 320, 'png')
+        os.utime(path, (0, 0))
+        self.assertEqual(get_resized(self.image, 320, 'png'), path)
+        # served again, so the most recently used
+        self.assertGreater(os.path.getmtime(path), 0)
+
+    def test_whitelist(self):
+        self.assertEqual(self.client.get(self.url(321)).status_code, 404)
+        self.assertEqual(self.client.get(self.url(320, 'gif')).status_code, 404)
+
+    def test_replaced_image(self):
+        response = self.client.get(self.url(320, version='0'))
+        self.assertRedirects(response, self.url(320), fetch_redirect_response=False)
+
+    def test_evict(self):
+        oldest = get_resized(self.image, 64, 'png')
+        os.utime(oldest, (0, 0))
+        newest = get_resized(self.image, 128, 'png')
+        # room for the newest only, once evicted down to 90% of the budget
+        evict(budget=int(os.path.getsize(newest) / 0.9) + 1)
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(newest))
+        # no file left next to the images but the images
+        self.assertEqual(os.listdir(os.path.dirname(newest)), [os.path.basename(newest)])
+
+    def test_evict_removes_empty_directories(self):
+        path = get_resized(self.image, 64, 'png')
+        evict(budget=0)
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+        # rendered again, in a new directory
+        self.assertEqual(get_resized(self.image, 64, 'png'), path)
+        self.assertTrue(os.path.exists(path))
+
+    def test_evicts_every_few_renders(self):
+        with self.settings(PROJECT_IMAGE_RESIZE_EVICT_EVERY=2), \
+                patch('package.resize._renders', itertools.count(1)), \
+                patch('package.resize.evict') as evict_mock:
+            for width in (64, 128, 160):
+                path = get_resized(self.image, width, 'png')
+            # served from the cache, not rendered
+            get_resized(self.image, 64, 'png')
+        self.assertEqual(evict_mock.call_count, 1)
+        self.assertFalse([name for name in os.listdir(os.path.dirname(path)) if name.endswith('.tmp')])
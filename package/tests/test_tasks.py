@@ -0,0 +1,98 @@
+from unittest.mock import Mock, patch
+
+from redis.exceptions import ConnectionError
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from package import tasks
+from package.tasks import QUEUED_KEY, enqueue_thumbnails, make_thumbnails
+from package.tests.factories import make_image_file, make_project, make_project_image, make_temp_dir
+
+
+class MakeThumbnailsTest(TestCase):
+
+    def setUp(self):
+        self.media_root = make_temp_dir(self)
+        make_image_file(self.media_root)
+        self.project = make_project()
+
+    def test_stores_manifest(self):
+        image = make_project_image(self.project)
+        with self.settings(MEDIA_ROOT=self.media_root):
+            make_thumbnails(image.pk)
+        image.refresh_from_db()
+        self.assertEqual(
+            [thumbnail["file"] for thumbnail in image.thumbnails],
+            ['1_64x36.png', '1_128x72.png', '1_320x180.png', '1.png']
+        )
+
+    def test_failure_logged(self):
+        image = make_project_image(self.project, 'imgs/1/missing.png')
+        # made in the upload request, which must not fail
+        with self.settings(MEDIA_ROOT=self.media_root), self.assertLogs('package.tasks', 'ERROR'):
+            make_thumbnails(image.pk)
+        image.refresh_from_db()
+        self.assertFalse(image.thumbnails)
+
+    def test_deleted_image(self):
+        make_thumbnails(0)
+
+
+class FakeRedis(object):
+
+    def __init__(self):
+        self.keys = {}
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    def delete(self, key):
+        self.keys.pop(key, None)
+
+
+@override_settings(THUMBNAIL_ASYNC=True, THUMBNAIL_JOB_ATTEMPTS=2)
+class EnqueueThumbnailsTest(TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.queue = Mock(connection=self.redis)
+        patches = [
+            patch('package.tasks.get_queue', return_value=self.queue),
+            patch('package.tasks.get_connection', return_value=self.redis),
+            # test cases run inside a transaction, so nothing is ever committed
+            patch('package.tasks.transaction.on_commit', side_effect=lambda callback: callback()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_enqueued_once(self):
+        enqueue_thumbnails(1)
+        enqueue_thumbnails(1)
+        self.assertEqual(self.queue.enqueue_call.call_count, 1)
+        self.assertIn(QUEUED_KEY.format(1), self.redis.keys)
+
+        # the job started, so the image is enqueued again
+        make_thumbnails(1)
+        enqueue_thumbnails(1)
+        self.assertEqual(self.queue.enqueue_call.call_count, 2)
+
+    def test_redis_down(self):
+        self.queue.enqueue_call.side_effect = ConnectionError
+        enqueue_thumbnails(1)
+        self.assertNotIn(QUEUED_KEY.format(1), self.redis.keys)
+
+    def test_retry(self):
+        image = make_project_image(img='imgs/1/missing.png')
+
+        with self.settings(MEDIA_ROOT=make_temp_dir(self)):
+            make_thumbnails(image.pk)
+            self.assertEqual(self.queue.enqueue_call.call_args[1]['args'], (image.pk, 2))
+            tasks.get_queue.assert_called_with('low')
+            # the last attempt
+            self.assertRaises(IOError, make_thumbnails, image.pk, 2)
+        self.assertEqual(self.queue.enqueue_call.call_count, 1)
@@ -0,0 +1,77 @@
+from django.test import TestCase
+
+from package.models import ProjectImage
+from package.templatetags.package_tags import thumb, thumb_picture, thumb_srcset
+from package.tests.factories import make_project_image
+
+
+class ThumbTest(TestCase):
+
+    def setUp(self):
+        self.image = make_project_image(img='imgs/1/1.jpg')
+
+    def resized(self, width):
+        return '/projects/images/{}/1/{}.jpeg'.format(self.image.pk, width)
+
+    def test_without_manifest(self):
+        self.assertEqual(thumb(self.image.img, 128), self.resized(128))
+        self.assertEqual(thumb(self.image.img, 300), self.resized(320))
+        self.assertEqual(thumb_srcset(self.image.img), '')
+
+    def test_manifest(self):
+        self.image.store_thumbnails({"thumbnails": [
+            {"file": "1.jpg", "width": 400, "height": 225},
+            {"file": "1_320x180.jpg", "width": 320, "height": 180},
+            {"file": "1_128x72.jpg", "width": 128, "height": 72},
+        ]})
+        image = ProjectImage.objects.get(pk=self.image.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(thumb(image.img, 100), '/media/imgs/1/thumbs/1_128x72.jpg')
+            self.assertEqual(thumb(image.img, 320), '/media/imgs/1/thumbs/1_320x180.jpg')
+            # no 640 wide thumbnail
+            self.assertEqual(thumb(image.img, 500), self.resized(640))
+            self.assertEqual(
+                thumb_srcset(image.img),
+                '/media/imgs/1/thumbs/1_128x72.jpg 128w, /media/imgs/1/thumbs/1_320x180.jpg 320w, '
+                '/media/imgs/1/thumbs/1.jpg 400w'
+            )
+
+    def test_no_image(self):
+        self.assertEqual(thumb(None, 128), '/static/img/noimage/128x72.png')
+
+    def test_wider_than_thumbnails(self):
+        self.assertEqual(thumb(self.image.img, 2000), '/media/imgs/1/1.jpg')
+
+    def test_picture(self):
+        self.image.store_thumbnails({"thumbnails": [
+            {"file": "1_128x72.png", "width": 128, "height": 72, "bytes": 1000, "variants": [
+                {"file": "1_128x72.webp", "type": "image/webp", "bytes": 500},
+                {"file": "1_128x72.avif", "type": "image/avif", "bytes": 400},
+            ]},
+            {"file": "1.png", "width": 400, "height": 225, "bytes": 5000, "variants": [
+                {"file": "1.webp", "type": "image/webp", "bytes": 2500},
+            ]},
+        ]})
+        context = thumb_picture(self.image.img, 128, "tile", "Project")
+        self.assertEqual(context["src"], '/media/imgs/1/thumbs/1_128x72.png')
+        self.assertEqual(context["sizes"], '128px')
+        # no 400 wide AVIF
+        self.assertEqual(context["sources"], [
+            {
+                "type": "image/webp",
+                "srcset": '/media/imgs/1/thumbs/1_128x72.webp 128w, /media/imgs/1/thumbs/1.webp 400w',
+            },
+        ])
+        self.assertEqual(thumb_picture(None, 128)["sources"], [])
+
+    def test_picture_order(self):
+        self.image.store_thumbnails({"thumbnails": [
+            {"file": "1.png", "width": 400, "height": 225, "bytes": 5000, "variants": [
+                {"file": "1.webp", "type": "image/webp", "bytes": 2500},
+                {"file": "1.avif", "type": "image/avif", "bytes": 2000},
+            ]},
+        ]})
+        with self.settings(PROJECT_IMAGE_THUMBNAIL_VARIANTS=(("AVIF", 60), ("WEBP", 80))):
+            sources = thumb_picture(self.image.img, 400)["sources"]
+        self.assertEqual([source["type"] for source in sources], ["image/avif", "image/webp"])
@@ -1,6 +1,17 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from PIL import Image
+
 from django.test import TestCase
+from django.test.utils import override_settings
 
-from package.utils import uniquer, normalize_license
+from package.utils import (
+    uniquer, normalize_license, commit_weeks, roll_commit_weeks, version_sort_key, prepare_thumbnails,
+    read_thumbnail_manifest, thumbnail_variant_formats,
+)
 
 
 class UtilsTest(TestCase):
@@ -17,3 +28,93 @@ class UtilsTest(TestCase):
                 "License :: OSI Approved :: MIT License")
         self.assertEqual(normalize_license("Pow" * 80), "Custom")
         self.assertEqual(normalize_license("MIT"), "MIT")
+
+    def test_commit_weeks(self):
+        now = datetime(2018, 3, 15, 12, 0)
+        weeks = commit_weeks([now, now - timedelta(days=8), now - timedelta(weeks=60), now + timedelta(days=1)], now)
+        self.assertEqual(len(weeks), 52)
+        self.assertEqual(weeks[-1], 2)
+        self.assertEqual(weeks[-2], 1)
+        self.assertEqual(sum(weeks), 3)
+
+    def test_roll_commit_weeks(self):
+        since = datetime(2018, 3, 1, 12, 0)
+        weeks = list(range(52))
+
+        self.assertEqual(roll_commit_weeks(weeks, since, since + timedelta(days=6)), (weeks, since))
+
+        rolled, rolled_since = roll_commit_weeks(weeks, since, since + timedelta(days=15))
+        self.assertEqual(rolled, list(range(2, 52)) + [0, 0])
+        self.assertEqual(rolled_since, since + timedelta(weeks=2))
+
+        rolled, rolled_since = roll_commit_weeks(weeks, since, since + timedelta(weeks=100))
+        self.assertEqual(rolled, [0] * 52)
+        self.assertEqual(rolled_since, since + timedelta(weeks=100))
+
+    def test_version_sort_key(self):
+        numbers = ['0.9', '1.0.dev1', '1.0a1', '1.0b2', '1.0rc1', '1.0', '1.0.post1', '1.0.1', '1.1', '10.0', '1!0.1']
+        keys = [version_sort_key(number)[0] for number in numbers]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(version_sort_key('1.0'), version_sort_key('1.0.0'))
+        self.assertEqual(version_sort_key('1.0rc1')[1], False)
+        self.assertEqual(version_sort_key('1.0.post1')[1], True)
+        self.assertEqual(version_sort_key('not a version'), ('', False))
+        # too long to be ordered by the key, rather than truncated
+        self.assertEqual(version_sort_key('20180101123'), ('', False))
+        self.assertEqual(version_sort_key('1.0.post123456789'), ('', False))
+
+
+class PrepareThumbnailsTest(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'image.png')
+        Image.new('RGB', (800, 600), 'red').save(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_sizes(self):
+        self.assertTrue(prepare_thumbnails(self.path))
+        thumbnails = read_thumbnail_manifest(self.path)["thumbnails"]
+        self.assertEqual(
+            [(thumb["file"], thumb["width"], thumb["height"]) for thumb in thumbnails],
+            [('image.png', 800, 450), ('image_640x360.png', 640, 360), ('image_320x180.png', 320, 180),
+             ('image_128x72.png', 128, 72), ('image_64x36.png', 64, 36)]
+        )
+        for thumb in thumbnails:
+            with Image.open(os.path.join(self.dir, 'thumbs', thumb["file"])) as image:
+                self.assertEqual(image.size, (thumb["width"], thumb["height"]))
+
+    def test_incremental(self):
+        self.assertTrue(prepare_thumbnails(self.path))
+        self.assertFalse(prepare_thumbnails(self.path))
+        self.assertTrue(prepare_thumbnails(self.path, force=True))
+
+        # touched, same content
+        future = os.path.getmtime(self.path) + 10
+        os.utime(self.path, (future, future))
+        self.assertFalse(prepare_thumbnails(self.path))
+
+        Image.new('RGB', (800, 600), 'blue').save(self.path)
+        os.utime(self.path, (future + 10, future + 10))
+        self.assertTrue(prepare_thumbnails(self.path))
+
+        os.remove(os.path.join(self.dir, 'thumbs', 'image_64x36.png'))
+        self.assertTrue(prepare_thumbnails(self.path))
+
+    @override_settings(PROJECT_IMAGE_THUMBNAIL_VARIANTS=(("WEBP", 80), ("NOT A FORMAT", 80)))
+    def test_variants(self):
+        if not thumbnail_variant_formats():
+            self.skipTest("Pillow is built without WebP support")
+
+        # a screenshot-like image, which compresses far better lossy than as a PNG
+        Image.effect_noise((800, 600), 32).convert('RGB').save(self.path)
+        prepare_thumbnails(self.path)
+        for thumb in read_thumbnail_manifest(self.path)["thumbnails"]:
+            variants = thumb["variants"]
+            self.assertEqual([variant["type"] for variant in variants], ["image/webp"])
+            self.assertLess(variants[0]["bytes"], thumb["bytes"])
+            with Image.open(os.path.join(self.dir, 'thumbs', variants[0]["file"])) as image:
+                self.assertEqual(image.format, "WEBP")
+                self.assertEqual(image.size, (thumb["width"], thumb["height"]))
@@ -1,12 +1,14 @@
 from django.conf import settings
 from django.contrib.auth.models import User, Permission
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from package.models import Category, Project, PackageExample
+from package.models import Category, Project, PackageExample, TeamMembership
 from package.tests import initial_data
 
-from profiles.models import Profile
+from profiles.models import Account, AccountType, Profile
 
 
 class FunctionalPackageTest(TestCase):
@@ -230,3 +232,47 @@ class CategoryTest(TestCase):
     def test_category_view(self):
         response = self.client.get('/categories/apps/')
         self.assertContains(response, 'apps')
+
+
+class PackageDetailQueriesTest(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.project = Project.objects.create(name='Project', slug='project', category=category)
+        self.account_type, created = AccountType.objects.get_or_create(
+            name=Account.TYPE_GITHUB,
+            defaults={
+                'display_name': 'Github',
+                'social_auth_provider_name': 'github',
+                'link_to_account_with_param': 'https://github.com/{account_name}',
+                'link_to_avatar_with_params': 'https://github.com/{account_name}.png?size={size}',
+            }
+        )
+        self.url = reverse('package', kwargs={'slug': 'project'})
+
+    def add_team_member(self, name):
+        profile = Profile.objects.create(user=User.objects.create_user(name, password=name))
+        account = Account.objects.create(name=name, account_type=self.account_type, profile=profile)
+        TeamMembership.objects.create(project=self.project, account=account, role='developer')
+        self.project.contributors.add(account)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_queries_do_not_depend_on_team_size(self):
+        self.add_team_member('first')
+        # warms the caches filled on the first visit (last release, commit histogram)
+        self.count_queries()
+        expected = self.count_queries()
+
+        for name in ['second', 'third', 'fourth', 'fifth']:
+            self.add_team_member(name)
+            self.project.contributors.add(
+                Account.objects.create(name='{}-contributor'.format(name), account_type=self.account_type)
+            )
+
+        self.assertEqual(self.count_queries(), expected)
+        self.assertLessEqual(expected, 20)
@@ -0,0 +1,70 @@
+"""
+Concurrent refresh of repository metadata and commits for many projects.
+
+GitHub requests are paced by the token bucket of the shared GitHub handler,
+so the only thing the pool has to care about is not hammering a single host.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from package.models import Project
+
+logger = logging.getLogger(__name__)
+
+
+class HostLimiter(object):
+    """ Caps the number of projects fetched at the same time from one host. """
+
+    def __init__(self, limits=None, default=None):
+        self.limits = settings.PACKAGE_UPDATER_HOST_CONCURRENCY if limits is None else limits
+        self.default = settings.PACKAGE_UPDATER_DEFAULT_HOST_CONCURRENCY if default is None else default
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url):
+        host = urlparse(url or "").netloc.lower()
+        if host.startswith("www."):
+            host = host[len("www."):]
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limits.get(host, self.default))
+            return self._semaphores[host]
+
+
+def update_project(project):
+    project.fetch_metadata(fetch_pypi=False)
+    project.fetch_commits()
+    # marks the project as done for resumed runs, without another full save()
+    Project.objects.filter(pk=project.pk).update(last_fetched=timezone.now())
+
+
+def update_projects(projects, workers=None, on_done=None, host_limiter=None):
+    """ Runs :func:`update_project` for every project in a bounded thread pool.
+
+        ``on_done(project, error)`` is called from the calling thread after each
+        project is processed; ``error`` is ``None`` on success.
+    """
+    workers = workers or settings.PACKAGE_UPDATER_WORKERS
+    host_limiter = host_limiter or HostLimiter()
+
+    def work(project):
+        try:
+            with host_limiter.for_url(project.repo_url):
+                update_project(project)
+        finally:
+            # every worker thread has its own database connection
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(work, project): project for project in projects}
+        for future in as_completed(futures):
+            error = future.exception()
+            if on_done is not None:
+                on_done(futures[future], error)
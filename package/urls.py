@@ -16,6 +16,7 @@ from package.views import (
     edit_documentation,
     github_webhook,
     edit_images,
+    project_image_resized,
     project_approval,
     publish_project,
 )
@@ -86,6 +87,12 @@ urlpatterns = [
         name="edit_images",
     ),
 
+    url(
+        regex=r"^images/(?P<pk>\d+)/(?P<version>[-\w]+)/(?P<width>\d+)\.(?P<image_format>[a-z]+)$",
+        view=project_image_resized,
+        name="project_image_resized",
+    ),
+
     url(
         regex="^(?P<slug>[-\w]+)/fetch-data/$",
         view=update_package,
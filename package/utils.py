@@ -1,8 +1,17 @@
+import hashlib
+import json
 import logging
-from os import makedirs
-from os.path import join, split, exists, splitext
+import re
+from datetime import timedelta
+from os import makedirs, remove, rename, utime
+from os.path import dirname, exists, getmtime, getsize, join, split, splitext
 from PIL import Image
-from distutils.version import LooseVersion as versioner
+
+try:
+    # registers the AVIF format with Pillow
+    import pillow_avif  # noqa
+except ImportError:
+    pass
 
 from requests.compat import quote
 
@@ -47,18 +56,110 @@ def get_version(package):
 
 
 def get_pypi_version(package):
-    versions = []
-    for v_str in package.version_set.values_list('number', flat=True):
-        v = versioner(v_str)
-        comparable = True
-        for elem in v.version:
-            if isinstance(elem, str):
-                comparable = False
-        if comparable:
-            versions.append(v)
-    if versions:
-        return str(sorted(versions)[-1])
-    return ''
+    number = package.version_set.filter(is_comparable=True).order_by('-sort_key').values_list(
+        'number', flat=True
+    ).first()
+    return number or ''
+
+
+# https://www.python.org/dev/peps/pep-0440/#appendix-b-parsing-version-strings-with-regular-expressions
+PEP440_VERSION_RE = re.compile(r"""
+    ^\s*v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?P<pre>[-_.]?(?P<pre_l>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre_n>[0-9]+)?)?
+    (?P<post>(?:-(?P<post_n1>[0-9]+))|(?:[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?))?
+    (?P<dev>[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$
+""", re.VERBOSE | re.IGNORECASE)
+
+PRE_RELEASE_ORDER = {'a': 'a', 'alpha': 'a', 'b': 'b', 'beta': 'b', 'c': 'c', 'rc': 'c', 'pre': 'c', 'preview': 'c'}
+
+
+SORT_NUMBER_DIGITS = 8
+
+
+def _sort_number(value):
+    return "{:0{}d}".format(int(value or 0), SORT_NUMBER_DIGITS)
+
+
+def version_sort_key(number):
+    """ Returns ``(key, comparable)`` for the version ``number``.
+
+        ``key`` is a string which sorts like the PEP 440 version, ``''`` if
+        ``number`` is not a valid PEP 440 version. Final releases sort after
+        their pre-releases and before their post-releases, ``.devN`` sorts
+        before all of them, and trailing zeros of the release are ignored,
+        so ``1.0 == 1.0.0``.
+
+        ``comparable`` is true for valid versions which are neither pre-releases
+        nor development releases, the only ones offered as the latest version.
+
+        Versions with a number longer than ``SORT_NUMBER_DIGITS`` digits (e.g.
+        a date and time) cannot be ordered by the key and get ``('', False)``.
+    """
+    match = PEP440_VERSION_RE.match(number or '')
+    if match is None:
+        return '', False
+
+    release = [int(part) for part in match.group('release').split('.')]
+    numbers = release + [
+        int(match.group(name)) for name in ('epoch', 'pre_n', 'post_n1', 'post_n2', 'dev_n') if match.group(name)
+    ]
+    if any(len(str(value)) > SORT_NUMBER_DIGITS for value in numbers):
+        return '', False
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    # only digits and lowercase letters, so the database sorts the keys the same way under any
+    # collation: each release component is prefixed with '1' and the release ends with '0'
+    key = _sort_number(match.group('epoch'))
+    key += ''.join('1' + _sort_number(part) for part in release) + '0'
+    if match.group('pre'):
+        key += PRE_RELEASE_ORDER[match.group('pre_l').lower()] + _sort_number(match.group('pre_n'))
+    elif match.group('dev') and not match.group('post'):
+        key += '0'
+    else:
+        key += 'z'
+    if match.group('post'):
+        key += '1' + _sort_number(match.group('post_n1') or match.group('post_n2'))
+    else:
+        key += '0'
+    if match.group('dev'):
+        key += '0' + _sort_number(match.group('dev_n'))
+    else:
+        key += 'z'
+    if match.group('local'):
+        key += 'l' + re.sub(r'[-_.]', '', match.group('local').lower())
+    return key[:255], not (match.group('pre') or match.group('dev'))
+
+
+COMMIT_WEEKS = 52
+
+
+def commit_weeks(commit_dates, now):
+    """ Histogram of ``commit_dates`` over the 52 weeks before ``now``, oldest
+    week first. Commits newer than ``now`` are counted in the newest week.
+    """
+    weeks = [0] * COMMIT_WEEKS
+    for cdate in commit_dates:
+        age_weeks = max((now - cdate).days // 7, 0)
+        if age_weeks < COMMIT_WEEKS:
+            weeks[COMMIT_WEEKS - 1 - age_weeks] += 1
+    return weeks
+
+
+def roll_commit_weeks(weeks, since, now):
+    """ Moves a histogram computed at ``since`` forward to ``now``, a whole week at a time.
+
+        return: (weeks, since) - the rolled histogram and the moment it is computed at
+    """
+    shift = (now - since).days // 7
+    if shift <= 0:
+        return weeks, since
+    dropped = min(shift, COMMIT_WEEKS)
+    return weeks[dropped:] + [0] * dropped, since + timedelta(weeks=shift)
 
 
 def normalize_license(license):
@@ -79,37 +180,148 @@ def normalize_license(license):
     return license.strip()
 
 
-def prepare_thumbnails(image_path):
+def thumbnail_settings():
+    """ The settings the thumbnails are made with; thumbnails made with others are out of date. """
+    return {
+        "ratio": list(settings.PROJECT_IMAGE_THUMBNAIL_RATIO),
+        "sizes": [list(size) for size in settings.PROJECT_IMAGE_THUMBNAIL_SIZES],
+        "quality": settings.PROJECT_IMAGE_THUMBNAIL_QUALITY,
+        "variants": [list(variant) for variant in settings.PROJECT_IMAGE_THUMBNAIL_VARIANTS],
+    }
+
+
+def thumbnail_variant_formats():
+    """ The (format, quality) of PROJECT_IMAGE_THUMBNAIL_VARIANTS this Pillow can write. """
+    Image.init()
+    return [(image_format, quality) for image_format, quality in settings.PROJECT_IMAGE_THUMBNAIL_VARIANTS
+            if image_format in Image.SAVE]
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def thumbnail_manifest_path(image_path):
+    image_dir, image_filename = split(image_path)
+    return join(image_dir, 'thumbs', splitext(image_filename)[0] + '.json')
+
+
+def read_thumbnail_manifest(image_path):
+    """ The manifest written with the thumbnails of ``image_path``, or None. """
+    try:
+        with open(thumbnail_manifest_path(image_path)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def thumbnails_up_to_date(image_path):
+    manifest = read_thumbnail_manifest(image_path)
+    if manifest is None or manifest.get("settings") != thumbnail_settings():
+        return False
+
+    thumbs_dir = join(dirname(image_path), 'thumbs')
+    files = [
+        variant["file"] for thumb in manifest["thumbnails"] for variant in [thumb] + thumb.get("variants", [])
+    ]
+    if not all(exists(join(thumbs_dir, thumb_file)) for thumb_file in files):
+        return False
+
+    manifest_path = thumbnail_manifest_path(image_path)
+    if getmtime(manifest_path) >= getmtime(image_path):
+        return True
+    if manifest["sha1"] == file_sha1(image_path):
+        # the original was touched but not changed, no need to hash it again next time
+        utime(manifest_path, None)
+        return True
+    return False
+
+
+def prepare_thumbnails(image_path, force=False):
+    """ Crops ``image_path`` to PROJECT_IMAGE_THUMBNAIL_RATIO and shrinks it to
+        the PROJECT_IMAGE_THUMBNAIL_SIZES smaller than it, in its 'thumbs' directory.
+
+        Images whose thumbnails are up to date are skipped, unless ``force`` is set.
+
+        return: True if the thumbnails were made, False if they were up to date
+    """
+    if not force and thumbnails_up_to_date(image_path):
+        return False
+
+    sha1 = file_sha1(image_path)
     image = Image.open(image_path)
     image_dir, image_filename = split(image_path)
+    name, ext = splitext(image_filename)
     thumbs_dir = join(image_dir, 'thumbs')
     if not exists(thumbs_dir):
         makedirs(thumbs_dir)
 
     croped_thumbnail = crop_image(image, settings.PROJECT_IMAGE_THUMBNAIL_RATIO)
-    thumbnail_path = join(thumbs_dir, image_filename)
-
-    croped_thumbnail.save(thumbnail_path, quality=settings.PROJECT_IMAGE_THUMBNAIL_QUALITY)
-    logger.info("Thumbnail {}".format(thumbnail_path))
+    thumbnails = [(image_filename, croped_thumbnail)]
 
-    shrinked_thumbnails = [
-        croped_thumbnail.resize(thumb_size, Image.ANTIALIAS)
-        for thumb_size in settings.PROJECT_IMAGE_THUMBNAIL_SIZES
-        if thumb_size[0] < croped_thumbnail.size[0]
-    ]
-
-    for thumb in shrinked_thumbnails:
-        name, ext = splitext(image_filename)
-        thumb_path = join(
-            thumbs_dir,
-            "{name}_{size}{ext}".format(
-                name=name,
-                size="x".join(map(str, thumb.size)),
-                ext=ext
-            )
+    # the original is decoded once; every size is shrunk from the smallest
+    # image made so far which is at least twice as wide, rather than from the
+    # original, which is as sharp and far cheaper for large originals
+    shrinked_thumbnails = [croped_thumbnail]
+    for thumb_size in sorted(settings.PROJECT_IMAGE_THUMBNAIL_SIZES, reverse=True):
+        if thumb_size[0] >= croped_thumbnail.size[0]:
+            continue
+        source = next(
+            (thumb for thumb in reversed(shrinked_thumbnails) if thumb.size[0] >= 2 * thumb_size[0]),
+            croped_thumbnail
         )
+        thumb = source.resize(thumb_size, Image.ANTIALIAS)
+        shrinked_thumbnails.append(thumb)
+        thumbnails.append((
+            "{name}_{size}{ext}".format(name=name, size="x".join(map(str, thumb.size)), ext=ext),
+            thumb
+        ))
+
+    variant_formats = thumbnail_variant_formats()
+    manifest_thumbnails = []
+    for thumb_filename, thumb in thumbnails:
+        thumb_path = join(thumbs_dir, thumb_filename)
         logger.info("Thumbnail {}".format(thumb_path))
         thumb.save(thumb_path, quality=settings.PROJECT_IMAGE_THUMBNAIL_QUALITY)
+        thumb_bytes = getsize(thumb_path)
+
+        variants = []
+        if variant_formats and thumb.mode not in ('RGB', 'RGBA'):
+            thumb = thumb.convert('RGBA' if thumb.mode in ('LA', 'PA') or 'transparency' in thumb.info else 'RGB')
+        for image_format, quality in variant_formats:
+            variant_filename = splitext(thumb_filename)[0] + '.' + image_format.lower()
+            variant_path = join(thumbs_dir, variant_filename)
+            thumb.save(variant_path, image_format, quality=quality)
+            variant_bytes = getsize(variant_path)
+            # only the variants smaller than the thumbnail are worth serving
+            if variant_bytes < thumb_bytes:
+                logger.info("Thumbnail {}".format(variant_path))
+                variants.append({"file": variant_filename, "type": Image.MIME[image_format], "bytes": variant_bytes})
+            else:
+                remove(variant_path)
+
+        manifest_thumbnails.append({
+            "file": thumb_filename,
+            "width": thumb.size[0],
+            "height": thumb.size[1],
+            "bytes": thumb_bytes,
+            "variants": variants,
+        })
+
+    # written last, so that an interrupted run leaves the thumbnails out of date
+    manifest_path = thumbnail_manifest_path(image_path)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({
+            "sha1": sha1,
+            "settings": thumbnail_settings(),
+            "thumbnails": manifest_thumbnails,
+        }, f)
+    rename(manifest_path + '.tmp', manifest_path)
+    return True
 
 
 def crop_image(image, ratio):
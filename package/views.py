@@ -5,23 +5,25 @@ from datetime import timedelta, datetime
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 from django.core.mail import mail_managers
 from django.core.urlresolvers import reverse
-from django.db.models import Q, Count, Case, When
-from django.http import HttpResponseRedirect, HttpResponse, HttpResponseForbidden
+from django.db.models import Count, Case, When, Prefetch
+from django.http import FileResponse, Http404, HttpResponseRedirect, HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, render, redirect
 from django.utils import timezone
 from django.utils.html import escape
 from django.views.decorators.csrf import csrf_exempt
 
 
-from grid.models import Grid
+from grid.models import Grid, GridPackage
+from grid.page_cache import invalidate_project
 from package.forms import PackageForm, PackageExampleForm, DocumentationForm, ProjectImagesFormSet
 from package.models import Category, Project, PackageExample, ProjectImage, TeamMembership
 from package.repos import get_all_repos
+from package.resize import get_resized, image_version, resized_url
 from package.forms import TeamMembersFormSet
 from profiles.models import Account, AccountType
+from searchv2.autocomplete import autocomplete_index
 from searchv2.builders import rebuild_project_search_index
 
 
@@ -255,7 +257,7 @@ def package_autocomplete(request):
     names = []
     q = request.GET.get("q", "")
     if q:
-        names = (x.name for x in Project.objects.filter(name__istartswith=q))
+        names = (entry.name for entry in autocomplete_index.project_names_starting_with(q))
 
     response = HttpResponse("\n".join(names))
 
@@ -272,7 +274,7 @@ def category(request, slug, template_name="package/package_grid.html"):
                 "title_plural": category_.title_plural,
                 "count": category_.project_set.published().count(),
                 "description": category_.description,
-                "packages": category_.project_set.published().select_related().annotate(usage_count=Count("usage"))
+                "packages": category_.project_set.published().select_related()
             }
         ]
     }
@@ -284,15 +286,9 @@ def ajax_package_list(request, template_name="package/ajax_package_list.html"):
     q = request.GET.get("q", "")
     packages = []
     if q:
-        _dash = "%s-%s" % (settings.PACKAGINATOR_SEARCH_PREFIX, q)
-        _space = "%s %s" % (settings.PACKAGINATOR_SEARCH_PREFIX, q)
-        _underscore = '%s_%s' % (settings.PACKAGINATOR_SEARCH_PREFIX, q)
-        packages = Project.objects.filter(
-                        Q(name__istartswith=q) |
-                        Q(name__istartswith=_dash) |
-                        Q(name__istartswith=_space) |
-                        Q(name__istartswith=_underscore)
-                    )
+        # the index also matches names behind PACKAGINATOR_SEARCH_PREFIX, e.g. "django-"
+        ids = [entry.id for entry in autocomplete_index.project_names_starting_with(q)]
+        packages = Project.objects.filter(pk__in=ids)
 
     packages_already_added_list = []
     grid_slug = request.GET.get("grid", "")
@@ -328,35 +324,17 @@ def usage(request, slug, action):
     package = get_object_or_404(Project, slug=slug)
 
     # Update the current user's usage of the given package as specified by the
-    # request.
-    if package.usage.filter(username=request.user.username):
-        if action.lower() == 'add':
-            # The user is already using the package
-            success = True
-            change = 0
-        else:
-            # If the action was not add and the user has already specified
-            # they are a use the package then remove their usage.
-            package.usage.remove(request.user)
-            success = True
-            change = -1
+    # request. Adding a usage the user already has, or removing one they do not
+    # have, changes nothing.
+    if action.lower() == 'add':
+        change = 1 if package.add_usage(request.user) else 0
     else:
-        if action.lower() == 'lower':
-            # The user is not using the package
-            success = True
-            change = 0
-        else:
-            # If the action was not lower and the user is not already using
-            # the package then add their usage.
-            package.usage.add(request.user)
-            success = True
-            change = 1
+        change = -1 if package.remove_usage(request.user) else 0
+    success = True
 
-    # Invalidate the cache of this users's used_packages_list.
+    # The user's used_packages_list and usage_count are updated by the usage row signals.
     if change == 1 or change == -1:
-        cache_key = "sitewide_used_packages_list_%s" % request.user.pk
-        cache.delete(cache_key)
-        package.grid_clear_detail_template_cache()
+        invalidate_project(package.pk)
 
     # Return an ajax-appropriate response if necessary
     if request.is_ajax():
@@ -411,21 +389,32 @@ def package_list(request, template_name="package/package_grid.html"):
 
 def package_detail(request, slug, template_name="package/package.html"):
 
-    package = get_object_or_404(Project, slug=slug)
-    no_development = package.no_development
-    try:
-        if package.category == Category.objects.get(slug='projects'):
-            # projects get a bye because they are a website
-            pypi_ancient = False
-            pypi_no_release = False
-        else:
-            pypi_ancient = package.pypi_ancient
-            pypi_no_release = package.pypi_ancient is None
-        warnings = no_development or pypi_ancient or pypi_no_release
-    except Category.DoesNotExist:
+    package = get_object_or_404(
+        Project.objects.select_related('category', 'main_img').prefetch_related(
+            Prefetch('images', queryset=ProjectImage.objects.order_by('img')),
+            Prefetch('gridpackage_set', queryset=GridPackage.objects.select_related('grid')),
+            Prefetch(
+                'teammembership_set',
+                queryset=TeamMembership.objects.select_related('account__account_type', 'account__profile__user'),
+            ),
+        ),
+        slug=slug
+    )
+
+    # each of these hits the cache or the database, so look them up once per request
+    latest_version = package.last_released()
+    last_updated = package.last_updated()
+    repo = package.repo
+
+    no_development = last_updated < datetime.now() - timedelta(365) if last_updated is not None else None
+    if package.category.slug == 'projects':
+        # projects get a bye because they are a website
         pypi_ancient = False
         pypi_no_release = False
-        warnings = no_development
+    else:
+        pypi_ancient = latest_version.upload_time < datetime.now() - timedelta(365) if latest_version else None
+        pypi_no_release = pypi_ancient is None
+    warnings = no_development or pypi_ancient or pypi_no_release
 
     if request.GET.get("message"):
         messages.add_message(request, messages.INFO, request.GET.get("message"))
@@ -454,31 +443,33 @@ def package_detail(request, slug, template_name="package/package.html"):
     proj_imgs = []
     if package.main_img:
         proj_imgs.append(package.main_img)
-        proj_imgs.extend(ProjectImage.objects.exclude(pk=package.main_img.pk).filter(project=package).order_by('img'))
-    else:
-        proj_imgs.extend(ProjectImage.objects.filter(project=package).order_by('img'))
-
-    all_github_accounts_of_teammambers = [
-        ac.pk
-        for profile in [ac.profile for ac in package.team_members.all() if ac.profile]
-        for ac in profile.account_set.all() if ac.type == Account.TYPE_GITHUB
-    ]
+    proj_imgs.extend(image for image in package.images.all() if image.pk != package.main_img_id)
+
+    team_memberships = [membership for membership in package.teammembership_set.all() if membership.account]
+    team_profiles = set(membership.account.profile_id for membership in team_memberships if membership.account.profile_id)
+    not_team_contributors = list(
+        package.contributors.select_related('account_type').exclude(
+            account_type__name=Account.TYPE_GITHUB,
+            profile__in=team_profiles,
+        )
+    )
 
     can_edit_package = hasattr(request.user, "profile") and request.user.profile.can_edit_package(package)
 
     events_on_timeline = 5
-    timeline_events = package.events.order_by('-date')
+    timeline_events = list(package.events.order_by('-date'))
     timeline_axis_end = timeline_axis_start = None
-
-    if timeline_events.count() > 0:
-        timeline_end = timeline_events.first()
-        timeline_start = timeline_events[events_on_timeline-1] if timeline_events.count() > events_on_timeline else timeline_events[0]
+    if timeline_events:
+        timeline_end = timeline_events[0]
+        timeline_start = timeline_events[events_on_timeline-1] if len(timeline_events) > events_on_timeline else timeline_events[0]
         timeline_axis_start = timeline_start.date - timedelta(30)
         timeline_axis_end = timeline_end.date + timedelta(30)
 
     return render(request, template_name,
             dict(
                 package=package,
+                grids=[grid_package.grid for grid_package in package.gridpackage_set.all()],
+                team_memberships=team_memberships,
                 timeline_events=timeline_events,
                 timeline_axis_start=timeline_axis_start,
                 timeline_axis_end=timeline_axis_end,
@@ -487,9 +478,9 @@ def package_detail(request, slug, template_name="package/package.html"):
                 no_development=no_development,
                 pypi_no_release=pypi_no_release,
                 warnings=warnings,
-                latest_version=package.last_released(),
-                repo=package.repo,
-                not_team_contributors=package.contributors.exclude(pk__in=all_github_accounts_of_teammambers),
+                latest_version=latest_version,
+                repo=repo,
+                not_team_contributors=not_team_contributors,
                 can_edit_package=can_edit_package
             )
         )
@@ -559,3 +550,24 @@ def github_webhook(request):
         package.last_fetched = timezone.now()
         package.save()
     return HttpResponse()
+
+
+def project_image_resized(request, pk, version, width, image_format):
+    image = get_object_or_404(ProjectImage, pk=pk)
+    width = int(width)
+    if width not in settings.PROJECT_IMAGE_RESIZE_WIDTHS or image_format not in settings.PROJECT_IMAGE_RESIZE_FORMATS:
+        raise Http404
+
+    if version != image_version(image):
+        # the image was replaced since the page linking it was rendered
+        return redirect(resized_url(image.img, width, image_format))
+
+    try:
+        path = get_resized(image, width, image_format)
+        resized = open(path, 'rb')
+    except IOError:
+        raise Http404
+
+    response = FileResponse(resized, content_type="image/{}".format(image_format))
+    response['Cache-Control'] = "public, max-age={}, immutable".format(60 * 60 * 24 * 365)
+    return response
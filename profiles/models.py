@@ -1,6 +1,5 @@
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
@@ -179,14 +178,9 @@ class Profile(BaseModel):
 
         from package.models import Project
 
-        change = False
         for project in Project.objects.filter(usage=profile.user):
-            if self.user not in project.usage.all():
-                project.usage.add(self.user)
-                change = True
-
-        if change:
-            cache.delete("sitewide_used_packages_list_{}".format(self.user.pk))
+            project.remove_usage(profile.user)
+            project.add_usage(self.user)
 
         # TODO: add merge of verified_by, and email
 
@@ -0,0 +1,131 @@
+"""
+Streamed dumps of the public catalogue, as NDJSON or CSV.
+
+Rows are read with server-side cursors and serialized as they come, so the
+memory used does not grow with the catalogue. Related values which would
+otherwise cost a query per row (grid slugs, latest versions) are fetched once
+per chunk of ``CHUNK_SIZE`` rows.
+"""
+
+import csv
+import json
+from collections import OrderedDict, defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CHUNK_SIZE = 500
+
+
+def chunked(iterable, size=CHUNK_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _grid_packages():
+    # Import placed here to avoid circular dependencies
+    from grid.models import GridPackage
+    return GridPackage.objects.filter(package__is_published=True)
+
+
+def project_rows():
+    # Import placed here to avoid circular dependencies
+    from package.models import Project, Version
+
+    fields = (
+        'id', 'slug', 'name', 'category__slug', 'description', 'url', 'status', 'repo_url', 'repo_watchers',
+        'repo_forks', 'pypi_url', 'pypi_downloads', 'documentation_url', 'participants', 'usage_count',
+        'publication_time', 'created', 'modified',
+    )
+    rows = Project.objects.published().order_by('pk').values_list(*fields).iterator()
+    for chunk in chunked(rows):
+        pks = [row[0] for row in chunk]
+        grids = defaultdict(list)
+        for package_id, grid_slug in _grid_packages().filter(package__in=pks).values_list('package', 'grid__slug'):
+            grids[package_id].append(grid_slug)
+        versions = Version.objects.latest_by_package(pks)
+        for row in chunk:
+            item = OrderedDict(zip(fields, row))
+            item['category'] = item.pop('category__slug')
+            latest = versions.get(item['id'])
+            item['version'] = latest.number if latest else ''
+            item['grids'] = grids[item['id']]
+            yield item
+
+
+def grid_rows():
+    # Import placed here to avoid circular dependencies
+    from grid.models import Grid
+
+    fields = ('id', 'slug', 'title', 'description', 'is_locked', 'header', 'created', 'modified')
+    rows = Grid.objects.order_by('pk').values_list(*fields).iterator()
+    for chunk in chunked(rows):
+        projects = defaultdict(list)
+        for grid_id, project_slug in _grid_packages().filter(grid__in=[row[0] for row in chunk]).values_list(
+                'grid', 'package__slug'):
+            projects[grid_id].append(project_slug)
+        for row in chunk:
+            item = OrderedDict(zip(fields, row))
+            item['projects'] = projects[item['id']]
+            yield item
+
+
+def element_rows():
+    # Import placed here to avoid circular dependencies
+    from grid.models import Element
+
+    fields = ('id', 'grid_package__grid__slug', 'grid_package__package__slug', 'feature__title', 'text', 'modified')
+    names = ('id', 'grid', 'project', 'feature', 'text', 'modified')
+    rows = Element.objects.filter(grid_package__package__is_published=True).order_by('pk').values_list(*fields)
+    for row in rows.iterator():
+        yield OrderedDict(zip(names, row))
+
+
+def timeline_event_rows():
+    # Import placed here to avoid circular dependencies
+    from timeline.models import TimelineEvent
+
+    fields = ('id', 'project__slug', 'name', 'url', 'date', 'created')
+    names = ('id', 'project', 'name', 'url', 'date', 'created')
+    rows = TimelineEvent.objects.filter(project__is_published=True).order_by('pk').values_list(*fields)
+    for row in rows.iterator():
+        yield OrderedDict(zip(names, row))
+
+
+EXPORTS = OrderedDict([
+    ('projects', project_rows),
+    ('grids', grid_rows),
+    ('elements', element_rows),
+    ('timeline_events', timeline_event_rows),
+])
+
+
+def ndjson_lines(rows):
+    for chunk in chunked(rows):
+        yield "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in chunk)
+
+
+class Echo(object):
+    """ File-like object handing back what ``csv.writer`` writes to it. """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    header = None
+    for chunk in chunked(rows):
+        lines = []
+        if header is None:
+            header = list(chunk[0].keys())
+            lines.append(writer.writerow(header))
+        for row in chunk:
+            lines.append(writer.writerow([
+                " ".join(value) if isinstance(value, list) else value for value in row.values()
+            ]))
+        yield "".join(lines)
@@ -5,8 +5,15 @@ when you run "manage.py test".
 Replace this with more appropriate tests for your application.
 """
 
+import gzip
+import json
+
+from django.core.urlresolvers import reverse
 from django.test import TestCase
 
+from grid.models import Grid, GridPackage
+from package.models import Category, Project, Version
+
 
 class SimpleTest(TestCase):
     def test_basic_addition(self):
@@ -14,3 +21,37 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        grid = Grid.objects.create(title='Grid', slug='grid')
+        published = Project.objects.create(name='published', slug='published', category=category, is_published=True)
+        Project.objects.create(name='draft', slug='draft', category=category)
+        GridPackage.objects.create(grid=grid, package=published)
+        Version.objects.create(package=published, number='2.0')
+
+    def get(self, resource, format, **extra):
+        url = reverse('reports:export', kwargs={'resource': resource, 'format': format})
+        response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_ndjson(self):
+        content = b''.join(self.get('projects', 'ndjson').streaming_content).decode('utf-8')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['slug'] for row in rows], ['published'])
+        self.assertEqual(rows[0]['grids'], ['grid'])
+        self.assertEqual(rows[0]['version'], '2.0')
+
+    def test_csv_gzip(self):
+        response = self.get('grids', 'csv', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'slug', 'title'])
+        self.assertTrue(lines[1].endswith(',published'))
+
+    def test_unknown_resource(self):
+        url = reverse('reports:export', kwargs={'resource': 'users', 'format': 'csv'})
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -1,6 +1,6 @@
 from django.conf.urls import url
 
-from reports.views import package_csv
+from reports.views import export, package_csv
 
 urlpatterns = [
 
@@ -9,4 +9,9 @@ urlpatterns = [
         view=package_csv,
         name="package_csv",
     ),
+    url(
+        regex=r"^export/(?P<resource>[a-z_]+)\.(?P<format>ndjson|csv)$",
+        view=export,
+        name="export",
+    ),
 ]
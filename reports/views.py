@@ -1,38 +1,51 @@
 # -*- coding: utf-8 -*-
 
 
-import csv
-import io
+from collections import OrderedDict
 
-from django.http import HttpResponse
+from django.http import Http404, StreamingHttpResponse
+from django.utils.text import compress_sequence
 
-from package.models import Project
+from reports.export import EXPORTS, csv_lines, ndjson_lines
 
+FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
 
 
-def package_csv(request):
+def stream(request, lines, content_type, filename):
+    """ Streams ``lines``, gzipped when the client accepts it. """
+    lines = (line.encode('utf-8') for line in lines)
+    gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if gzipped:
+        lines = compress_sequence(lines)
+    response = StreamingHttpResponse(lines, content_type="{}; charset=utf-8".format(content_type))
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+    return response
+
+
+def export(request, resource, format):
+    if resource not in EXPORTS or format not in FORMATS:
+        raise Http404
+    serialize, content_type = FORMATS[format]
+    return stream(request, serialize(EXPORTS[resource]()), content_type, "{}.{}".format(resource, format))
 
-    output = io.StringIO()
+
+def package_csv(request):
     fieldnames = ['title', 'created', 'num_participants', 'pypi_downloads', 'repo_forks', ]
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    for package in Project.objects.all():
-        try:
-            writer.writerow(
-                {
-                    'title': package.title,
-                    'created': package.created,
-                    'num_participants': len(package.participants.split(',')),
-                    'pypi_downloads': 'TODO', # This doesn't work: package.pypi_downloads,
-                    'repo_forks': package.repo_forks
-
-                }
-            )
-        except UnicodeEncodeError:
-            pass
-
-    result = ','.join(fieldnames)
-    result += '\n'
-    result += output.getvalue()
-
-
-    return HttpResponse(result)
+
+    def rows():
+        for row in EXPORTS['projects']():
+            yield OrderedDict(zip(fieldnames, [
+                row['name'],
+                row['created'],
+                len(row['participants'].split(',')),
+                row['pypi_downloads'],
+                row['repo_forks'],
+            ]))
+
+    return stream(request, csv_lines(rows()), 'text/csv', 'package.csv')
@@ -0,0 +1,136 @@
+"""
+In-process prefix index serving the autocomplete endpoints.
+
+Every worker keeps the names and slugs of all projects and grids in sorted
+arrays and answers prefix lookups with a bisect, so typing into a search box
+does not cost a database query per keystroke. The index is rebuilt lazily
+whenever its version in the shared cache (``core.shared_values``) changes,
+which happens when a project or a grid is renamed, added or deleted.
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from core.invalidation import invalidate
+from core.shared_values import current_version
+from searchv2.utils import CHARS
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = "autocomplete_index:version"
+
+Entry = namedtuple('Entry', ['id', 'name', 'slug'])
+GridEntry = namedtuple('GridEntry', ['id', 'title', 'slug', 'description'])
+
+
+def normalize(value):
+    return (value or "").strip().lower()
+
+
+class PrefixIndex(object):
+    """ Sorted array of ``(key, entry)`` pairs searched with bisect. """
+
+    def __init__(self, pairs):
+        pairs = sorted(((normalize(key), entry) for key, entry in pairs if key), key=lambda pair: pair[0])
+        self.keys = [key for key, entry in pairs]
+        self.entries = [entry for key, entry in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, prefix, limit=None):
+        """ Entries with a key starting with ``prefix``, each returned once. """
+        prefix = normalize(prefix)
+        if not prefix or limit == 0:
+            return []
+        found = []
+        seen = set()
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and self.keys[position].startswith(prefix):
+            entry = self.entries[position]
+            if entry.id not in seen:
+                seen.add(entry.id)
+                found.append(entry)
+                if limit is not None and len(found) >= limit:
+                    break
+            position += 1
+        return found
+
+
+def without_search_prefix(name):
+    """ ``name`` without a leading ``PACKAGINATOR_SEARCH_PREFIX`` and separator, or ``None``. """
+    prefix = settings.PACKAGINATOR_SEARCH_PREFIX.lower()
+    name = normalize(name)
+    for char in CHARS:
+        if name.startswith(prefix + char):
+            return name[len(prefix) + 1:]
+    return None
+
+
+class AutocompleteIndex(object):
+    """ Per-process project and grid indexes, kept in sync through the cache version. """
+
+    def __init__(self):
+        self.version = None
+        self.project_names = PrefixIndex([])
+        self.projects = PrefixIndex([])
+        self.grids = PrefixIndex([])
+        self._lock = threading.Lock()
+
+    def build(self, version):
+        # Import placed here to avoid circular dependencies
+        from grid.models import Grid
+        from package.models import Project
+
+        projects = [Entry(*row) for row in Project.objects.values_list('id', 'name', 'slug')]
+        grids = [GridEntry(*row) for row in Grid.objects.values_list('id', 'title', 'slug', 'description')]
+
+        name_pairs = [(project.name, project) for project in projects]
+        name_pairs += [(without_search_prefix(project.name), project) for project in projects]
+
+        self.project_names = PrefixIndex(name_pairs)
+        self.projects = PrefixIndex(name_pairs + [(project.slug, project) for project in projects])
+        self.grids = PrefixIndex(
+            [(grid.title, grid) for grid in grids] + [(grid.slug, grid) for grid in grids]
+        )
+        self.version = version
+
+    def refresh(self):
+        version = current_version(VERSION_CACHE_KEY)
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    self.build(version)
+        return self
+
+    def warm(self):
+        """ Builds the index at worker start; lookups retry later if the database is not there yet. """
+        try:
+            self.refresh()
+        except DatabaseError:
+            logger.exception("Could not build the autocomplete index")
+
+    def project_names_starting_with(self, q, limit=None):
+        """ Projects whose name starts with ``q``, with or without ``PACKAGINATOR_SEARCH_PREFIX``. """
+        return self.refresh().project_names.lookup(q, limit)
+
+    def projects_starting_with(self, q, limit=None):
+        """ Projects whose name or slug starts with ``q``. """
+        return self.refresh().projects.lookup(q, limit)
+
+    def grids_starting_with(self, q, limit=None):
+        """ Grids whose title or slug starts with ``q``. """
+        return self.refresh().grids.lookup(q, limit)
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def invalidate_autocomplete_index():
+    """ Makes every worker rebuild its index on the next lookup after the current transaction commits. """
+    invalidate(VERSION_CACHE_KEY)
@@ -1,26 +1,16 @@
 from datetime import datetime, timedelta
-import json
 from sys import stdout
 
-import requests
+from django.db import transaction
+from django.db.models import Count, Max
 
 from grid.models import Grid
-from package.models import Project, Commit
-from searchv2.models import SearchV2
+from package.models import Project, Commit, Version
+from searchv2.models import DocumentationProbe, SearchV2, max_search_weight, search_vector
 from searchv2.utils import remove_prefix, clean_title
 
 
-def rebuild_project_search_index(project, print_out=False):
-    now = datetime.now()
-    quarter_delta = timedelta(90)
-    half_year_delta = timedelta(182)
-    year_delta = timedelta(365)
-
-    obj, created = SearchV2.objects.get_or_create(
-        item_type="package",
-        item_id=project.id
-    )
-
+def fill_project_item(obj, project, usage, last_committed, last_released):
     obj.slug = project.slug
     obj.slug_no_prefix = remove_prefix(project.slug)
     obj.clean_title = clean_title(remove_prefix(project.slug))
@@ -32,118 +22,169 @@ def rebuild_project_search_index(project, print_out=False):
     obj.repo_watchers = project.repo_watchers
     obj.repo_forks = project.repo_forks
     obj.pypi_downloads = project.pypi_downloads
-    obj.usage = project.usage.count()
+    obj.usage = usage
     obj.participants = project.participants
     obj.is_draft = project.is_draft
+    obj.last_committed = last_committed
+    obj.last_released = last_released
 
-    optional_save = False
-    try:
-        obj.last_committed = project.last_updated()
-        optional_save = True
-    except Commit.DoesNotExist:
-        pass
 
-    last_released = project.last_released()
-    if last_released and last_released.upload_time:
-        obj.last_released = last_released.upload_time
-        optional_save = True
+def project_weight(obj, now, has_documentation):
+    quarter_delta = timedelta(90)
+    half_year_delta = timedelta(182)
+    year_delta = timedelta(365)
 
-    if optional_save:
-        obj.save()
+    weight = 0
 
-    # Weighting part
+    # Read the docs! (probed in the background, see DocumentationProbe)
+    if has_documentation:
+        weight += 20
 
-    if not project.is_draft:
-        weight = 0
-        optional_save = False
-
-        # Read the docs!
-        rtfd_url = "http://readthedocs.org/api/v1/build/{0}/".format(obj.slug)
-        r = requests.get(rtfd_url)
-        if r.status_code == 200:
-            data = json.loads(r.content)
-            if data['meta']['total_count']:
-                weight += 20
-
-        if obj.description.strip():
+    if obj.description.strip():
+        weight += 20
+
+    if obj.repo_watchers:
+        weight += min(obj.repo_watchers, 20)
+
+    if obj.repo_forks:
+        weight += min(obj.repo_forks, 20)
+
+    if obj.pypi_downloads:
+        weight += min(obj.pypi_downloads / 1000, 20)
+
+    if obj.usage:
+        weight += min(obj.usage, 20)
+
+    # Is there ongoing work or is this forgotten?
+    if obj.last_committed:
+        if now - obj.last_committed < quarter_delta:
+            weight += 20
+        elif now - obj.last_committed < half_year_delta:
+            weight += 10
+        elif now - obj.last_committed < year_delta:
+            weight += 5
+
+    # Is the last release less than a year old?
+    last_released = obj.last_released
+    if last_released:
+        if now - last_released < year_delta:
             weight += 20
 
-        if obj.repo_watchers:
-            weight += min(obj.repo_watchers, 20)
+    return weight
 
-        if obj.repo_forks:
-            weight += min(obj.repo_forks, 20)
 
-        if obj.pypi_downloads:
-            weight += min(obj.pypi_downloads / 1000, 20)
+def fill_grid_item(obj, grid, package_count, max_weight):
+    obj.slug = grid.slug
+    obj.slug_no_prefix = remove_prefix(grid.slug)
+    obj.clean_title = clean_title(remove_prefix(grid.slug))
+    obj.title = grid.title
+    obj.title_no_prefix = remove_prefix(grid.title)
+    obj.description = grid.description
+    obj.absolute_url = grid.get_absolute_url()
+    obj.is_draft = grid.is_draft
+
+    increment = max_weight / 6
+    weight = max_weight - increment
 
-        if obj.usage:
-            weight += min(obj.usage, 20)
+    if not grid.is_locked:
+        weight -= increment
 
-        # Is there ongoing work or is this forgotten?
-        if obj.last_committed:
-            if now - obj.last_committed < quarter_delta:
-                weight += 20
-            elif now - obj.last_committed < half_year_delta:
-                weight += 10
-            elif now - obj.last_committed < year_delta:
-                weight += 5
+    if not grid.header:
+        weight -= increment
 
-        # Is the last release less than a year old?
-        last_released = obj.last_released
-        if last_released:
-            if now - last_released < year_delta:
-                weight += 20
+    if not package_count:
+        weight -= increment
 
-        if weight:
-            obj.weight = weight
-            obj.save()
+    obj.weight = weight
+
+
+def rebuild_project_search_index(project, print_out=False):
+    now = datetime.now()
+
+    obj, created = SearchV2.objects.get_or_create(
+        item_type="package",
+        item_id=project.id
+    )
+
+    try:
+        last_committed = project.last_updated()
+    except Commit.DoesNotExist:
+        last_committed = None
+
+    last_released = project.last_released()
+    last_released = last_released.upload_time if last_released else None
+
+    fill_project_item(obj, project, project.usage_count, last_committed, last_released)
+
+    # Weighting part
+    if not project.is_draft:
+        has_documentation = DocumentationProbe.objects.filter(project=project, has_documentation=True).exists()
+        # set even when 0, so a project which lost its documentation loses its weight
+        obj.weight = project_weight(obj, now, has_documentation)
 
         if print_out:
             print(obj.slug, created, file=stdout)
 
+    obj.save()
+    SearchV2.objects.filter(pk=obj.pk).update(search_vector=search_vector())
+    max_search_weight.invalidate()
+
 
 def build_1(print_out=False):
+    """ Rebuilds the whole search index with a fixed number of queries.
 
-    SearchV2.objects.all().delete()
+        The new rows replace the old ones in a single transaction, so the
+        search is never empty while the index is being rebuilt.
+    """
 
     if not Project.objects.exists():
         return
 
-    for project in Project.objects.all():
-        rebuild_project_search_index(project, print_out)
-
-    print('----------------------', file=stdout)
-    max_weight = SearchV2.objects.all()[0].weight
-    increment = max_weight / 6
-    for grid in Grid.objects.all():
-        obj, created = SearchV2.objects.get_or_create(
-            item_type="grid",
-            item_id=grid.id,
-        )
-        obj.slug = grid.slug
-        obj.slug_no_prefix = remove_prefix(grid.slug)
-        obj.clean_title = clean_title(remove_prefix(grid.slug))
-        obj.title = grid.title
-        obj.title_no_prefix = remove_prefix(grid.title)
-        obj.description = grid.description
-        obj.absolute_url = grid.get_absolute_url()
-        obj.is_draft = grid.is_draft
-
-        weight = max_weight - increment
-
-        if not grid.is_locked:
-            weight -= increment
+    now = datetime.now()
 
-        if not grid.header:
-            weight -= increment
+    last_commits = dict(
+        Commit.objects.values('package').annotate(last=Max('commit_date')).values_list('package', 'last')
+    )
+    last_releases = dict(
+        Version.objects.exclude(upload_time=None).values('package').annotate(
+            last=Max('upload_time')
+        ).values_list('package', 'last')
+    )
+    documented = set(
+        DocumentationProbe.objects.filter(has_documentation=True).values_list('project', flat=True)
+    )
 
-        if not grid.packages.count():
-            weight -= increment
+    items = []
+    for project in Project.objects.select_related('category'):
+        obj = SearchV2(item_type="package", item_id=project.id)
+        fill_project_item(
+            obj,
+            project,
+            project.usage_count,
+            last_commits.get(project.pk),
+            last_releases.get(project.pk),
+        )
+        if not project.is_draft:
+            obj.weight = project_weight(obj, now, project.pk in documented)
+        items.append(obj)
 
-        obj.weight = weight
-        obj.save()
+        if print_out:
+            print(obj.slug, file=stdout)
 
-        print(obj, created, file=stdout)
+    print('----------------------', file=stdout)
+    max_weight = max(obj.weight for obj in items)
+    for grid in Grid.objects.annotate(package_count=Count('gridpackage')):
+        obj = SearchV2(item_type="grid", item_id=grid.id)
+        fill_grid_item(obj, grid, grid.package_count, max_weight)
+        items.append(obj)
+
+        print(obj, file=stdout)
+
+    with transaction.atomic():
+        SearchV2.objects.all().delete()
+        SearchV2.objects.bulk_create(items, batch_size=500)
+        SearchV2.objects.update(search_vector=search_vector())
+        # bulk_create sends no signals
+        max_search_weight.invalidate()
 
     return SearchV2.objects.all()
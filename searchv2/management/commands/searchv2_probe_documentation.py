@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from chroniker.models import Job
+from django.conf import settings
+from django.core.management.base import BaseCommand
+import requests
+
+from package.models import Project
+from searchv2.models import DocumentationProbe
+from searchv2.utils import fetch_has_documentation
+
+
+class Command(BaseCommand):
+
+    help = "Checks which published projects have documentation on Read the Docs"
+
+    def handle(self, *args, **options):
+        now = datetime.now()
+        stale = now - timedelta(seconds=settings.SEARCH_DOCUMENTATION_PROBE_TTL)
+
+        projects = Project.objects.published().exclude(
+            documentation_probe__checked__gte=stale
+        )
+        projects_count = projects.count()
+
+        for index, project in enumerate(projects.iterator()):
+            Job.update_progress(total_parts=projects_count, total_parts_complete=index)
+            try:
+                has_documentation = fetch_has_documentation(project.slug)
+            except (requests.exceptions.RequestException, ValueError, KeyError):
+                print("{} ... failed".format(project.slug))
+                continue
+
+            DocumentationProbe.objects.update_or_create(
+                project=project,
+                defaults={
+                    'has_documentation': has_documentation,
+                    'checked': now,
+                }
+            )
+            print("{} ... {}".format(project.slug, has_documentation))
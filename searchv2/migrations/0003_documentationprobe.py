@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0009_project_commit_list_since'),
+        ('searchv2', '0002_is_draft_and_item_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentationProbe',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('has_documentation', models.BooleanField(default=False, verbose_name='Has documentation')),
+                ('checked', models.DateTimeField(verbose_name='Checked')),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='documentation_probe', to='package.Project')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    SearchV2 = apps.get_model('searchv2', 'SearchV2')
+    SearchV2.objects.update(search_vector=(
+        SearchVector('title', weight='A') +
+        SearchVector('category', weight='B') +
+        SearchVector('description', weight='C') +
+        SearchVector('participants', weight='D')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchv2', '0003_documentationprobe'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='searchv2',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, null=True, verbose_name='Search vector'),
+        ),
+        migrations.AddIndex(
+            model_name='searchv2',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='searchv2_vector_gin'),
+        ),
+        # serves both title__icontains (UPPER(...) LIKE) and trigram similarity
+        migrations.RunSQL(
+            'CREATE INDEX searchv2_title_upper_trgm ON searchv2_searchv2 USING gin (UPPER("title") gin_trgm_ops);',
+            'DROP INDEX searchv2_title_upper_trgm;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX searchv2_title_trgm ON searchv2_searchv2 USING gin ("title" gin_trgm_ops);',
+            'DROP INDEX searchv2_title_trgm;',
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,13 @@
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.cache import cache
 from django.db import models
+from django.db.models import Max
 from django.utils.translation import ugettext_lazy as _
 
 from core.models import BaseModel
+from core.shared_values import SharedValue
 from package.models import Project
 from grid.models import Grid
 
@@ -13,6 +17,16 @@ ITEM_TYPE_CHOICES = (
 )
 
 
+def search_vector():
+    """ Full text search document of a row, kept in ``SearchV2.search_vector`` by the builders. """
+    return (
+        SearchVector('title', weight='A') +
+        SearchVector('category', weight='B') +
+        SearchVector('description', weight='C') +
+        SearchVector('participants', weight='D')
+    )
+
+
 class SearchV2(BaseModel):
     """
         Searches available on:
@@ -50,11 +64,15 @@ class SearchV2(BaseModel):
                         help_text="List of collaborats/participants on the project", blank=True)
     last_committed = models.DateTimeField(_("Last commit"), blank=True, null=True)
     last_released = models.DateTimeField(_("Last release"), blank=True, null=True)
+    search_vector = SearchVectorField(_("Search vector"), blank=True, null=True)
 
     class Meta:
         ordering = ['-weight', ]
         verbose_name_plural = 'SearchV2s'
         unique_together = ('item_type', 'item_id',)
+        indexes = [
+            GinIndex(fields=['search_vector'], name='searchv2_vector_gin'),
+        ]
 
     def __str__(self):
         return "{0}:{1}".format(self.weight, self.title)
@@ -81,3 +99,24 @@ class SearchV2(BaseModel):
 
     def _self(self):
         return self
+
+
+# highest search weight, passed to the search box of every page
+max_search_weight = SharedValue(
+    "max_search_weight", lambda: SearchV2.objects.aggregate(Max('weight'))['weight__max']
+)
+
+
+class DocumentationProbe(BaseModel):
+    """
+        Whether a project has documentation on Read the Docs. Refreshed in the
+        background by the ``searchv2_probe_documentation`` command, so building
+        the search index never waits for Read the Docs.
+    """
+
+    project = models.OneToOneField(Project, related_name="documentation_probe", on_delete=models.CASCADE)
+    has_documentation = models.BooleanField(_("Has documentation"), default=False)
+    checked = models.DateTimeField(_("Checked"))
+
+    def __str__(self):
+        return "{0}:{1}".format(self.project, self.has_documentation)
@@ -1,4 +1,6 @@
+from searchv2.tests.test_autocomplete import *
 from searchv2.tests.test_builders import *
+from searchv2.tests.test_commands import *
 from searchv2.tests.test_models import *
 from searchv2.tests.test_utils import *
 from searchv2.tests.test_views import *
\ No newline at end of file
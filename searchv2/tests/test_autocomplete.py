@@ -0,0 +1,51 @@
+from django.test import TestCase
+
+from core import invalidation
+from package.models import Category, Project
+from searchv2.autocomplete import Entry, PrefixIndex, autocomplete_index
+
+
+class PrefixIndexTest(TestCase):
+
+    def test_lookup(self):
+        first = Entry(1, 'Django Uni-Form', 'django-uni-form')
+        second = Entry(2, 'Djangorestframework', 'djangorestframework')
+        index = PrefixIndex([
+            (first.name, first), (first.slug, first), (second.name, second),
+        ])
+        self.assertEqual(index.lookup('DJANGO'), [first, second])
+        self.assertEqual(index.lookup('django-'), [first])
+        self.assertEqual(index.lookup('django', limit=1), [first])
+        self.assertEqual(index.lookup('flask'), [])
+        self.assertEqual(index.lookup(''), [])
+
+
+class AutocompleteIndexTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(title='dummy', slug='dummy')
+
+    def test_tracks_project_changes(self):
+        project = Project.objects.create(name='Django Uni-Form', slug='django-uni-form', category=self.category)
+        # test cases run inside a transaction, so nothing is ever committed
+        invalidation.flush()
+        names = [entry.name for entry in autocomplete_index.project_names_starting_with('uni')]
+        self.assertEqual(names, ['Django Uni-Form'])
+
+        project.name = 'Django Crispy Forms'
+        project.save()
+        invalidation.flush()
+        self.assertEqual(autocomplete_index.project_names_starting_with('uni'), [])
+        names = [entry.name for entry in autocomplete_index.project_names_starting_with('crispy')]
+        self.assertEqual(names, ['Django Crispy Forms'])
+
+        project.delete()
+        invalidation.flush()
+        self.assertEqual(autocomplete_index.project_names_starting_with('crispy'), [])
+
+    def test_lookup_without_queries(self):
+        Project.objects.create(name='Django Uni-Form', slug='django-uni-form', category=self.category)
+        invalidation.flush()
+        autocomplete_index.refresh()
+        with self.assertNumQueries(0):
+            autocomplete_index.projects_starting_with('django-uni')
@@ -14,3 +14,8 @@ class BuilderTest(TestCase):
         self.assertEqual(SearchV2.objects.count(), 0)
         build_1(False)
         self.assertEqual(SearchV2.objects.count(), 6)
+
+    def test_build_1_replaces_index(self):
+        build_1(False)
+        build_1(False)
+        self.assertEqual(SearchV2.objects.count(), 6)
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import requests
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from package.models import Category, Project
+from searchv2.builders import rebuild_project_search_index
+from searchv2.models import DocumentationProbe, SearchV2
+
+
+class ProbeDocumentationTest(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(title='dummy', slug='dummy')
+        self.project = Project.objects.create(
+            name='Django Uni-Form', slug='django-uni-form', category=category, is_published=True
+        )
+        patcher = patch('searchv2.management.commands.searchv2_probe_documentation.Job.update_progress')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def probe(self, **get):
+        with patch('searchv2.utils.requests.get', **get) as mocked_get, patch('sys.stdout', new_callable=StringIO):
+            call_command('searchv2_probe_documentation')
+        return mocked_get
+
+    def response(self, status_code, total_count=0):
+        return Mock(status_code=status_code, content='{{"meta": {{"total_count": {}}}}}'.format(total_count))
+
+    def weight(self):
+        rebuild_project_search_index(self.project)
+        return SearchV2.objects.get(item_type='package', item_id=self.project.pk).weight
+
+    def test_documented(self):
+        self.probe(return_value=self.response(200, 3))
+        self.assertTrue(DocumentationProbe.objects.get(project=self.project).has_documentation)
+
+    def test_not_found(self):
+        self.probe(return_value=self.response(404))
+        self.assertFalse(DocumentationProbe.objects.get(project=self.project).has_documentation)
+
+    def test_failure(self):
+        self.probe(side_effect=requests.exceptions.ConnectionError)
+        self.assertFalse(DocumentationProbe.objects.exists())
+
+    def test_fresh_probe_skipped(self):
+        DocumentationProbe.objects.create(project=self.project, has_documentation=True, checked=datetime.now())
+        get = self.probe(return_value=self.response(404))
+        self.assertFalse(get.called)
+        self.assertEqual(self.weight(), 20)
+
+    def test_expired_probe(self):
+        checked = datetime.now() - timedelta(days=30)
+        DocumentationProbe.objects.create(project=self.project, has_documentation=True, checked=checked)
+
+        # kept while Read the Docs can't be reached
+        self.probe(side_effect=requests.exceptions.Timeout)
+        self.assertEqual(DocumentationProbe.objects.get(project=self.project).checked, checked)
+        self.assertEqual(self.weight(), 20)
+
+        self.probe(return_value=self.response(404))
+        probe = DocumentationProbe.objects.get(project=self.project)
+        self.assertFalse(probe.has_documentation)
+        self.assertGreater(probe.checked, checked)
+        self.assertEqual(self.weight(), 0)
@@ -2,10 +2,11 @@ from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 
+from core import invalidation
 from package.tests import initial_data
 from profiles.models import Profile
 from searchv2.builders import build_1
-from searchv2.models import SearchV2
+from searchv2.models import SearchV2, max_search_weight, search_vector
 from searchv2.views import search_function
 
 
@@ -43,6 +44,30 @@ class FunctionalPackageTest(TestCase):
         results = search_function('ser')
         self.assertEqual(results[0].title, 'Serious Testing')
 
+    def test_search_function_matches_description(self):
+        build_1(False)
+        results = search_function('grid')
+        self.assertEqual(
+            sorted(item.title for item in results),
+            ['Another Testing', 'Testing']
+        )
+
+    def test_weight_orders_within_relevance(self):
+        SearchV2.objects.create(
+            item_type='package', item_id=1, title='Steem', title_no_prefix='steem', slug='steem',
+            slug_no_prefix='steem', clean_title='steem', absolute_url='/projects/steem/', weight=0,
+        )
+        # popular, but only its slug starts with the query
+        SearchV2.objects.create(
+            item_type='package', item_id=2, title='Wallet', title_no_prefix='wallet', slug='steem-wallet',
+            slug_no_prefix='steem-wallet', clean_title='wallet', absolute_url='/projects/steem-wallet/', weight=160,
+        )
+        SearchV2.objects.update(search_vector=search_vector())
+        max_search_weight.invalidate()
+        invalidation.flush()
+
+        self.assertEqual([item.title for item in search_function('steem')], ['Steem', 'Wallet'])
+
 
 class ViewTest(TestCase):
 
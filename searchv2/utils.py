@@ -1,5 +1,8 @@
+import json
+
 from django.conf import settings
 from django.template.defaultfilters import slugify
+import requests
 
 CHARS = ["_", ",", ".", "-", " ", "/", "|"]
 
@@ -16,3 +19,14 @@ def clean_title(value):
     for char in CHARS:
         value = value.replace(char, "")
     return value
+
+
+def fetch_has_documentation(slug):
+    """ Asks Read the Docs whether ``slug`` has any documentation builds. """
+    rtfd_url = "http://readthedocs.org/api/v1/build/{0}/".format(slug)
+    r = requests.get(rtfd_url, timeout=10)
+    if r.status_code == 200:
+        data = json.loads(r.content)
+        if data['meta']['total_count']:
+            return True
+    return False
@@ -2,9 +2,11 @@
 import json
 
 from django.contrib.auth.decorators import login_required
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
 from django.core.urlresolvers import reverse
-from django.db.models import Q
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
 from django.db.models import Max
+from django.db.models.functions import Coalesce
 from django.http import HttpResponseForbidden, HttpResponseRedirect, HttpResponse
 from django.shortcuts import render
 
@@ -12,9 +14,10 @@ from rest_framework.generics import ListAPIView, RetrieveAPIView
 
 from homepage.views import homepage
 from package.models import Project
+from searchv2.autocomplete import autocomplete_index
 from searchv2.forms import SearchForm
 from searchv2.builders import build_1
-from searchv2.models import SearchV2
+from searchv2.models import SearchV2, max_search_weight
 from searchv2.utils import remove_prefix, clean_title
 
 
@@ -32,17 +35,39 @@ def build_search(request, template_name="searchv2/build_results.html"):
                 {'results': results})
 
 
+# most relevance points the weight of an item adds; an exact title match alone is worth 100
+WEIGHT_POINTS = 10
+
+
 def search_function(q):
-    """ TODO - make generic title searches have lower weight """
+    """ Matches the query against the full text vector, the title trigrams and the
+        slug/title prefixes, ordered by text relevance: the full text rank plus the
+        title similarity, times 100. The weight only adds up to ``WEIGHT_POINTS``
+        (scaled by the highest weight), so it orders the items matching about as
+        well, but never puts a popular prefix match above an exact title match.
+    """
 
     items = []
     if q:
+        query = SearchQuery(q)
+        weight_scale = float(WEIGHT_POINTS) / max(max_search_weight.get() or 0, 1)
         items = SearchV2.objects.filter(
+                    Q(search_vector=query) |
+                    Q(title__trigram_similar=q) |
                     Q(clean_title__startswith=clean_title(remove_prefix(q))) |
                     Q(title__icontains=q) |
                     Q(title_no_prefix__startswith=q.lower()) |
                     Q(slug__startswith=q.lower()) |
-                    Q(slug_no_prefix__startswith=q.lower()))
+                    Q(slug_no_prefix__startswith=q.lower())
+                ).annotate(
+                    rank=Coalesce(SearchRank(F('search_vector'), query), Value(0)),
+                    similarity=TrigramSimilarity('title', q),
+                ).annotate(
+                    relevance=ExpressionWrapper(
+                        (F('rank') + F('similarity')) * 100 + F('weight') * weight_scale,
+                        output_field=FloatField(),
+                    ),
+                ).order_by('-relevance', 'title')
         #grids    = Grid.objects.filter(Q(title__icontains=q) | Q(description__icontains=q))
     return items
 
@@ -101,13 +126,13 @@ def search_packages_autocomplete(request):
     """
     q = request.GET.get('term', '')
     if q:
-        objects = search_function(q)[:15]
-        objects = objects.values_list('title', flat=True)
-        json_response = json.dumps(list(objects))
+        titles = [entry.name for entry in autocomplete_index.projects_starting_with(q, 15)]
+        titles += [entry.title for entry in autocomplete_index.grids_starting_with(q, 15 - len(titles))]
+        json_response = json.dumps(titles)
     else:
         json_response = json.dumps([])
 
-    return HttpResponse(json_response, mimetype='text/javascript')
+    return HttpResponse(json_response, content_type='text/javascript')
 
 
 class SearchListAPIView(ListAPIView):
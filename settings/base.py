@@ -138,9 +138,11 @@ PROJECT_APPS = [
     "feeds",
     "searchv2",
     "apiv3",
+    "apiv4",
     "social_auth_local",
     "im",
     "timeline",
+    "reports",
 ]
 
 PREREQ_APPS = [
@@ -153,6 +155,7 @@ PREREQ_APPS = [
     "django.contrib.messages",
     "django.contrib.humanize",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # external
     "crispy_forms",
@@ -228,6 +231,42 @@ GITHUB_APP_ID = environ.get('GITHUB_APP_ID')
 GITHUB_TOKEN = environ.get('GITHUB_TOKEN')
 GITHUB_USERNAME = environ.get('GITHUB_USERNAME')
 
+########## PACKAGE UPDATER
+PACKAGE_UPDATER_WORKERS = int(environ.get('PACKAGE_UPDATER_WORKERS', 4))
+
+# maximum number of projects fetched at the same time from a single host
+PACKAGE_UPDATER_HOST_CONCURRENCY = {
+    "github.com": 4,
+    "bitbucket.org": 2,
+}
+PACKAGE_UPDATER_DEFAULT_HOST_CONCURRENCY = 2
+
+########## SEARCH
+# how long (in seconds) a Read the Docs probe of a project stays fresh
+SEARCH_DOCUMENTATION_PROBE_TTL = 60 * 60 * 24 * 7
+
+########## CACHE INVALIDATION
+# upper bound (in seconds) for values cached by core.invalidation.cached_method, which are otherwise
+# dropped on any change they depend on
+CACHED_METHOD_TIMEOUT = 60 * 60
+
+########## GRIDS
+# resolved grid pages are dropped on any change they depend on, so this is only an upper bound
+GRID_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+########## APIV4
+# rows are served by the change feed once they are this old (in seconds), when no transaction can still be
+# committing a row with an older modification time
+CHANGE_FEED_DELAY = 5
+# deletions are served by the change feed for this many days (prune_tombstones), clients which synced
+# longer ago must do a full sync
+TOMBSTONE_RETENTION_DAYS = 90
+
+########## HOMEPAGE
+# a homepage snapshot older than this (in seconds) is rebuilt in the background while still being served
+HOMEPAGE_SNAPSHOT_REFRESH = 60 * 5
+HOMEPAGE_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
 ########## STEEMCONNECT
 STEEMCONNECT_APP_ID = environ.get('STEEMCONNECT_APP_ID')
 STEEMCONNECT_APP_SECRET = environ.get('STEEMCONNECT_APP_SECRET')
@@ -405,8 +444,14 @@ URL_REGEX_GITHUB = r'(?:http|https|git)://github.com/[^/]*/([^/]*)/{0,1}'
 
 ########### redis setup
 
-# import redis
-# from rq import Worker, Queue, Connection
+REDIS_URL = environ.get('REDIS_URL', 'redis://localhost:6379')
+
+# Project images are thumbnailed by the RQ worker (worker.py); when False,
+# they are thumbnailed at the end of the upload request instead.
+THUMBNAIL_ASYNC = env.bool('THUMBNAIL_ASYNC', default=True)
+THUMBNAIL_QUEUE = 'default'
+THUMBNAIL_JOB_TIMEOUT = 60 * 5
+THUMBNAIL_JOB_ATTEMPTS = 3
 
 ########### end redis setup
 
@@ -530,6 +575,28 @@ PROJECT_IMAGE_THUMBNAIL_SIZES = (
     (1280, 720),
 )
 PROJECT_IMAGE_THUMBNAIL_QUALITY = 90
+# (Pillow format, quality) every thumbnail is also saved in, most preferred
+# first, and served to the browsers which accept it when smaller. Formats this
+# Pillow cannot write are skipped; AVIF needs the pillow-avif-plugin package,
+# e.g. insert ("AVIF", 60) first.
+PROJECT_IMAGE_THUMBNAIL_VARIANTS = (
+    ("WEBP", 80),
+)
+
+# Project images resized on demand (package.resize): the allowed widths and
+# formats (URL extension: Pillow format), and where they are cached, up to how
+# many bytes (checked every PROJECT_IMAGE_RESIZE_EVICT_EVERY renders of a process).
+PROJECT_IMAGE_RESIZE_WIDTHS = (64, 128, 160, 240, 320, 480, 640, 800, 1024, 1280)
+PROJECT_IMAGE_RESIZE_FORMATS = {
+    "jpeg": "JPEG",
+    "png": "PNG",
+    "webp": "WEBP",
+}
+PROJECT_IMAGE_RESIZE_CACHE_DIR = environ.get(
+    'PROJECT_IMAGE_RESIZE_CACHE_DIR', os.path.join(PROJECT_ROOT, "cache", "resized")
+)
+PROJECT_IMAGE_RESIZE_CACHE_BYTES = 1024 * 1024 * 512
+PROJECT_IMAGE_RESIZE_EVICT_EVERY = 20
 
 assert all(
     [
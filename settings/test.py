@@ -16,6 +16,8 @@ SERVE_MEDIA = DEBUG
 ########## TEST
 TEST_RUNNER = 'testrunner.OurTestRunner'
 
+THUMBNAIL_ASYNC = False
+
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
 ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0003_auto_20180309_0541'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timelineevent',
+            index=models.Index(fields=['modified', 'id'], name='timeline_event_modified'),
+        ),
+    ]
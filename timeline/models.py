@@ -30,6 +30,7 @@ class TimelineEvent(BaseModel):
 
     class Meta:
         unique_together = ('name', 'url', 'date', 'project',)
+        indexes = [models.Index(fields=['modified', 'id'], name='timeline_event_modified')]
 
     def __str__(self):
         return "[{}][{}] {}".format(str(self.project), str(self.date), self.name[:20])
@@ -85,7 +85,7 @@ urlpatterns = [
     # url(r'^api/v1/', include('core.apiv1', namespace="apitest")),
 
     # reports
-    # url(r'^reports/', include('reports.urls', namespace='reports')),
+    url(r'^reports/', include('reports.urls', namespace='reports')),
 
     url(r"^error/$", lambda request: 1/0),  # should trigger sentry
     url(r"^500/$", error_500_view),
@@ -1,5 +1,6 @@
 import os
 
+import django
 import redis
 from rq import Worker, Queue, Connection
 
@@ -7,6 +8,10 @@ listen = ['high', 'default', 'low']
 
 redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
 
+# the jobs use the Django models
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings.base")
+django.setup()
+
 conn = redis.from_url(redis_url)
 
 if __name__ == '__main__':
@@ -24,6 +24,9 @@ if os.environ.get('DJANGO_SETTINGS_MODULE') == 'settings.docker':
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
 
+from searchv2.autocomplete import autocomplete_index
+autocomplete_index.warm()
+
 if os.environ.get('DJANGO_SETTINGS_MODULE') == 'settings.docker':
     from raven.contrib.django.raven_compat.middleware.wsgi import Sentry
     application = Sentry(application)